@@ -0,0 +1,319 @@
+import argparse
+import ast
+import json
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.connection import wait
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+sys.path.insert(0, SRC_DIR)
+
+import joblib
+
+from data_store import ensure_cached
+from hashing import file_sha256, key_sha256
+from instrumentation import finish, reset, tracker_from_env
+
+DATA_PATH = "data/iris.csv"
+MODEL_PATH = "artifacts/model.joblib"
+ENCODER_PATH = "artifacts/label_encoder.joblib"
+STATE_PATH = "artifacts/pipeline_state.json"
+
+# Loaded once in the runner process; forked stages inherit it copy-on-write.
+SHARED = {}
+
+
+def _src(*names):
+    """
+    Paths of the given src/ scripts plus every src/ module they import, transitively.
+
+    Imports are read from the source with `ast`, including those inside
+    functions, so editing a helper module invalidates every stage that uses it.
+    """
+    paths, pending = [], list(names)
+    while pending:
+        path = os.path.join(SRC_DIR, pending.pop())
+        if path in paths or not os.path.exists(path):
+            continue
+        paths.append(path)
+        with open(path) as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending += [f"{alias.name}.py" for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(f"{node.module}.py")
+    return sorted(paths)
+
+
+class Stage:
+    """
+    One node of the pipeline DAG.
+
+    A stage is rerun only when the hash of its `inputs` (data, upstream
+    artifacts, its own source files and the src/ modules they import) differs from the last successful
+    run, or when one of its `outputs` is missing.
+    """
+
+    def __init__(self, name, run, inputs, outputs, deps=()):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+
+    def key(self):
+        """Content hash of the inputs, or None when an input does not exist yet."""
+        if not all(os.path.exists(path) for path in self.inputs):
+            return None
+        return key_sha256(stage=self.name, inputs={path: file_sha256(path) for path in self.inputs})
+
+    def is_fresh(self, state):
+        key = self.key()
+        return key is not None and state.get(self.name) == key and all(os.path.exists(p) for p in self.outputs)
+
+
+def _run_validate(shared):
+    from validate_data import print_report, validate_file
+    report = validate_file(DATA_PATH)
+    with open("artifacts/validation_report.json", "w") as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    if not report["passed"]:
+        raise ValueError(f"{DATA_PATH} does not match the schema; see artifacts/validation_report.json")
+
+
+def _run_train(shared):
+    # Backends come from $ARTIFACT_STORE / $TRACKER, as for `python src/train.py`.
+    from train import train
+    train(DATA_PATH)
+
+
+def _run_evaluate(shared):
+    from evaluate import plot_and_save_metrics
+    plot_and_save_metrics(model=shared["model"], le=shared["label_encoder"])
+
+
+def _run_fairness(shared):
+    from check_fairness import check_model_fairness
+    check_model_fairness(MODEL_PATH, DATA_PATH, chunk_size=100_000, model=shared["model"])
+
+
+def _run_drift(shared):
+    from check_drift import load_or_build_profile, make_new_data, monitor_drift
+    from data_store import load_dataset
+    profile = load_or_build_profile(DATA_PATH)
+    new_data = make_new_data(load_dataset(DATA_PATH))
+    chunks = (new_data.iloc[i:i + 1000] for i in range(0, len(new_data), 1000))
+    monitor_drift(chunks, profile, DATA_PATH)
+
+
+def _run_explain(shared):
+    from generate_explanation import generate_explanations
+    generate_explanations(MODEL_PATH, DATA_PATH, model=shared["model"])
+
+
+def _run_labels(shared):
+    from check_labels import find_suspicious_labels
+    suspicious = find_suspicious_labels(DATA_PATH)
+    with open("artifacts/suspicious_labels.json", "w") as f:
+        json.dump({"data_path": DATA_PATH, "suspicious_indices": suspicious}, f, indent=2)
+
+
+def _run_publish(shared):
+    from publish import publish_artifacts
+    from train import MODEL_ARTIFACT_DIR, make_backends
+    store, _ = make_backends()
+    publish_artifacts(store, "artifacts", MODEL_ARTIFACT_DIR)
+
+
+MODEL_INPUTS = [DATA_PATH, MODEL_PATH]
+
+STAGES = [
+    Stage("validate", _run_validate,
+          inputs=[DATA_PATH] + _src("validate_data.py"),
+          outputs=["artifacts/validation_report.json"]),
+    Stage("train", _run_train, deps=["validate"],
+          inputs=[DATA_PATH] + _src("train.py"),
+          # shap_table.joblib is not listed: it is skipped for trees too large to tabulate.
+          outputs=[MODEL_PATH, "artifacts/model.tree", ENCODER_PATH]),
+    Stage("evaluate", _run_evaluate, deps=["train"],
+          inputs=MODEL_INPUTS + [ENCODER_PATH] + _src("evaluate.py"),
+          outputs=["artifacts/metrics.json", "artifacts/metrics.png"]),
+    Stage("fairness", _run_fairness, deps=["train"],
+          inputs=MODEL_INPUTS + _src("check_fairness.py"),
+          outputs=["artifacts/fairness_report.json"]),
+    Stage("explain", _run_explain, deps=["train"],
+          inputs=MODEL_INPUTS + _src("generate_explanation.py"),
+          outputs=["artifacts/shap_summary_global.png", "artifacts/shap_force_plot.html"]),
+    Stage("drift", _run_drift,
+          inputs=[DATA_PATH] + _src("check_drift.py"),
+          outputs=["artifacts/drift_profile.json", "artifacts/drift_scores.json"]),
+    Stage("labels", _run_labels,
+          inputs=[DATA_PATH] + _src("check_labels.py"),
+          outputs=["artifacts/suspicious_labels.json"]),
+]
+STAGES.append(Stage(
+    "publish", _run_publish,
+    deps=[stage.name for stage in STAGES],
+    inputs=[path for stage in STAGES for path in stage.outputs] + _src("publish.py", "train.py"),
+    outputs=["artifacts/manifest.json"],
+))
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _share_inputs(stage):
+    """Loads the model artifacts a stage needs into SHARED, once per model version."""
+    if MODEL_PATH not in stage.inputs:
+        return
+    model_hash = file_sha256(MODEL_PATH)
+    if SHARED.get("model_hash") != model_hash:
+        SHARED["model"] = joblib.load(MODEL_PATH)
+        SHARED["label_encoder"] = joblib.load(ENCODER_PATH) if os.path.exists(ENCODER_PATH) else None
+        SHARED["model_hash"] = model_hash
+
+
+def _run_stage(stage):
+    """Runs one stage on a fresh trace, written to artifacts/traces/<stage>.json even on failure."""
+    reset()
+    try:
+        stage.run(SHARED)
+    finally:
+        finish(stage.name, tracker=tracker_from_env())
+
+
+def _stage_process(stage):
+    _run_stage(stage)
+    sys.stdout.flush()
+
+
+def run_pipeline(stages=STAGES, only=None, force=False, max_workers=None, state_path=STATE_PATH):
+    """
+    Runs the pipeline DAG, skipping stages whose inputs are unchanged.
+
+    Ready stages are started as soon as their dependencies finish, each in a
+    process forked from the runner, so the data cache and the loaded model
+    are shared instead of being reloaded by every stage. Stages not listed in
+    `only` are treated as already satisfied.
+
+    Args:
+        stages (list): Stage definitions in topological order.
+        only (list, optional): Names of the stages to run (default: all).
+        force (bool): Rerun stages even when their inputs are unchanged.
+        max_workers (int, optional): Stages run at once (default: CPU count).
+            With 1, or where fork is unavailable, stages run in this process.
+        state_path (str): Where the input hashes of successful runs are kept.
+
+    Returns:
+        dict: Per stage, a (status, seconds) tuple.
+    """
+    selected = [s for s in stages if only is None or s.name in only]
+    names = {s.name for s in selected}
+    max_workers = max_workers or os.cpu_count() or 1
+    use_fork = max_workers > 1 and "fork" in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork") if use_fork else None
+
+    state = load_state(state_path)
+    os.makedirs("artifacts", exist_ok=True)
+    if os.path.exists(DATA_PATH):
+        ensure_cached(DATA_PATH)
+
+    results = {}
+    pending = list(selected)
+    running = {}
+    while pending or running:
+        for stage in list(pending):
+            deps = [d for d in stage.deps if d in names]
+            if any(results.get(d, ("",))[0] in ("failed", "blocked") for d in deps):
+                results[stage.name] = ("blocked", 0.0)
+                pending.remove(stage)
+                continue
+            if not all(d in results for d in deps) or len(running) >= max_workers:
+                continue
+            pending.remove(stage)
+            if not force and stage.is_fresh(state):
+                print(f"[{stage.name}] inputs unchanged, skipping")
+                results[stage.name] = ("skipped", 0.0)
+                continue
+
+            print(f"[{stage.name}] running")
+            start = time.perf_counter()
+            try:
+                key = stage.key()
+                _share_inputs(stage)
+            except Exception as e:
+                print(f"[{stage.name}] failed: {e}")
+                results[stage.name] = ("failed", time.perf_counter() - start)
+                continue
+            if context is None:
+                try:
+                    _run_stage(stage)
+                    status = "ran"
+                except Exception as e:
+                    print(f"[{stage.name}] failed: {e}")
+                    status = "failed"
+                results[stage.name] = (status, time.perf_counter() - start)
+                if status == "ran":
+                    state[stage.name] = key
+                    save_state(state, state_path)
+            else:
+                sys.stdout.flush()
+                process = context.Process(target=_stage_process, args=(stage,), name=stage.name)
+                process.start()
+                running[process.sentinel] = (stage, process, key, start)
+
+        if not running:
+            continue
+        for sentinel in wait(list(running)):
+            stage, process, key, start = running.pop(sentinel)
+            process.join()
+            elapsed = time.perf_counter() - start
+            if process.exitcode == 0:
+                results[stage.name] = ("ran", elapsed)
+                state[stage.name] = key
+                save_state(state, state_path)
+            else:
+                print(f"[{stage.name}] failed with exit code {process.exitcode}")
+                results[stage.name] = ("failed", elapsed)
+    return {stage.name: results[stage.name] for stage in selected}
+
+
+def print_summary(results, total):
+    print("\n--- Pipeline Summary ---")
+    print(f"{'stage':<10} {'status':<8} {'seconds':>8}")
+    for name, (status, seconds) in results.items():
+        print(f"{name:<10} {status:<8} {seconds:>8.2f}")
+    print(f"{'total':<10} {'':<8} {total:>8.2f}")
+    print("------------------------")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the training and Responsible AI pipeline as a DAG.")
+    parser.add_argument("--stages", nargs="+", choices=[s.name for s in STAGES], default=None,
+                        help="Stages to run (default: all); unselected upstream stages are assumed up to date.")
+    parser.add_argument("--force", action="store_true", help="Rerun stages even when their inputs are unchanged.")
+    parser.add_argument("--max-workers", type=int, default=None, help="Stages run concurrently (1 runs them in-process).")
+    parser.add_argument("--state-path", type=str, default=STATE_PATH, help="Where stage input hashes are recorded.")
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_pipeline(only=args.stages, force=args.force, max_workers=args.max_workers, state_path=args.state_path)
+    print_summary(results, time.perf_counter() - start)
+    sys.exit(0 if all(status in ("ran", "skipped") for status, _ in results.values()) else 1)
@@ -0,0 +1,390 @@
+import argparse
+import base64
+import getpass
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+import joblib
+
+from hashing import file_md5
+
+# Modules each backend imports when it is selected; nothing here is imported
+# at module load, so choosing the local backends never pays for them.
+BACKEND_MODULES = {
+    "local": [],
+    "gcs": ["google.cloud.storage", "google.cloud.aiplatform"],
+    "file": [],
+    "mlflow": ["mlflow", "mlflow.sklearn"],
+}
+
+
+class LocalArtifactStore:
+    """Publishes artifacts by copying them under a local directory, standing in for a bucket."""
+
+    def __init__(self, root=".cache/artifact_store"):
+        self.root = root
+
+    def list_hashes(self, prefix=""):
+        """MD5 of every object under `prefix`, keyed by path relative to it."""
+        base = os.path.join(self.root, prefix)
+        hashes = {}
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                hashes[os.path.relpath(path, base).replace(os.sep, "/")] = file_md5(path)
+        return hashes
+
+    def upload(self, source_path, destination):
+        target = os.path.join(self.root, destination)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Copy under a temporary name so a reader never sees a partial file.
+        tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        shutil.copy2(source_path, tmp_path)
+        os.replace(tmp_path, target)
+        print(f"File {source_path} copied to {target}")
+
+
+class GCSArtifactStore:
+    """Publishes artifacts to a GCS bucket, initializing Vertex AI on first use."""
+
+    def __init__(self, bucket_uri, project=None, location=None):
+        self.bucket_uri = bucket_uri
+        self.project = project
+        self.location = location
+        self._bucket = None
+
+    def _get_bucket(self):
+        if self._bucket is None:
+            from google.cloud import aiplatform, storage
+
+            aiplatform.init(project=self.project, location=self.location, staging_bucket=self.bucket_uri)
+            # One client, and so one connection pool, for every upload of this store.
+            self._bucket = storage.Client().bucket(self.bucket_uri.replace("gs://", ""))
+        return self._bucket
+
+    def list_hashes(self, prefix=""):
+        """
+        MD5 of every object under `prefix`, keyed by path relative to it.
+
+        GCS records an MD5 for every non-composite object, so this is a
+        single listing request rather than a download.
+        """
+        bucket = self._get_bucket()
+        start = len(prefix.rstrip("/")) + 1 if prefix else 0
+        hashes = {}
+        for blob in bucket.client.list_blobs(bucket, prefix=prefix.rstrip("/") + "/" if prefix else None):
+            if blob.md5_hash:
+                hashes[blob.name[start:]] = base64.b64decode(blob.md5_hash).hex()
+        return hashes
+
+    def upload(self, source_path, destination):
+        """Uploads a file to the bucket."""
+        blob = self._get_bucket().blob(destination)
+        blob.upload_from_filename(source_path)
+        print(f"File {source_path} uploaded to {self.bucket_uri}/{destination}")
+
+
+class RunInfo:
+    def __init__(self, run_id, experiment_id):
+        self.run_id = run_id
+        self.experiment_id = experiment_id
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _write_yaml(path, fields):
+    # The flat scalar fields MLflow's file store expects; strings are quoted.
+    with open(path, "w") as f:
+        for key, value in fields.items():
+            if value is None:
+                value = "null"
+            elif isinstance(value, str):
+                value = json.dumps(value)
+            elif isinstance(value, list) and not value:
+                value = "[]"
+            f.write(f"{key}: {value}\n")
+
+
+def _read_yaml_scalar(path, key):
+    """
+    The value of a top-level `key: value` line of a flat meta.yaml, or None.
+
+    Reads both the quoted strings written by _write_yaml and the plain or
+    single-quoted scalars MLflow's file store writes.
+    """
+    with open(path) as f:
+        for line in f:
+            name, sep, value = line.partition(":")
+            if sep and name == key:
+                value = value.strip()
+                if value.startswith('"'):
+                    return json.loads(value)
+                if value.startswith("'"):
+                    return value[1:-1].replace("''", "'")
+                return value
+    return None
+
+
+class FileTracker:
+    """
+    Records runs in MLflow's file-store layout without importing mlflow.
+
+    Runs land in `root/<experiment id>/<run id>/` with `meta.yaml`,
+    `params/`, `metrics/`, `tags/` and `artifacts/`, so `mlflow ui
+    --backend-store-uri <root>` can browse them later. Models are stored as
+    joblib files rather than full MLflow model directories.
+    """
+
+    def __init__(self, root="mlruns", experiment="Iris_Classification_Experiment"):
+        self.root = os.path.abspath(root)
+        self.experiment_id = self._experiment_id(experiment)
+        self._active = []
+
+    def _experiment_id(self, name):
+        os.makedirs(self.root, exist_ok=True)
+        ids = []
+        for entry in os.listdir(self.root):
+            meta = os.path.join(self.root, entry, "meta.yaml")
+            if entry.isdigit() and os.path.exists(meta):
+                ids.append(int(entry))
+                if _read_yaml_scalar(meta, "name") == name:
+                    return entry
+        experiment_id = str(max(ids, default=0) + 1)
+        os.makedirs(os.path.join(self.root, experiment_id))
+        now = _now_ms()
+        _write_yaml(os.path.join(self.root, experiment_id, "meta.yaml"), {
+            "artifact_location": f"file://{self.root}/{experiment_id}",
+            "creation_time": now,
+            "experiment_id": experiment_id,
+            "last_update_time": now,
+            "lifecycle_stage": "active",
+            "name": name,
+        })
+        return experiment_id
+
+    def _run_dir(self, run_id):
+        return os.path.join(self.root, self.experiment_id, run_id)
+
+    def _write_run_meta(self, run_id, run_name, start_time, status, end_time=None):
+        run_dir = self._run_dir(run_id)
+        _write_yaml(os.path.join(run_dir, "meta.yaml"), {
+            "artifact_uri": f"file://{run_dir}/artifacts",
+            "end_time": end_time,
+            "entry_point_name": "",
+            "experiment_id": self.experiment_id,
+            "lifecycle_stage": "active",
+            "run_id": run_id,
+            "run_name": run_name,
+            "run_uuid": run_id,
+            "source_name": "",
+            "source_type": 4,
+            "source_version": "",
+            "start_time": start_time,
+            "status": status,
+            "tags": [],
+            "user_id": getpass.getuser(),
+        })
+
+    def _write(self, run_id, kind, key, text, mode="w"):
+        path = os.path.join(self._run_dir(run_id), kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode) as f:
+            f.write(text)
+
+    def _create_run(self, run_name, tags=None):
+        run_id = uuid.uuid4().hex
+        start_time = _now_ms()
+        os.makedirs(os.path.join(self._run_dir(run_id), "artifacts"))
+        self._write_run_meta(run_id, run_name, start_time, status=1)
+        for key, value in {"mlflow.runName": run_name, "mlflow.user": getpass.getuser(), **(tags or {})}.items():
+            self._write(run_id, "tags", key, str(value))
+        return run_id, start_time
+
+    def _log_batch(self, run_id, params=None, metrics=None, tags=None):
+        timestamp = _now_ms()
+        for key, value in (params or {}).items():
+            self._write(run_id, "params", key, str(value))
+        for key, value in (metrics or {}).items():
+            self._write(run_id, "metrics", key, f"{timestamp} {float(value)} 0\n", mode="a")
+        for key, value in (tags or {}).items():
+            self._write(run_id, "tags", key, str(value))
+
+    @contextmanager
+    def start_run(self, run_name=None):
+        run_name = run_name or f"run-{time.strftime('%Y%m%d-%H%M%S')}"
+        run_id, start_time = self._create_run(run_name)
+        self._active.append(run_id)
+        status = 4
+        try:
+            yield RunInfo(run_id, self.experiment_id)
+            status = 3
+        finally:
+            self._active.pop()
+            self._write_run_meta(run_id, run_name, start_time, status=status, end_time=_now_ms())
+
+    def log_params(self, params):
+        self._log_batch(self._active[-1], params=params)
+
+    def log_metric(self, key, value):
+        self._log_batch(self._active[-1], metrics={key: value})
+
+    def set_tag(self, key, value):
+        self._log_batch(self._active[-1], tags={key: value})
+
+    def log_child_runs(self, results, metric_name):
+        """Records every sweep result as a finished run nested under the active run."""
+        parent = self._active[-1]
+        for i, result in enumerate(results):
+            run_name = f"candidate-{i:04d}"
+            run_id, start_time = self._create_run(run_name, tags={"mlflow.parentRunId": parent})
+            self._log_batch(
+                run_id,
+                params=result["params"],
+                metrics={metric_name: result["accuracy"], "fit_seconds": result["fit_seconds"]},
+                tags={"Training Info": "Sweep candidate"},
+            )
+            self._write_run_meta(run_id, run_name, start_time, status=3, end_time=_now_ms())
+
+    def log_model(self, model, X_train, artifact_path="iris_model"):
+        target = os.path.join(self._run_dir(self._active[-1]), "artifacts", artifact_path, "model.joblib")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        joblib.dump(model, target)
+
+
+class MlflowTracker:
+    """Logs runs through the mlflow client; mlflow is imported when the tracker is created."""
+
+    def __init__(self, tracking_uri, experiment="Iris_Classification_Experiment", registered_model_name=None):
+        import mlflow
+
+        self.mlflow = mlflow
+        self.registered_model_name = registered_model_name
+        mlflow.set_tracking_uri(tracking_uri)
+        mlflow.set_experiment(experiment)
+
+    @contextmanager
+    def start_run(self, run_name=None):
+        with self.mlflow.start_run(run_name=run_name) as run:
+            yield RunInfo(run.info.run_id, run.info.experiment_id)
+
+    def log_params(self, params):
+        self.mlflow.log_params(params)
+
+    def log_metric(self, key, value):
+        self.mlflow.log_metric(key, value)
+
+    def set_tag(self, key, value):
+        self.mlflow.set_tag(key, value)
+
+    def log_child_runs(self, results, metric_name):
+        """
+        Logs every sweep result as a nested run of the active run.
+
+        Each child run is created and filled with a single log_batch call, so a
+        sweep of hundreds of candidates costs a few requests per candidate
+        instead of one per parameter and metric.
+        """
+        from mlflow.entities import Metric, Param, RunTag
+        from mlflow.tracking import MlflowClient
+        from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID
+
+        client = MlflowClient()
+        parent = self.mlflow.active_run().info
+        timestamp = _now_ms()
+        for i, result in enumerate(results):
+            child = client.create_run(
+                parent.experiment_id,
+                tags={MLFLOW_PARENT_RUN_ID: parent.run_id},
+                run_name=f"candidate-{i:04d}",
+            )
+            client.log_batch(
+                child.info.run_id,
+                metrics=[
+                    Metric(metric_name, result["accuracy"], timestamp, 0),
+                    Metric("fit_seconds", result["fit_seconds"], timestamp, 0),
+                ],
+                params=[Param(key, str(value)) for key, value in result["params"].items()],
+                tags=[RunTag("Training Info", "Sweep candidate")],
+            )
+            client.set_terminated(child.info.run_id)
+
+    def log_model(self, model, X_train, artifact_path="iris_model"):
+        import mlflow.sklearn
+        from mlflow.models import infer_signature
+
+        signature = infer_signature(X_train, model.predict(X_train))
+        return mlflow.sklearn.log_model(
+            sk_model=model,
+            artifact_path=artifact_path,
+            signature=signature,
+            input_example=X_train.head(1),
+            # Use the variable to conditionally register the model
+            registered_model_name=self.registered_model_name or None,
+        )
+
+
+ARTIFACT_STORES = {"local": LocalArtifactStore, "gcs": GCSArtifactStore}
+TRACKERS = {"file": FileTracker, "mlflow": MlflowTracker}
+
+
+def get_artifact_store(name, **kwargs):
+    """Creates the artifact store registered as `name` ('local' or 'gcs')."""
+    if name not in ARTIFACT_STORES:
+        raise ValueError(f"Unknown artifact store '{name}'; choose from {sorted(ARTIFACT_STORES)}")
+    return ARTIFACT_STORES[name](**kwargs)
+
+
+def get_tracker(name, **kwargs):
+    """Creates the experiment tracker registered as `name` ('file' or 'mlflow')."""
+    if name not in TRACKERS:
+        raise ValueError(f"Unknown tracker '{name}'; choose from {sorted(TRACKERS)}")
+    return TRACKERS[name](**kwargs)
+
+
+def import_report(modules):
+    """
+    Measures the import time of each module in a fresh interpreter.
+
+    Returns:
+        dict: Module name to seconds, or None when it is not installed.
+    """
+    # Let the subprocess import the pipeline modules next to this file.
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [src_dir, os.environ.get("PYTHONPATH")])))
+    report = {}
+    for module in modules:
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+        report[module] = float(result.stdout) if result.returncode == 0 else None
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the import cost of each training backend.")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKEND_MODULES), default=sorted(BACKEND_MODULES),
+                        help="Backends to report on.")
+    parser.add_argument("--baseline", nargs="*", default=["pandas", "sklearn.tree", "train"],
+                        help="Modules imported regardless of backend.")
+
+    args = parser.parse_args()
+
+    print("--- Import-time report ---")
+    rows = [("baseline", module) for module in args.baseline]
+    rows += [(backend, module) for backend in args.backends for module in BACKEND_MODULES[backend]]
+    report = import_report([module for _, module in rows])
+    for owner, module in rows:
+        seconds = report[module]
+        timing = "not installed" if seconds is None else f"{seconds:.3f}s"
+        print(f"{owner:<10} {module:<28} {timing}")
+    for backend in args.backends:
+        if not BACKEND_MODULES[backend]:
+            print(f"{backend:<10} {'(no extra imports)':<28} 0.000s")
+    print("--------------------------")
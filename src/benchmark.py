@@ -0,0 +1,192 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.model_selection import train_test_split
+from sklearn.tree import DecisionTreeClassifier
+
+from check_fairness import check_model_fairness
+from check_labels import find_suspicious_labels
+from data_store import iter_chunks, load_dataset
+from drift_profile import StreamingDriftDetector, build_reference_profile
+from generate_explanation import compute_shap_values
+from synthetic_data import FEATURE_COLUMNS, generate_synthetic
+
+STAGES = ["train", "predict", "labels", "fairness", "drift", "shap"]
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+class Workload:
+    """The synthetic dataset of one size and the model trained on it."""
+
+    def __init__(self, data_path, work_dir, shap_max_rows):
+        self.data_path = data_path
+        self.model_path = os.path.join(work_dir, "model.joblib")
+        self.report_path = os.path.join(work_dir, "fairness_report.json")
+        self.shap_max_rows = shap_max_rows
+        self.data = load_dataset(data_path)
+        self.model = None
+
+    def train(self):
+        # Same split and parameters as train.py.
+        X_train, _, y_train, _ = train_test_split(
+            self.data[FEATURE_COLUMNS], self.data['species'], test_size=0.4, random_state=1
+        )
+        self.model = DecisionTreeClassifier(max_depth=4, random_state=1).fit(X_train, y_train)
+        joblib.dump(self.model, self.model_path)
+
+    def predict(self):
+        self.model.predict(self.data[FEATURE_COLUMNS])
+
+    def labels(self):
+        find_suspicious_labels(self.data_path)
+
+    def fairness(self):
+        check_model_fairness(self.model_path, self.data_path, self.report_path, chunk_size=100_000, model=self.model)
+
+    def drift(self):
+        detector = StreamingDriftDetector(build_reference_profile(self.data))
+        for chunk in iter_chunks(self.data_path, 100_000):
+            detector.update(chunk)
+
+    def shap(self):
+        compute_shap_values(self.model, self.data[FEATURE_COLUMNS].iloc[:self.shap_max_rows])
+
+
+def _measure(fn, repeat):
+    """
+    Times `fn` (best of `repeat` runs) and measures its peak traced allocation
+    in one extra run, so tracing overhead does not inflate the timings.
+    Stage output is silenced.
+    """
+    seconds = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            seconds.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return min(seconds), peak / (1024 * 1024)
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=STAGES, work_dir=".cache/benchmarks", seed=0,
+                   repeat=1, shap_max_rows=100_000):
+    """
+    Generates a synthetic dataset per size and measures every stage on it.
+
+    Datasets are reused across runs when the file for a size and seed exists.
+
+    Returns:
+        dict: Environment metadata and one result per (stage, size).
+    """
+    results = []
+    for num_rows in sizes:
+        size_dir = os.path.join(work_dir, f"{num_rows}_{seed}")
+        data_path = os.path.join(size_dir, "iris.csv")
+        if not os.path.exists(data_path):
+            generate_synthetic(num_rows, data_path, seed=seed)
+        workload = Workload(data_path, size_dir, shap_max_rows)
+        # Every later stage needs the model, so train even when it is not measured.
+        if "train" not in stages:
+            workload.train()
+        for stage in STAGES:
+            if stage not in stages:
+                continue
+            seconds, peak_mb = _measure(getattr(workload, stage), repeat)
+            results.append({"stage": stage, "rows": num_rows, "seconds": seconds, "peak_mb": peak_mb})
+            print(f"{stage:<10} {num_rows:>11,} rows  {seconds:>9.3f} s  {peak_mb:>9.1f} MB")
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "scikit-learn": sklearn.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": seed,
+            "repeat": repeat,
+            "shap_max_rows": shap_max_rows,
+        },
+        "results": results,
+    }
+
+
+def compare_results(current, baseline, threshold=0.2, min_seconds=0.05):
+    """
+    Lists the measurements that regressed against a baseline results file.
+
+    A stage regresses when its time or peak memory exceeds the baseline by
+    more than `threshold` (a fraction). Timings whose baseline is under
+    `min_seconds` are too noisy to compare and only their memory is checked.
+
+    Returns:
+        list: Description of every regression.
+    """
+    previous = {(r["stage"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        base = previous.get((result["stage"], result["rows"]))
+        if base is None:
+            continue
+        for metric, unit in (("seconds", "s"), ("peak_mb", "MB")):
+            if metric == "seconds" and base[metric] < min_seconds:
+                continue
+            if result[metric] > base[metric] * (1 + threshold):
+                regressions.append(
+                    f"{result['stage']} @ {result['rows']:,} rows: {metric} "
+                    f"{base[metric]:.3f} {unit} -> {result[metric]:.3f} {unit} "
+                    f"(+{result[metric] / base[metric] - 1:.0%})"
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data of growing size.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=DEFAULT_SIZES, help="Dataset sizes in rows (e.g. 1e3 1e6).")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="Stages to measure.")
+    parser.add_argument("--work-dir", type=str, default=".cache/benchmarks", help="Where synthetic datasets are kept.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data.")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per stage (the best is kept).")
+    parser.add_argument("--shap-max-rows", type=int, default=100_000, help="Rows explained by the SHAP stage.")
+    parser.add_argument("--output-path", type=str, default="artifacts/benchmark_results.json", help="Where to write the results.")
+    parser.add_argument("--baseline", type=str, default=None, help="Results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown or memory growth.")
+
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        sizes=[int(size) for size in args.sizes],
+        stages=args.stages,
+        work_dir=args.work_dir,
+        seed=args.seed,
+        repeat=args.repeat,
+        shap_max_rows=args.shap_max_rows,
+    )
+    os.makedirs(os.path.dirname(args.output_path) or ".", exist_ok=True)
+    with open(args.output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Benchmark results saved to {args.output_path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_results(results, json.load(f), threshold=args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.threshold:.0%} against {args.baseline}")
@@ -1,44 +1,156 @@
-from evidently import Dataset
-from evidently import DataDefinition
-from evidently import Report
-from evidently.presets import DataDriftPreset, DataSummaryPreset 
+import argparse
+import json
 import os
 import pandas as pd
 
-data = pd.read_csv('data/iris.csv')
-# Map column types for evidently
-schema = DataDefinition(
-    numerical_columns=["sepal_length","sepal_width","petal_length","petal_width"],
-    categorical_columns=["species", "location"],
+from drift_profile import (
+    CATEGORICAL_COLUMNS,
+    NUMERICAL_COLUMNS,
+    StreamingDriftDetector,
+    build_reference_profile,
+    load_profile,
+    save_profile,
+)
+from data_store import iter_chunks, load_dataset
+from hashing import file_sha256
+from instrumentation import finish, span, tracker_from_env
+from prediction_log import UNKNOWN_LOCATION, iter_prediction_chunks
+
+
+def load_or_build_profile(data_path="data/iris.csv", profile_path="artifacts/drift_profile.json", n_bins=10):
+    """
+    Returns the reference profile of `data_path`, rebuilding it only when the data changed.
+    """
+    # Bin edges sit on data values, so the profile is only valid for data
+    # loaded at the same precision as the one it was built from.
+    source = {"path": data_path, "sha256": file_sha256(data_path), "float_dtype": "float32"}
+    if os.path.exists(profile_path):
+        profile = load_profile(profile_path)
+        if profile.get("source") == source:
+            print(f"Loaded reference profile from {profile_path}")
+            return profile
+
+    print(f"Building reference profile from {data_path}...")
+    with span("profile") as s:
+        reference = load_dataset(data_path)
+        profile = build_reference_profile(reference, n_bins=n_bins, source=source)
+        s["rows"] = len(reference)
+    os.makedirs(os.path.dirname(profile_path) or ".", exist_ok=True)
+    save_profile(profile, profile_path)
+    print(f"Reference profile saved to {profile_path}")
+    return profile
+
+
+def make_new_data(data):
+    """Intentionally create unseen data by appending noisy copies of the largest flowers."""
+    noise_data = data[data['sepal_length'] > 7.5].reset_index(drop=True)
+    noise_data['sepal_length'] = 15.0
+    noise_data['species'] = 'fakeiris'
+    noise_data['petal_length'] = 100.0
+    return pd.concat([data, noise_data], ignore_index=True)
+
+
+def save_drift_report(reference, current, report_path="artifacts/drift_report.html"):
+    """Renders the full evidently drift and summary report as HTML."""
+    from evidently import Dataset
+    from evidently import DataDefinition
+    from evidently import Report
+    from evidently.presets import DataDriftPreset, DataSummaryPreset
+
+    # Map column types for evidently
+    schema = DataDefinition(
+        numerical_columns=NUMERICAL_COLUMNS,
+        categorical_columns=CATEGORICAL_COLUMNS,
     )
 
-# Intentionally create unseen data
-new_data = data.copy()
-noise_data = new_data[new_data['sepal_length']>7.5].reset_index(drop=True)
-noise_data['sepal_length']=15.0
-noise_data['species']='fakeiris'
-noise_data['petal_length']=100.0
-new_data = pd.concat([new_data,noise_data], ignore_index=True)
-new_data
-
-# Create evidently data sets, with original data as reference and new data for comparison
-eval_orig_data = Dataset.from_pandas(data, data_definition=schema)
-eval_new_data = Dataset.from_pandas(new_data, data_definition=schema)
-
-# Run drift report
-report = Report([
-    DataDriftPreset(),
-    DataSummaryPreset()
-],
-include_tests='True')
-
-my_eval = report.run(eval_new_data, eval_orig_data)
-my_eval
-
-# Save the report
-if not os.path.exists("artifacts"):
-    os.makedirs("artifacts")
-
-my_eval.save_html("artifacts/drift_report.html")
-print("Drift report saved to artifacts/drift_report.html")
-print("Drift analysis completed successfully. ✓")
\ No newline at end of file
+    # Create evidently data sets, with original data as reference and new data for comparison
+    eval_orig_data = Dataset.from_pandas(reference, data_definition=schema)
+    eval_new_data = Dataset.from_pandas(current, data_definition=schema)
+
+    # Run drift report
+    report = Report([
+        DataDriftPreset(),
+        DataSummaryPreset()
+    ],
+    include_tests='True')
+
+    my_eval = report.run(eval_new_data, eval_orig_data)
+
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    my_eval.save_html(report_path)
+    print(f"Drift report saved to {report_path}")
+
+
+def monitor_drift(chunks, profile, reference_path="data/iris.csv", window_size=1000,
+                  report_path="artifacts/drift_report.html", scores_path="artifacts/drift_scores.json",
+                  render="auto"):
+    """
+    Scores a stream of data chunks against the reference profile.
+
+    The evidently HTML report is rendered for the first window that crosses a
+    drift threshold (`render="auto"`), for the final window regardless
+    (`"always"`), or never (`"never"`).
+
+    Returns:
+        list: The scores of every window.
+    """
+    detector = StreamingDriftDetector(profile, window_size=window_size)
+    history = []
+    rendered = False
+    with span("score") as s:
+        for chunk in chunks:
+            scores = detector.update(chunk)
+            history.append(scores)
+            if scores["drift_detected"]:
+                print(f"⚠️ Drift detected after {scores['rows_seen']} rows in: {', '.join(scores['drifted_columns'])}")
+                if render == "auto" and not rendered:
+                    with span("render"):
+                        save_drift_report(load_dataset(reference_path), detector.window_frame(), report_path)
+                    rendered = True
+        s["rows"] = history[-1]["rows_seen"] if history else 0
+
+    if render == "always" and history:
+        with span("render"):
+            save_drift_report(load_dataset(reference_path), detector.window_frame(), report_path)
+
+    os.makedirs(os.path.dirname(scores_path) or ".", exist_ok=True)
+    with open(scores_path, "w") as f:
+        json.dump(history, f, indent=2)
+    print(f"Drift scores for {len(history)} windows saved to {scores_path}")
+    return history
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect data drift against a precomputed reference profile.")
+    parser.add_argument("--data-path", type=str, default="data/iris.csv", help="Reference data the profile is built from.")
+    parser.add_argument("--current-path", type=str, default=None,
+                        help="CSV of incoming data to score (default: synthetic drifted copy of the reference).")
+    parser.add_argument("--prediction-log", type=str, default=None,
+                        help="Score the traffic recorded by serve.py --prediction-log-dir instead of a CSV.")
+    parser.add_argument("--profile-path", type=str, default="artifacts/drift_profile.json", help="Where the reference profile is kept.")
+    parser.add_argument("--window-size", type=int, default=1000, help="Rows in the sliding scoring window.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows read per update of the window.")
+    parser.add_argument("--render", choices=["auto", "always", "never"], default="auto",
+                        help="When to render the evidently HTML report.")
+
+    args = parser.parse_args()
+
+    profile = load_or_build_profile(args.data_path, args.profile_path)
+    if args.prediction_log:
+        # Logged 'species' is the predicted label, so drift in it is prediction drift.
+        # Rows logged without a location leave that column out of the scores.
+        chunks = (
+            chunk.assign(location=chunk["location"].astype(object).where(chunk["location"] != UNKNOWN_LOCATION))
+            for chunk in iter_prediction_chunks(args.prediction_log, args.chunk_size)
+        )
+    elif args.current_path:
+        chunks = iter_chunks(args.current_path, args.chunk_size)
+    else:
+        with span("load"):
+            new_data = make_new_data(load_dataset(args.data_path))
+        chunks = (new_data.iloc[i:i + args.chunk_size] for i in range(0, len(new_data), args.chunk_size))
+
+    monitor_drift(chunks, profile, args.data_path, window_size=args.window_size, render=args.render)
+    print("Drift analysis completed successfully. ✓")
+    finish("check_drift", tracker=tracker_from_env())
+
@@ -1,89 +1,195 @@
 import pandas as pd
-import joblib
 import json
 import os
-from fairlearn.metrics import MetricFrame, demographic_parity_difference
+import argparse
 
+from data_store import iter_chunks
+from fairness_bootstrap import bootstrap_fairness
+from fairness_stats import FairnessAccumulator
+from instrumentation import finish, span, tracker_from_env
+from model_format import load_model
+from prediction_log import UNKNOWN_LOCATION, iter_prediction_chunks
 
-def check_model_fairness():
+
+def accumulate_fairness(model, chunks, sensitive_feature='location'):
     """
-    Loads the trained model and assesses its fairness for all classes based 
+    Predicts each chunk and folds it into a FairnessAccumulator.
+
+    Args:
+        model: Fitted classifier with `classes_`.
+        chunks (iterable): DataFrames with the model features, 'species' and the sensitive feature.
+        sensitive_feature (str): Column holding the group of each row.
+
+    Returns:
+        FairnessAccumulator: Counts over every chunk.
+    """
+    accumulator = FairnessAccumulator(model.classes_)
+    for chunk in chunks:
+        # Get features the model was trained on
+        expected_features = getattr(
+            model, 'feature_names_in_',
+            chunk.drop(columns=['species', sensitive_feature]).columns
+        )
+        y_pred = model.predict(chunk[expected_features])
+        accumulator.update(chunk['species'], y_pred, chunk[sensitive_feature])
+    return accumulator
+
+
+def accumulate_logged_fairness(chunks, sensitive_feature='location'):
+    """
+    Folds logged predictions into a FairnessAccumulator.
+
+    Served traffic has no true labels, so only selection rates and the
+    demographic parity differences are meaningful. Rows logged without a
+    location are skipped.
+
+    Raises:
+        FileNotFoundError: When the log holds no predictions.
+        ValueError: When no logged row carries a location.
+
+    Args:
+        chunks (iterable): DataFrames from prediction_log.iter_prediction_chunks.
+    """
+    accumulator = None
+    skipped = 0
+    for chunk in chunks:
+        if accumulator is None:
+            classes = [c[len("proba_"):] for c in chunk.columns if c.startswith("proba_")]
+            accumulator = FairnessAccumulator(classes)
+        known = chunk[sensitive_feature] != UNKNOWN_LOCATION
+        skipped += int((~known).sum())
+        chunk = chunk[known]
+        accumulator.update(None, chunk['species'], chunk[sensitive_feature])
+    if accumulator is None:
+        raise FileNotFoundError("No logged predictions found")
+    if not accumulator.groups:
+        raise ValueError(f"No logged rows carry a {sensitive_feature} ({skipped} logged without one); "
+                         f"send '{sensitive_feature}' with each instance to assess fairness on served traffic.")
+    return accumulator
+
+
+def check_model_fairness(model_path="artifacts/model.joblib", data_path="data/iris.csv",
+                         report_path="artifacts/fairness_report.json", chunk_size=None,
+                         bootstrap=0, confidence=0.95, seed=0, n_jobs=-1, ci_path="artifacts/fairness_ci.json",
+                         model=None, prediction_log=None):
+    """
+    Loads the trained model and assesses its fairness for all classes based
     on the 'location' sensitive feature.
+
+    The data is scored chunk by chunk into per-(group, true class, predicted
+    class) counts, from which every metric is derived in one shot. With
+    `bootstrap` > 0, confidence intervals for every per-class DPD and
+    per-group accuracy are written to `ci_path`. An already loaded `model`
+    is used instead of reading `model_path`. With `prediction_log`, the
+    predictions recorded by serve.py in that directory are scored instead
+    of the model on `data_path`.
     """
     print("--- Checking Model Fairness ---")
+    with span("fairness"):
+        return _check_fairness(model, model_path, data_path, report_path, chunk_size,
+                               bootstrap, confidence, seed, n_jobs, ci_path, prediction_log)
 
+
+def _score_data(model, model_path, data_path, chunk_size):
+    """Scores `data_path` with the model; None after reporting a loading error."""
     try:
-        # Load model and data
-        model = joblib.load("artifacts/model.joblib")
-        df = pd.read_csv("data/iris.csv")
+        # Load model and check the data schema
+        with span("load_model"):
+            model = model if model is not None else load_model(model_path)
+        columns = pd.read_csv(data_path, nrows=0).columns
 
-        if 'location' not in df.columns:
+        if 'location' not in columns:
             print("❌ Error: 'location' column not found in data. Please run induce_bias.py first.")
             return
 
-        # Get features the model was trained on
-        expected_features = getattr(
-            model, 'feature_names_in_',
-            df.drop(columns=['species', 'location']).columns
-        )
-
-        X = df[expected_features]
-        y_true = df['species']
-        sensitive_feature = df['location']
+        with span("predict") as s:
+            accumulator = accumulate_fairness(model, iter_chunks(data_path, chunk_size))
+            s["rows"] = int(accumulator.counts.sum())
 
         print("✅ Model and data with 'location' feature loaded.")
     except (FileNotFoundError, AttributeError, KeyError, Exception) as e:
         print(f"❌ Error during data/model loading: {e}")
         return
+    return accumulator
+
+
+def _check_fairness(model, model_path, data_path, report_path, chunk_size, bootstrap, confidence, seed, n_jobs,
+                    ci_path, prediction_log):
+    if prediction_log is not None:
+        try:
+            with span("load_log") as s:
+                accumulator = accumulate_logged_fairness(iter_prediction_chunks(prediction_log, chunk_size))
+                s["rows"] = int(accumulator.counts.sum())
+        except (FileNotFoundError, ValueError) as e:
+            print(f"❌ Error reading the prediction log: {e}")
+            return
+        print(f"✅ {int(accumulator.counts.sum())} logged predictions loaded from {prediction_log}.")
+    else:
+        accumulator = _score_data(model, model_path, data_path, chunk_size)
+        if accumulator is None:
+            return
 
-    # Predict with the model
-    y_pred = model.predict(X)
-
-    # MetricFrame metrics (selection_rate is for 'versicolor' as an example)
-    metrics = {
-        'accuracy': lambda y_true, y_pred: (y_true == y_pred).mean(),
-        'selection_rate_versicolor': lambda y_true, y_pred: (y_pred == 'Versicolor').mean()
-    }
-
-    grouped_metrics = MetricFrame(
-        metrics=metrics,
-        y_true=y_true,
-        y_pred=y_pred,
-        sensitive_features=sensitive_feature
-    )
+    with span("metric_frame"):
+        by_group = accumulator.by_group(name='location')
+        # Demographic parity difference for each class
+        fairness_report = accumulator.report()
+    if prediction_log is not None:
+        # Without true labels every prediction counts as wrong.
+        by_group = by_group.drop(columns="accuracy")
 
     print("\n📊 Fairness metrics by 'location' group:")
-    print(grouped_metrics.by_group)
-
-    # Compute demographic parity difference for each class
-    fairness_report = {}
-    print("\n📏 Calculating Demographic Parity Difference per class...")
-    for cls in model.classes_:
-        metric_name = f"demographic_parity_difference_{cls}"
-
-        # Manually create binary arrays for compatibility
-        y_true_binary = (y_true == cls)
-        y_pred_binary = (y_pred == cls)
-
-        dpd = demographic_parity_difference(
-            y_true_binary,
-            y_pred_binary,
-            sensitive_features=sensitive_feature
-        )
-        fairness_report[metric_name] = dpd
+    print(by_group.to_string())
 
     print("\n✅ Overall Fairness Report:")
     print(json.dumps(fairness_report, indent=2))
 
     # Save report to JSON file
-    os.makedirs("artifacts", exist_ok=True)
-    report_path = "artifacts/fairness_report.json"
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
     with open(report_path, "w") as f:
         json.dump(fairness_report, f, indent=4)
 
     print(f"\n💾 Fairness report saved to: {report_path}")
+
+    if bootstrap > 0:
+        print(f"\n🔁 Bootstrapping {bootstrap} replicates for {confidence:.0%} confidence intervals...")
+        with span("bootstrap", rows=bootstrap):
+            intervals = bootstrap_fairness(accumulator, bootstrap, confidence=confidence, seed=seed, n_jobs=n_jobs)
+        print(json.dumps(intervals, indent=2))
+        with open(ci_path, "w") as f:
+            json.dump(intervals, f, indent=4)
+        print(f"💾 Confidence intervals saved to: {ci_path}")
+
     print("-----------------------------\n")
+    return fairness_report
 
 
 if __name__ == "__main__":
-    check_model_fairness()
+    parser = argparse.ArgumentParser(description="Assess model fairness across 'location' groups.")
+    parser.add_argument("--model-path", type=str, default="artifacts/model.joblib", help="Path to the model artifact (.joblib, or .tree to memory-map it).")
+    parser.add_argument("--data-path", type=str, default="data/iris.csv", help="Path to the input CSV file.")
+    parser.add_argument("--report-path", type=str, default="artifacts/fairness_report.json", help="Where to save the report.")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows scored per chunk.")
+    parser.add_argument("--bootstrap", type=int, default=0, help="Number of bootstrap replicates for confidence intervals (0 disables).")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of the bootstrap intervals.")
+    parser.add_argument("--seed", type=int, default=0, help="Root seed for the bootstrap replicates.")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Worker processes for the bootstrap (-1 for all cores).")
+    parser.add_argument("--ci-path", type=str, default="artifacts/fairness_ci.json", help="Where to save the confidence intervals.")
+    parser.add_argument("--prediction-log", type=str, default=None,
+                        help="Score the traffic recorded by serve.py --prediction-log-dir instead of --data-path.")
+
+    args = parser.parse_args()
+
+    check_model_fairness(
+        args.model_path,
+        args.data_path,
+        args.report_path,
+        args.chunk_size,
+        bootstrap=args.bootstrap,
+        confidence=args.confidence,
+        seed=args.seed,
+        n_jobs=args.n_jobs,
+        ci_path=args.ci_path,
+        prediction_log=args.prediction_log,
+    )
+    finish("check_fairness", tracker=tracker_from_env())
+
@@ -2,10 +2,73 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.neighbors import KNeighborsClassifier
+from joblib import Parallel, delayed
+from sklearn.neighbors import NearestNeighbors
 import argparse
 
-def find_suspicious_labels(data_path, k=5, threshold=0.5):
+from data_store import load_dataset
+
+# Index backends accepted by scikit-learn's neighbor search.
+ALGORITHMS = ("auto", "kd_tree", "ball_tree", "brute")
+
+
+def _mismatch_counts(index, X, codes, start, stop):
+    """
+    Counts, for rows [start, stop), how many of their k nearest neighbors
+    carry a different label code.
+
+    Only the neighbor indices of the current chunk are materialized, so the
+    peak memory is chunk_size * (k + 1) integers regardless of dataset size.
+    """
+    indices = index.kneighbors(X[start:stop], return_distance=False)
+    # Column 0 is the query point itself; compare the remaining k columns
+    # against the row's own label in a single array operation.
+    neighbor_codes = codes[indices[:, 1:]]
+    return (neighbor_codes != codes[start:stop, None]).sum(axis=1)
+
+
+def suspicious_label_mask(X, y, k=5, threshold=0.5, chunk_size=None, n_jobs=1, algorithm="auto"):
+    """
+    Flags rows whose label disagrees with at least `threshold` of their k-nearest neighbors.
+
+    Args:
+        X (array-like): Feature matrix used for the neighbor search.
+        y (array-like): Labels, one per row of X.
+        k (int): Number of neighbors to consider.
+        threshold (float): Fraction of neighbors that must disagree to flag a point.
+        chunk_size (int, optional): Number of query rows per chunk. Defaults to all rows at once.
+        n_jobs (int): Number of chunks evaluated in parallel (-1 uses all cores).
+        algorithm (str): Neighbor index backend, one of ALGORITHMS. Backends may order
+            equidistant neighbors differently; 'auto' matches KNeighborsClassifier.
+
+    Returns:
+        numpy.ndarray: Boolean mask, True for rows with suspicious labels.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"algorithm must be one of {ALGORITHMS}, got {algorithm!r}")
+
+    X = np.asarray(X)
+    codes, _ = pd.factorize(np.asarray(y))
+    num_rows = len(X)
+    chunk_size = chunk_size or num_rows
+
+    # We ask for k+1 neighbors because the closest neighbor to any point is the point itself.
+    index = NearestNeighbors(n_neighbors=k + 1, algorithm=algorithm)
+    index.fit(X)
+
+    # Threads share the fitted index instead of pickling it into every worker;
+    # the neighbor queries release the GIL for the heavy lifting.
+    bounds = [(start, min(start + chunk_size, num_rows)) for start in range(0, num_rows, chunk_size)]
+    counts = Parallel(n_jobs=n_jobs, prefer="threads")(
+        delayed(_mismatch_counts)(index, X, codes, start, stop) for start, stop in bounds
+    )
+    num_mismatched = np.concatenate(counts) if counts else np.zeros(0, dtype=int)
+
+    # Check if the mismatch ratio exceeds our threshold
+    return (num_mismatched / k) >= threshold
+
+
+def find_suspicious_labels(data_path, k=5, threshold=0.5, chunk_size=None, n_jobs=1, algorithm="auto"):
     """
     Analyzes a dataset to find rows with potentially flipped labels using KNN.
 
@@ -16,53 +79,39 @@ def find_suspicious_labels(data_path, k=5, threshold=0.5):
         data_path (str): Path to the CSV data file.
         k (int): Number of neighbors to consider.
         threshold (float): Fraction of neighbors that must disagree to flag a point (e.g., 0.5 means 50% or more).
+        chunk_size (int, optional): Number of rows queried per chunk; bounds the memory of the neighbor matrix.
+        n_jobs (int): Number of chunks processed in parallel (-1 uses all cores).
+        algorithm (str): Neighbor index backend ('auto', 'kd_tree', 'ball_tree' or 'brute').
 
     Returns:
         list: A list of indices for rows with suspicious labels.
     """
     print(f"Checking for suspicious labels in: {data_path}")
     print(f"Using k={k} and threshold={threshold}\n")
-    
-    # Load the data
-    df = pd.read_csv(data_path)
+
+    # Load the data; distances are computed at full CSV precision so that
+    # ties between equidistant neighbors break the same way as before.
+    df = load_dataset(data_path, float_dtype=np.float64)
     X = df.drop(columns=['species'])
     y = df['species']
 
-    # We use KNeighborsClassifier as a convenient way to find neighbors.
-    # We ask for k+1 neighbors because the closest neighbor to any point is the point itself.
-    knn = KNeighborsClassifier(n_neighbors=k + 1)
-    knn.fit(X, y)
-
-    # Find the k+1 nearest neighbors for every point in the dataset.
-    # The 'indices' array will contain the row index of each neighbor.
-    distances, indices = knn.kneighbors(X)
-    # print(f"dfldjdlj:: {distances} and indics :: {indices}")
-    # return
-
-    suspicious_indices = []
-    # Iterate through each data point
-    for i in range(len(df)):
-        original_label = y.iloc[i]
-        
-        # Get the labels of the k *other* neighbors (exclude the point itself, which is at index 0)
-        neighbor_indices = indices[i][1:]
-        neighbor_labels = y.iloc[neighbor_indices]
-        
-        # Count how many neighbors have a different label
-        num_mismatched = np.sum(neighbor_labels != original_label)
-        
-        # Check if the mismatch ratio exceeds our threshold
-        if (num_mismatched / k) >= threshold:
-            suspicious_indices.append(i)
-            # Optional: Print details for each suspicious point found
-            # print(f"  - Row {i} is suspicious. Label is '{original_label}', but {num_mismatched}/{k} neighbors disagree.")
+    mask = suspicious_label_mask(
+        X.to_numpy(dtype=np.float64),
+        y.to_numpy(),
+        k=k,
+        threshold=threshold,
+        chunk_size=chunk_size,
+        n_jobs=n_jobs,
+        algorithm=algorithm,
+    )
+    suspicious_indices = np.flatnonzero(mask).tolist()
 
     print(f"\n--- Report ---")
     print(f"Found {len(suspicious_indices)} suspicious labels out of {len(df)} total rows.")
     if suspicious_indices:
         print(f"Suspicious row indices: {suspicious_indices}")
     print("--------------")
-    
+
     return suspicious_indices
 
 if __name__ == "__main__":
@@ -70,7 +119,17 @@ if __name__ == "__main__":
     parser.add_argument("--data-path", type=str, required=True, help="Path to the input CSV file to check.")
     parser.add_argument("--k", type=int, default=5, help="Number of nearest neighbors to check against.")
     parser.add_argument("--threshold", type=float, default=0.5, help="Fraction of neighbors that must disagree to flag a point.")
-    
+    parser.add_argument("--chunk-size", type=int, default=None, help="Rows queried per chunk (default: all rows at once).")
+    parser.add_argument("--n-jobs", type=int, default=1, help="Number of chunks processed in parallel (-1 for all cores).")
+    parser.add_argument("--algorithm", type=str, default="auto", choices=ALGORITHMS, help="Nearest-neighbor index backend.")
+
     args = parser.parse_args()
 
-    find_suspicious_labels(data_path=args.data_path, k=args.k, threshold=args.threshold)
+    find_suspicious_labels(
+        data_path=args.data_path,
+        k=args.k,
+        threshold=args.threshold,
+        chunk_size=args.chunk_size,
+        n_jobs=args.n_jobs,
+        algorithm=args.algorithm,
+    )
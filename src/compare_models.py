@@ -0,0 +1,209 @@
+import argparse
+import glob
+import json
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from data_store import dataset_key, load_dataset
+from evaluate import ConfusionAccumulator
+from fairness_stats import FairnessAccumulator
+from model_format import load_model
+
+SPLIT_MANIFEST = "artifacts/split_manifest.json"
+MODEL_ARTIFACT = "artifacts/model.joblib"
+
+
+def load_or_create_split(data_path="data/iris.csv", manifest_path=SPLIT_MANIFEST, test_size=0.4, random_state=1):
+    """
+    Returns the test-row indices of `data_path`, persisted next to a manifest.
+
+    The split is train.py's holdout (same test size and seed), so no model
+    trained by train.py is scored on its own training rows. It is computed
+    once per dataset version (keyed by its content md5) and stored as a .npy of
+    row indices, so every comparison scores exactly the same rows.
+
+    Returns:
+        numpy.ndarray: Sorted test-row indices.
+    """
+    key = dataset_key(data_path)
+    index_path = os.path.splitext(manifest_path)[0] + "_test_index.npy"
+    if os.path.exists(manifest_path) and os.path.exists(index_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if (manifest["data_key"], manifest["test_size"], manifest["random_state"]) == (key, test_size, random_state):
+            print(f"Loaded split manifest from {manifest_path}")
+            return np.load(index_path)
+
+    num_rows = len(load_dataset(data_path, columns=["species"]))
+    # The shuffle depends only on the row count and seed, so this selects the
+    # same rows as train.py's train_test_split(X, y, ...).
+    _, test_index = train_test_split(np.arange(num_rows), test_size=test_size, random_state=random_state)
+    test_index = np.sort(test_index)
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    np.save(index_path, test_index)
+    manifest = {
+        "data_path": data_path,
+        "data_key": key,
+        "rows": num_rows,
+        "test_size": test_size,
+        "random_state": random_state,
+        "holdout_of": "src/train.py",
+        "test_rows": len(test_index),
+        "test_index_path": index_path,
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Split manifest saved to {manifest_path}")
+    return test_index
+
+
+def resolve_model(spec, mlruns_dir="mlruns", work_dir=None):
+    """
+    Turns a model spec into a local artifact path.
+
+    Specs are a file path (.joblib or .tree); 'runs:/<run_id>[/<artifact path>]'
+    for a run logged to the local tracking directory (default artifact path
+    'iris_model'); or 'rev:<git rev>[:<path>]' for an artifact at a Git tag
+    or commit (default artifacts/model.joblib), read with `git show` or,
+    for DVC-tracked and empty placeholder files, `dvc get`.
+    """
+    if spec.startswith("runs:/"):
+        run_id, _, artifact_path = spec[len("runs:/"):].partition("/")
+        for name in ("model.joblib", "model.pkl"):
+            matches = glob.glob(os.path.join(mlruns_dir, "*", run_id, "artifacts", artifact_path or "iris_model", name))
+            if matches:
+                return matches[0]
+        raise FileNotFoundError(f"No model artifact for {spec} under {mlruns_dir}")
+
+    if spec.startswith("rev:"):
+        rev, _, path = spec[len("rev:"):].partition(":")
+        path = path or MODEL_ARTIFACT
+        target = os.path.join(work_dir or tempfile.mkdtemp(), f"{rev.replace('/', '_')}-{os.path.basename(path)}")
+        shown = subprocess.run(["git", "show", f"{rev}:{path}"], capture_output=True)
+        # An empty blob is a placeholder for a DVC-tracked artifact, not a model.
+        if shown.returncode == 0 and shown.stdout:
+            with open(target, "wb") as f:
+                f.write(shown.stdout)
+            return target
+        try:
+            subprocess.run(["dvc", "get", ".", path, "--rev", rev, "-o", target, "--force"], check=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            reason = "is empty in git" if shown.returncode == 0 else "is not in git"
+            raise FileNotFoundError(f"{path} at {rev} {reason} and could not be fetched with dvc get: {e}") from e
+        if os.path.getsize(target) == 0:
+            raise FileNotFoundError(f"{path} at {rev} is an empty file; pass rev:{rev}:<path> of a saved model.")
+        return target
+
+    if not os.path.exists(spec):
+        raise FileNotFoundError(f"Model artifact not found: {spec}")
+    return spec
+
+
+def parse_model_args(values):
+    """Splits 'name=spec' arguments; unnamed specs are named after themselves."""
+    models = {}
+    for value in values:
+        name, sep, spec = value.partition("=")
+        models[name if sep else value] = spec if sep else value
+    return models
+
+
+def _score(name, model, X, y, groups):
+    """Accuracy, per-class F1 and per-class DPD of one model on the shared test rows."""
+    start = time.perf_counter()
+    y_pred = model.predict(X[list(model.feature_names_in_)] if hasattr(model, "feature_names_in_") else X)
+    seconds = time.perf_counter() - start
+
+    report = ConfusionAccumulator(model.classes_).update(y, y_pred).report()
+    row = {"model": name, "accuracy": report["accuracy"]}
+    for cls in model.classes_:
+        row[f"f1_{cls}"] = report[str(cls)]["f1-score"]
+    row["f1_macro"] = report["macro avg"]["f1-score"]
+    if groups is not None:
+        fairness = FairnessAccumulator(model.classes_).update(y, y_pred, groups).report()
+        row.update({key.replace("demographic_parity_difference", "dpd"): value for key, value in fairness.items()})
+    row["batch_us_per_row"] = seconds / len(X) * 1e6
+    return row
+
+
+def _latency(model, X, num_requests=200):
+    """Median and 99th percentile wall time of single-row predictions, in milliseconds."""
+    rows = [X.iloc[[i % len(X)]] for i in range(num_requests)]
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"latency_p50_ms": float(np.percentile(timings, 50)), "latency_p99_ms": float(np.percentile(timings, 99))}
+
+
+def compare_models(models, data_path="data/iris.csv", manifest_path=SPLIT_MANIFEST, max_workers=None,
+                   latency_requests=200):
+    """
+    Scores several model versions side by side on one shared test split.
+
+    The dataset and split are loaded once. The test rows are gathered into
+    one read-only frame that every model reads, and models are scored
+    concurrently on a thread pool. Tree prediction runs in compiled code, so
+    the threads overlap without copying the data. Single-row latency is
+    measured afterwards, one model at a time, so models don't slow each
+    other's timings.
+
+    Args:
+        models (dict): Display name to model spec (see resolve_model).
+        max_workers (int, optional): Models scored at once (default: one per model).
+        latency_requests (int): Single-row predictions timed per model (0 skips it).
+
+    Returns:
+        pandas.DataFrame: One row per model with accuracy, per-class and macro
+        F1, per-class DPD across 'location' and inference latency.
+    """
+    data = load_dataset(data_path)
+    test_index = load_or_create_split(data_path, manifest_path)
+    X = data.drop(columns=["species", "location"], errors="ignore").iloc[test_index].reset_index(drop=True)
+    y = np.asarray(data["species"].iloc[test_index].astype(str))
+    groups = np.asarray(data["location"].iloc[test_index]) if "location" in data.columns else None
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        loaded = {name: load_model(resolve_model(spec, work_dir=work_dir)) for name, spec in models.items()}
+    print(f"Scoring {len(loaded)} models on {len(test_index)} shared test rows (train.py's holdout)...")
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(loaded)) as pool:
+        rows = list(pool.map(lambda item: _score(item[0], item[1], X, y, groups), loaded.items()))
+    if latency_requests:
+        for row in rows:
+            row.update(_latency(loaded[row["model"]], X, latency_requests))
+    return pd.DataFrame(rows).set_index("model")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare model versions side by side on one shared test split.")
+    parser.add_argument("models", nargs="+",
+                        help="Model specs, optionally named as name=spec: a path, runs:/<run_id> or rev:<tag>[:<path>].")
+    parser.add_argument("--data-path", type=str, default="data/iris.csv", help="Data whose train.py holdout split is scored.")
+    parser.add_argument("--split-manifest", type=str, default=SPLIT_MANIFEST, help="Where the split indices are persisted.")
+    parser.add_argument("--max-workers", type=int, default=None, help="Models scored concurrently (default: all).")
+    parser.add_argument("--latency-requests", type=int, default=200, help="Single-row predictions timed per model (0 skips).")
+    parser.add_argument("--output-path", type=str, default="artifacts/model_comparison.csv", help="Where to save the table.")
+
+    args = parser.parse_args()
+
+    table = compare_models(
+        parse_model_args(args.models),
+        data_path=args.data_path,
+        manifest_path=args.split_manifest,
+        max_workers=args.max_workers,
+        latency_requests=args.latency_requests,
+    )
+    os.makedirs(os.path.dirname(args.output_path) or ".", exist_ok=True)
+    table.to_csv(args.output_path)
+    print("\n--- Model comparison ---")
+    print(table.round(4).T.to_string())
+    print(f"\nComparison saved to {args.output_path}")
@@ -0,0 +1,213 @@
+# data_store.py
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from hashing import file_md5
+
+CACHE_DIR = ".cache/datasets"
+CATEGORICAL_COLUMNS = ["species", "location"]
+# Rows parsed per pass when converting a CSV into the cache.
+CONVERT_CHUNK_SIZE = 1_000_000
+# Content hashes of CSVs, keyed by path and validated against their stat.
+HASH_INDEX = "hashes.json"
+
+
+def dataset_key(csv_path, cache_dir=CACHE_DIR):
+    """
+    Returns the md5 of a CSV's content, the same hash DVC records for it.
+
+    Hashes are remembered in `<cache_dir>/hashes.json` against the file's
+    size, modification time and inode, as DVC's own state cache does, so an
+    unchanged file is hashed only once. Any edit, even one that keeps the
+    byte size, changes the modification time and is rehashed.
+    """
+    stat = os.stat(csv_path)
+    fingerprint = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+    index_path = os.path.join(cache_dir, HASH_INDEX)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    entry = index.get(os.path.abspath(csv_path))
+    if entry and entry["stat"] == fingerprint:
+        return entry["md5"]
+
+    md5 = file_md5(csv_path)
+    index[os.path.abspath(csv_path)] = {"stat": fingerprint, "md5": md5}
+    os.makedirs(cache_dir, exist_ok=True)
+    # Stages hash concurrently; each writes a private file and swaps it in.
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+    return md5
+
+
+def _convert(csv_path, target_dir, float_dtype=np.float32):
+    """
+    Converts a CSV into one .npy file per column plus a meta.json.
+
+    Numeric columns are stored as `float_dtype` and CATEGORICAL_COLUMNS (and
+    any text column) as integer codes. The CSV is parsed in two chunked passes,
+    one to size the arrays and collect categories and one to fill them, so
+    conversion runs in bounded memory. A column that parses as text in any
+    chunk is read as text throughout; when an earlier chunk parsed it as
+    numbers, its categories are collected again in a pass over that column.
+    """
+    num_rows = 0
+    kinds = {}
+    categories = {}
+    text = set()
+    parsed_numeric = set()
+    for chunk in pd.read_csv(csv_path, chunksize=CONVERT_CHUNK_SIZE):
+        num_rows += len(chunk)
+        for col in chunk.columns:
+            numeric = pd.api.types.is_numeric_dtype(chunk[col])
+            if numeric:
+                parsed_numeric.add(col)
+            else:
+                text.add(col)
+            if col in CATEGORICAL_COLUMNS or not numeric:
+                kinds[col] = "categorical"
+                categories.setdefault(col, set()).update(chunk[col].dropna().unique().tolist())
+            else:
+                kinds.setdefault(col, "numeric")
+    dtypes = {col: str for col in text}
+    # Values parsed as numbers before the column turned out to be text.
+    rescan = sorted(text & parsed_numeric)
+    if rescan:
+        categories.update({col: set() for col in rescan})
+        for chunk in pd.read_csv(csv_path, chunksize=CONVERT_CHUNK_SIZE, usecols=rescan, dtype=str):
+            for col in rescan:
+                categories[col].update(chunk[col].dropna().unique().tolist())
+    columns = list(kinds)
+    categories = {col: sorted(values) for col, values in categories.items()}
+
+    arrays = {}
+    for col in columns:
+        if kinds[col] == "numeric":
+            dtype = float_dtype
+        else:
+            dtype = np.int8 if len(categories[col]) < 127 else np.int32
+        arrays[col] = np.lib.format.open_memmap(
+            os.path.join(target_dir, f"{col}.npy"), mode="w+", dtype=dtype, shape=(num_rows,)
+        )
+
+    start = 0
+    for chunk in pd.read_csv(csv_path, chunksize=CONVERT_CHUNK_SIZE, dtype=dtypes):
+        stop = start + len(chunk)
+        for col in columns:
+            if kinds[col] == "numeric":
+                arrays[col][start:stop] = chunk[col].to_numpy(dtype=float_dtype)
+            else:
+                arrays[col][start:stop] = pd.Categorical(chunk[col], categories=categories[col]).codes
+        start = stop
+    for array in arrays.values():
+        array.flush()
+
+    meta = {"source": csv_path, "rows": num_rows, "columns": columns, "kinds": kinds, "categories": categories}
+    with open(os.path.join(target_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def ensure_cached(csv_path="data/iris.csv", cache_dir=CACHE_DIR, float_dtype=np.float32):
+    """
+    Returns the cache directory of `csv_path`, converting the CSV on first use.
+
+    Returns:
+        str: Directory holding the column files and meta.json.
+    """
+    float_dtype = np.dtype(float_dtype)
+    suffix = "" if float_dtype == np.float32 else f"-{float_dtype.name}"
+    target_dir = os.path.join(cache_dir, dataset_key(csv_path, cache_dir) + suffix)
+    if os.path.exists(os.path.join(target_dir, "meta.json")):
+        return target_dir
+
+    print(f"Converting {csv_path} into the columnar cache...")
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-")
+    try:
+        _convert(csv_path, tmp_dir, float_dtype)
+        os.replace(tmp_dir, target_dir)
+    except OSError:
+        # Another process finished the same conversion first.
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.exists(os.path.join(target_dir, "meta.json")):
+            raise
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return target_dir
+
+
+def load_arrays(csv_path="data/iris.csv", columns=None, mmap=True, cache_dir=CACHE_DIR, float_dtype=np.float32):
+    """
+    Loads columns of a dataset as NumPy arrays from the columnar cache.
+
+    Categorical columns are returned as integer codes; their categories are
+    in the returned metadata.
+
+    Returns:
+        tuple: (dict of column name to array, metadata dict)
+    """
+    target_dir = ensure_cached(csv_path, cache_dir, float_dtype)
+    with open(os.path.join(target_dir, "meta.json")) as f:
+        meta = json.load(f)
+    columns = meta["columns"] if columns is None else list(columns)
+    mmap_mode = "r" if mmap else None
+    arrays = {col: np.load(os.path.join(target_dir, f"{col}.npy"), mmap_mode=mmap_mode) for col in columns}
+    return arrays, meta
+
+
+def _frame(arrays, meta, rows=slice(None)):
+    data = {}
+    for col, array in arrays.items():
+        if meta["kinds"][col] == "categorical":
+            data[col] = pd.Categorical.from_codes(np.asarray(array[rows]), categories=meta["categories"][col])
+        else:
+            data[col] = array[rows]
+    return pd.DataFrame(data, copy=False)
+
+
+def load_dataset(csv_path="data/iris.csv", columns=None, mmap=True, cache_dir=CACHE_DIR, float_dtype=np.float32):
+    """
+    Loads a dataset through the columnar cache.
+
+    Numeric columns are float32 (memory-mapped when `mmap` is True) and
+    categorical columns such as 'species' and 'location' are pandas
+    categoricals. The CSV is only parsed the first time a given content hash
+    is seen.
+
+    Args:
+        csv_path (str): Path to the source CSV.
+        columns (list, optional): Subset of columns to load.
+        mmap (bool): Memory-map the column files instead of reading them.
+        float_dtype: Storage type of numeric columns. Stages whose results depend
+            on full CSV precision (e.g. KNN distance ties) can request float64.
+
+    Returns:
+        pandas.DataFrame: The dataset.
+    """
+    arrays, meta = load_arrays(csv_path, columns, mmap, cache_dir, float_dtype)
+    return _frame(arrays, meta)
+
+
+def iter_chunks(csv_path="data/iris.csv", chunk_size=None, columns=None, cache_dir=CACHE_DIR):
+    """
+    Yields a cached dataset as DataFrame chunks of `chunk_size` rows (all rows when None).
+
+    Only the rows of the current chunk are paged in from the memory-mapped columns.
+    """
+    arrays, meta = load_arrays(csv_path, columns, True, cache_dir)
+    num_rows = meta["rows"]
+    chunk_size = chunk_size or max(num_rows, 1)
+    for start in range(0, num_rows, chunk_size):
+        yield _frame(arrays, meta, slice(start, start + chunk_size))
@@ -0,0 +1,178 @@
+# drift_profile.py
+
+import json
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Column schema, shared with the evidently DataDefinition in check_drift.py.
+NUMERICAL_COLUMNS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+CATEGORICAL_COLUMNS = ["species", "location"]
+
+# Smoothing for empty bins so PSI and chi-square stay finite.
+EPSILON = 1e-4
+
+
+def build_reference_profile(reference, n_bins=10, source=None):
+    """
+    Summarizes reference data into a compact, JSON-serializable profile.
+
+    Numerical columns keep quantile bin edges and the reference share of each
+    bin; categorical columns keep the reference frequency of each category.
+
+    Args:
+        reference (pandas.DataFrame): The reference data.
+        n_bins (int): Number of quantile bins per numerical column.
+        source (dict, optional): Provenance recorded in the profile (e.g. path and hash).
+
+    Returns:
+        dict: The reference profile.
+    """
+    profile = {"rows": int(len(reference)), "source": source or {}, "numerical": {}, "categorical": {}}
+    quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+    for col in NUMERICAL_COLUMNS:
+        values = reference[col].to_numpy(dtype=np.float64)
+        edges = np.unique(np.quantile(values, quantiles))
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        profile["numerical"][col] = {"edges": edges.tolist(), "proportions": (counts / counts.sum()).tolist()}
+    for col in CATEGORICAL_COLUMNS:
+        freqs = reference[col].astype(str).value_counts(normalize=True).sort_index()
+        profile["categorical"][col] = {"categories": freqs.index.tolist(), "proportions": freqs.tolist()}
+    return profile
+
+
+def save_profile(profile, path):
+    with open(path, "w") as f:
+        json.dump(profile, f, indent=2)
+
+
+def load_profile(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class StreamingDriftDetector:
+    """
+    Scores incoming data against a reference profile over a sliding window.
+
+    Every row is reduced to one bin / category code per column. The window
+    is a fixed-size ring buffer of those codes plus running per-bin counts,
+    so memory stays constant however much data streams through; each update
+    adds the new rows' counts and subtracts the evicted rows' counts with
+    bincount. Statistics per column:
+
+    - numerical: PSI and a two-sample KS statistic on the binned distribution;
+    - categorical: chi-square goodness of fit, with unseen categories pooled
+      into an extra "other" bucket.
+
+    Missing categorical values (NaN) are left out of that column's
+    statistics rather than counted as an unseen category.
+    """
+
+    def __init__(self, profile, window_size=1000, psi_threshold=0.2, ks_alpha=0.05, chi2_alpha=0.05):
+        self.profile = profile
+        self.window_size = window_size
+        self.psi_threshold = psi_threshold
+        self.ks_alpha = ks_alpha
+        self.chi2_alpha = chi2_alpha
+        self.columns = list(profile["numerical"]) + list(profile["categorical"])
+
+        self._edges = {col: np.asarray(spec["edges"]) for col, spec in profile["numerical"].items()}
+        self._categories = {col: pd.Index(spec["categories"]) for col, spec in profile["categorical"].items()}
+        # Reference distribution per column; categorical columns get a trailing "other" slot.
+        self._expected = {col: np.asarray(spec["proportions"]) for col, spec in profile["numerical"].items()}
+        for col, spec in profile["categorical"].items():
+            self._expected[col] = np.append(spec["proportions"], 0.0)
+        self._num_bins = {col: len(p) for col, p in self._expected.items()}
+
+        self._codes = np.zeros((window_size, len(self.columns)), dtype=np.int32)
+        # One extra trailing slot per column counts missing values, which are not scored.
+        self._counts = {col: np.zeros(self._num_bins[col] + 1, dtype=np.int64) for col in self.columns}
+        self._position = 0
+        self._filled = 0
+        self._recent = deque()
+        self._recent_rows = 0
+        self.rows_seen = 0
+
+    def _encode(self, chunk):
+        """Maps a chunk to one bin / category code per column."""
+        codes = np.empty((len(chunk), len(self.columns)), dtype=np.int32)
+        for j, col in enumerate(self.columns):
+            if col in self._edges:
+                codes[:, j] = np.searchsorted(self._edges[col], chunk[col].to_numpy(dtype=np.float64), side="right")
+            else:
+                index = self._categories[col].get_indexer(chunk[col].astype(str))
+                index[index < 0] = len(self._categories[col])
+                index[chunk[col].isna().to_numpy()] = self._num_bins[col]
+                codes[:, j] = index
+        return codes
+
+    def _apply(self, codes, sign):
+        for j, col in enumerate(self.columns):
+            self._counts[col] += sign * np.bincount(codes[:, j], minlength=self._num_bins[col] + 1)
+
+    def update(self, chunk):
+        """
+        Slides the window over a new chunk of rows and scores the resulting window.
+
+        Returns:
+            dict: The window scores (see `score`).
+        """
+        codes = self._encode(chunk)[-self.window_size:]
+        n = len(codes)
+        slots = (self._position + np.arange(n)) % self.window_size
+        # Evict the oldest rows whose slots are about to be overwritten. Until
+        # the buffer is full it fills from slot 0, so occupied slots are < filled.
+        evicted = slots if self._filled == self.window_size else slots[slots < self._filled]
+        if len(evicted):
+            self._apply(self._codes[evicted], -1)
+        self._codes[slots] = codes
+        self._apply(codes, +1)
+        self._position = (self._position + n) % self.window_size
+        self._filled = min(self._filled + n, self.window_size)
+        self.rows_seen += len(chunk)
+
+        # Keep the raw rows of the current window for report rendering.
+        self._recent.append(chunk)
+        self._recent_rows += len(chunk)
+        while self._recent_rows - len(self._recent[0]) >= self.window_size:
+            self._recent_rows -= len(self._recent.popleft())
+        return self.score()
+
+    def window_frame(self):
+        """The raw rows of the current window."""
+        return pd.concat(list(self._recent), ignore_index=True).tail(self.window_size)
+
+    def score(self):
+        """Drift statistics of the current window against the reference profile."""
+        m = self.profile["rows"]
+        results = {}
+        for col in self.columns:
+            observed = self._counts[col][:-1]
+            n = int(observed.sum())
+            expected = self._expected[col]
+            actual = observed / max(n, 1)
+            if col in self._edges:
+                p = np.clip(expected, EPSILON, None)
+                q = np.clip(actual, EPSILON, None)
+                psi = float(np.sum((q - p) * np.log(q / p)))
+                ks = float(np.max(np.abs(np.cumsum(actual) - np.cumsum(expected))))
+                # Asymptotic two-sample KS critical value at ks_alpha.
+                critical = np.sqrt(-np.log(self.ks_alpha / 2) / 2) * np.sqrt((n + m) / max(n * m, 1))
+                drift = psi > self.psi_threshold or ks > critical
+                results[col] = {"psi": psi, "ks_statistic": ks, "ks_critical": float(critical), "drift": bool(drift)}
+            else:
+                expected_counts = np.clip(expected, EPSILON, None) * max(n, 1)
+                chi2 = float(np.sum((observed - expected_counts) ** 2 / expected_counts)) if n else 0.0
+                p_value = float(stats.chi2.sf(chi2, df=max(len(expected) - 1, 1)))
+                results[col] = {"chi2": chi2, "p_value": p_value, "drift": bool(p_value < self.chi2_alpha)}
+        drifted = [col for col, r in results.items() if r["drift"]]
+        return {
+            "rows_seen": self.rows_seen,
+            "window_rows": self._filled,
+            "drift_detected": bool(drifted),
+            "drifted_columns": drifted,
+            "columns": results,
+        }
@@ -1,70 +1,159 @@
 import pandas as pd
+import numpy as np
 import joblib
-import matplotlib.pyplot as plt
+import json
 import os
-from sklearn.metrics import (
-    classification_report,
-    confusion_matrix,
-    ConfusionMatrixDisplay
-)
+import argparse
+import itertools
 from sklearn.model_selection import train_test_split
 
-def plot_and_save_metrics():
+from data_store import iter_chunks, load_arrays
+from instrumentation import finish, span, tracker_from_env
+from model_format import load_model
+
+
+class ConfusionAccumulator:
     """
-    Loads artifacts, evaluates the model, and plots and saves
-    the confusion matrix and classification report as a single image.
+    Confusion matrix built incrementally from chunks of predictions.
+
+    Each update maps labels to class codes and adds one bincount over
+    `true * n_classes + predicted`, so any amount of data is scored in
+    memory proportional to the chunk. Precision, recall and F1 are derived
+    from the counts and match sklearn's `classification_report`.
     """
-    print("--- Starting to Plot Metrics ---")
 
-    # === Load data ===
-    df = pd.read_csv("data/iris.csv")
+    def __init__(self, classes):
+        self.classes = np.asarray(classes)
+        num_classes = len(self.classes)
+        self.matrix = np.zeros((num_classes, num_classes), dtype=np.int64)
 
-    # === Load artifacts ===
-    try:
-        model = joblib.load("artifacts/model.joblib")
-        le = joblib.load("artifacts/label_encoder.joblib")
-        print("Artifacts loaded successfully.")
-    except FileNotFoundError as e:
-        print(f"Error: {e}. Please ensure train.py has run and created artifacts.")
-        return
+    def _codes(self, labels):
+        codes = pd.Categorical(np.asarray(labels), categories=self.classes).codes
+        if (codes < 0).any():
+            unknown = sorted(set(np.asarray(labels)[codes < 0].tolist()))
+            raise ValueError(f"Labels not among the model classes: {unknown}")
+        return codes.astype(np.intp)
 
-    # === Prepare data dynamically based on model's expected features ===
-    try:
-        expected_features = model.feature_names_in_
-        X = df[expected_features]
-        y = df['species']
-    except AttributeError:
-        print("Warning: 'feature_names_in_' not found. Falling back to dropping columns.")
-        X = df.drop(columns=['species', 'location'], errors='ignore')
-        y = df['species']
-    except KeyError as e:
-        print(f"Error: Model was trained on features not present in the new data: {e}")
-        return
+    def update(self, y_true, y_pred):
+        num_classes = len(self.classes)
+        cells = self._codes(y_true) * num_classes + self._codes(y_pred)
+        self.matrix += np.bincount(cells, minlength=num_classes * num_classes).reshape(num_classes, num_classes)
+        return self
+
+    def report(self):
+        """
+        Per-class precision, recall, F1 and support plus accuracy and averages.
+
+        Returns:
+            dict: Same layout as `classification_report(..., output_dict=True)`;
+            undefined ratios (no predictions or no support) are 0.0.
+        """
+        matrix = self.matrix.astype(np.float64)
+        true_positives = np.diag(matrix)
+        support = matrix.sum(axis=1)
+        predicted = matrix.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.where(predicted > 0, true_positives / predicted, 0.0)
+            recall = np.where(support > 0, true_positives / support, 0.0)
+            denominator = precision + recall
+            f1 = np.where(denominator > 0, 2 * precision * recall / denominator, 0.0)
+        total = support.sum()
 
-    # === Re-create the exact same train/test split as in training ===
-    _, X_test, _, y_test = train_test_split(
-        X,
-        y,
-        test_size=0.4,
-        random_state=42,
-        stratify=y
+        report = {}
+        for i, cls in enumerate(self.classes):
+            report[str(cls)] = {
+                "precision": float(precision[i]),
+                "recall": float(recall[i]),
+                "f1-score": float(f1[i]),
+                "support": float(support[i]),
+            }
+        report["accuracy"] = float(true_positives.sum() / total) if total else 0.0
+        # An empty holdout has no support to weight by; every average is then 0.0.
+        weights = support / total if total else None
+        for name, w in (("macro avg", None), ("weighted avg", weights)):
+            report[name] = {
+                "precision": float(np.average(precision, weights=w)),
+                "recall": float(np.average(recall, weights=w)),
+                "f1-score": float(np.average(f1, weights=w)),
+                "support": float(total),
+            }
+        return report
+
+
+def holdout_mask(labels, test_size=0.4, random_state=42):
+    """
+    Marks the rows of the stratified test split used since training.
+
+    Only the labels are needed to reproduce `train_test_split`, so the
+    features can be streamed afterwards instead of splitting them in memory.
+    """
+    num_rows = len(labels)
+    _, test_index = train_test_split(
+        np.arange(num_rows), test_size=test_size, random_state=random_state, stratify=labels
     )
-    print(f"Test set created with {len(X_test)} samples.")
+    mask = np.zeros(num_rows, dtype=bool)
+    mask[test_index] = True
+    return mask
+
+
+def accumulate_confusion(model, chunks, masks=None):
+    """
+    Predicts each chunk and folds it into a ConfusionAccumulator.
+
+    Args:
+        model: Fitted classifier with `classes_`.
+        chunks (iterable): DataFrames with the model features and 'species'.
+        masks (iterable, optional): Boolean row masks selecting the holdout rows of each chunk.
+
+    Returns:
+        ConfusionAccumulator: Counts over every chunk.
+    """
+    accumulator = ConfusionAccumulator(model.classes_)
+    features = getattr(model, 'feature_names_in_', None)
+    masks = masks if masks is not None else itertools.repeat(None)
+    for chunk, mask in zip(chunks, masks):
+        if mask is not None:
+            chunk = chunk[mask]
+        if len(chunk):
+            X = chunk[features] if features is not None else chunk.drop(columns=['species', 'location'], errors='ignore')
+            accumulator.update(chunk['species'], model.predict(X))
+    return accumulator
+
+
+def compute_metrics(model, data_path="data/iris.csv", holdout_path=None, chunk_size=100_000):
+    """
+    Streams the holdout set through the model and accumulates its confusion matrix.
 
-    # === Predict ===
-    y_pred = model.predict(X_test)
+    With `holdout_path`, every row of that file is scored. Otherwise the
+    holdout is the stratified test split of `data_path`, recomputed from the
+    labels alone and applied chunk by chunk.
+    """
+    if holdout_path is not None:
+        return accumulate_confusion(model, iter_chunks(holdout_path, chunk_size))
+
+    arrays, _ = load_arrays(data_path, columns=['species'])
+    mask = holdout_mask(np.asarray(arrays['species']))
+    chunk_size = chunk_size or len(mask)
+    masks = (mask[start:start + chunk_size] for start in range(0, len(mask), chunk_size))
+    return accumulate_confusion(model, iter_chunks(data_path, chunk_size), masks)
+
+
+def render_metrics_png(matrix, report, labels, path="artifacts/metrics.png"):
+    """Plots the confusion matrix and the classification report table as a single image."""
+    # Deferred so metrics-only runs never pay for matplotlib.
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import ConfusionMatrixDisplay
 
-    # === Generate Metrics for Plotting ===
-    report_dict = classification_report(y_test, y_pred, target_names=le.classes_, output_dict=True)
-    cm = confusion_matrix(y_test, y_pred)
-    report_df = pd.DataFrame(report_dict).transpose()
+    report_df = pd.DataFrame(report).transpose()
 
     # === Plot ===
     fig, ax = plt.subplots(1, 2, figsize=(14, 6))
     fig.suptitle("Model Performance Metrics", fontsize=16)
 
     # Plot 1: Confusion Matrix
-    disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=le.classes_)
+    disp = ConfusionMatrixDisplay(confusion_matrix=matrix, display_labels=labels)
     disp.plot(ax=ax[0], cmap="Blues", values_format='d')
     ax[0].set_title("Confusion Matrix")
 
@@ -83,12 +172,94 @@ def plot_and_save_metrics():
     ax[1].set_title("Classification Report", pad=20)
 
     # === Save plot to artifacts directory ===
-    os.makedirs("artifacts", exist_ok=True)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
     plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-    plt.savefig("artifacts/metrics.png")
-    
-    print("Metrics plot saved to artifacts/metrics.png")
+    plt.savefig(path)
+    plt.close(fig)
+    print(f"Metrics plot saved to {path}")
+
+
+def plot_and_save_metrics(model=None, le=None, model_path="artifacts/model.joblib", data_path="data/iris.csv",
+                          holdout_path=None, chunk_size=100_000, metrics_path="artifacts/metrics.json",
+                          plot_path="artifacts/metrics.png", plot=True):
+    """
+    Loads artifacts, evaluates the model on the holdout set and saves the metrics.
+
+    The confusion matrix and classification report are written as JSON; the
+    confusion matrix and report figure is rendered only when `plot` is True.
+
+    Args:
+        model (optional): Already loaded model; read from `model_path` when None.
+        le (optional): Already loaded label encoder; read from artifacts/ when None.
+        holdout_path (str, optional): CSV scored in full instead of the test split of `data_path`.
+        chunk_size (int): Rows predicted per chunk.
+        plot (bool): Also render the PNG to `plot_path`.
+
+    Returns:
+        dict: The metrics written to `metrics_path`.
+    """
+    print("--- Starting to Plot Metrics ---" if plot else "--- Computing Metrics ---")
+    with span("evaluate"):
+        return _evaluate(model, le, model_path, data_path, holdout_path, chunk_size, metrics_path, plot_path, plot)
+
+
+def _evaluate(model, le, model_path, data_path, holdout_path, chunk_size, metrics_path, plot_path, plot):
+    # === Load artifacts ===
+    try:
+        with span("load_model"):
+            model = model if model is not None else load_model(model_path)
+            if le is None and plot:
+                le = joblib.load("artifacts/label_encoder.joblib")
+        print("Artifacts loaded successfully.")
+    except FileNotFoundError as e:
+        print(f"Error: {e}. Please ensure train.py has run and created artifacts.")
+        return
+
+    # === Predict the holdout set chunk by chunk ===
+    try:
+        with span("predict") as s:
+            accumulator = compute_metrics(model, data_path, holdout_path, chunk_size)
+            s["rows"] = int(accumulator.matrix.sum())
+    except KeyError as e:
+        print(f"Error: Model was trained on features not present in the new data: {e}")
+        return
+    print(f"Test set scored with {int(accumulator.matrix.sum())} samples.")
+
+    with span("report"):
+        metrics = {
+            "classes": [str(c) for c in accumulator.classes],
+            "confusion_matrix": accumulator.matrix.tolist(),
+            "classification_report": accumulator.report(),
+        }
+        os.makedirs(os.path.dirname(metrics_path) or ".", exist_ok=True)
+        with open(metrics_path, "w") as f:
+            json.dump(metrics, f, indent=2)
+    print(f"Metrics saved to {metrics_path}")
+
+    if plot:
+        labels = le.classes_ if le is not None else accumulator.classes
+        with span("render"):
+            render_metrics_png(accumulator.matrix, metrics["classification_report"], labels, plot_path)
     print("----------------------------\n")
+    return metrics
 
 if __name__ == "__main__":
-    plot_and_save_metrics()
+    parser = argparse.ArgumentParser(description="Evaluate the model on the holdout set.")
+    parser.add_argument("--model-path", type=str, default="artifacts/model.joblib", help="Path to the model artifact (.joblib or .tree).")
+    parser.add_argument("--data-path", type=str, default="data/iris.csv", help="Data whose stratified test split is scored.")
+    parser.add_argument("--holdout-path", type=str, default=None, help="CSV to score in full instead of the test split.")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows predicted per chunk.")
+    parser.add_argument("--metrics-path", type=str, default="artifacts/metrics.json", help="Where to save the metrics JSON.")
+    parser.add_argument("--metrics-only", action="store_true", help="Skip rendering artifacts/metrics.png.")
+
+    args = parser.parse_args()
+
+    plot_and_save_metrics(
+        model_path=args.model_path,
+        data_path=args.data_path,
+        holdout_path=args.holdout_path,
+        chunk_size=args.chunk_size,
+        metrics_path=args.metrics_path,
+        plot=not args.metrics_only,
+    )
+    finish("evaluate", tracker=tracker_from_env())
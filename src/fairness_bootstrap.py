@@ -0,0 +1,85 @@
+# fairness_bootstrap.py
+
+import numpy as np
+from joblib import Parallel, delayed
+
+from fairness_stats import demographic_parity_difference, group_accuracy
+
+
+def _bootstrap_task(counts, num_replicates, seed_seq, batch_size):
+    """
+    Draws `num_replicates` bootstrap replicates of a count tensor.
+
+    Resampling n rows with replacement and counting them per
+    (group, true, predicted) cell is the same as one multinomial draw over
+    the cells with probabilities proportional to the observed counts, so
+    each batch of replicates is a single (batch, cells) multinomial sample
+    rather than a materialized array of row indices.
+    """
+    rng = np.random.default_rng(seed_seq)
+    flat = counts.ravel()
+    total = int(flat.sum())
+    probabilities = flat / total
+    accuracies, dpds = [], []
+    for start in range(0, num_replicates, batch_size):
+        size = min(batch_size, num_replicates - start)
+        samples = rng.multinomial(total, probabilities, size=size).reshape((size,) + counts.shape)
+        accuracies.append(group_accuracy(samples))
+        dpds.append(demographic_parity_difference(samples))
+    return np.concatenate(accuracies), np.concatenate(dpds)
+
+
+def _interval(samples, estimate, confidence):
+    alpha = (1.0 - confidence) / 2.0
+    with np.errstate(invalid="ignore"):
+        lower, upper = np.nanpercentile(samples, [100 * alpha, 100 * (1 - alpha)], axis=0)
+    return [
+        {"estimate": float(e), "lower": float(lo), "upper": float(hi)}
+        for e, lo, hi in zip(np.atleast_1d(estimate), np.atleast_1d(lower), np.atleast_1d(upper))
+    ]
+
+
+def bootstrap_fairness(accumulator, num_replicates=1000, confidence=0.95, seed=0, n_jobs=-1,
+                       replicates_per_task=250, batch_size=50):
+    """
+    Percentile bootstrap confidence intervals for per-class DPD and per-group accuracy.
+
+    Replicates are split into fixed-size tasks, each with its own child seed
+    spawned from `seed`, and the tasks are spread across a process pool. The
+    result therefore depends only on `seed`, not on the number of workers.
+
+    Args:
+        accumulator (FairnessAccumulator): Counts of the scored predictions.
+        num_replicates (int): Number of bootstrap replicates.
+        confidence (float): Confidence level of the intervals (e.g. 0.95).
+        seed (int): Root seed for the replicate draws.
+        n_jobs (int): Number of worker processes (-1 uses all cores).
+        replicates_per_task (int): Replicates drawn by each task.
+        batch_size (int): Replicates drawn per vectorized multinomial call.
+
+    Returns:
+        dict: Interval per class DPD and per group accuracy.
+    """
+    groups, counts = accumulator.sorted_counts()
+    sizes = [min(replicates_per_task, num_replicates - start) for start in range(0, num_replicates, replicates_per_task)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_bootstrap_task)(counts, size, child, batch_size) for size, child in zip(sizes, seeds)
+    )
+    accuracies = np.concatenate([acc for acc, _ in results])
+    dpds = np.concatenate([dpd for _, dpd in results])
+
+    dpd_intervals = _interval(dpds, demographic_parity_difference(counts), confidence)
+    accuracy_intervals = _interval(accuracies, group_accuracy(counts), confidence)
+    return {
+        "num_replicates": num_replicates,
+        "confidence": confidence,
+        "seed": seed,
+        "demographic_parity_difference": {
+            str(cls): interval for cls, interval in zip(accumulator.classes, dpd_intervals)
+        },
+        "accuracy_by_group": {
+            str(group): interval for group, interval in zip(groups, accuracy_intervals)
+        },
+    }
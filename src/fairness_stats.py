@@ -0,0 +1,136 @@
+# fairness_stats.py
+
+import numpy as np
+import pandas as pd
+
+# The metric helpers below accept count tensors of shape (..., groups,
+# true classes + 1, predicted classes), so the same code scores a single
+# accumulator or a whole batch of bootstrap replicates at once. The extra
+# true-class slot holds rows whose true label is unknown or outside the
+# model's classes; those rows count towards selection rates but are never
+# correct.
+
+
+def group_totals(counts):
+    """Rows per group."""
+    return counts.sum(axis=(-2, -1))
+
+
+def group_accuracy(counts):
+    """Fraction of correct predictions per group (NaN for empty groups)."""
+    num_classes = counts.shape[-1]
+    correct = np.trace(counts[..., :num_classes, :], axis1=-2, axis2=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return correct / group_totals(counts)
+
+
+def selection_rates(counts):
+    """Fraction of each group's rows predicted as each class, shape (..., groups, classes)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return counts.sum(axis=-2) / group_totals(counts)[..., np.newaxis]
+
+
+def demographic_parity_difference(counts):
+    """Largest minus smallest selection rate across groups, per class."""
+    rates = selection_rates(counts)
+    with np.errstate(invalid="ignore"):
+        return np.nanmax(rates, axis=-2) - np.nanmin(rates, axis=-2)
+
+
+class FairnessAccumulator:
+    """
+    Per-(group, true class, predicted class) counts of a stream of predictions.
+
+    Every group fairness metric used by check_fairness.py is a function of
+    these counts, so predictions can be scored chunk by chunk in constant
+    memory, and accumulators built by separate workers can simply be merged.
+    """
+
+    def __init__(self, classes):
+        self.classes = np.asarray(classes)
+        self.groups = []
+        self._group_index = {}
+        num_classes = len(self.classes)
+        self.counts = np.zeros((0, num_classes + 1, num_classes), dtype=np.int64)
+
+    def _group_codes(self, groups):
+        uniques, inverse = np.unique(np.asarray(groups), return_inverse=True)
+        for group in uniques.tolist():
+            if group not in self._group_index:
+                self._group_index[group] = len(self.groups)
+                self.groups.append(group)
+        if len(self.groups) > self.counts.shape[0]:
+            grown = np.zeros((len(self.groups),) + self.counts.shape[1:], dtype=np.int64)
+            grown[:self.counts.shape[0]] = self.counts
+            self.counts = grown
+        mapping = np.array([self._group_index[g] for g in uniques.tolist()], dtype=np.intp)
+        return mapping[inverse.ravel()]
+
+    def update(self, y_true, y_pred, groups):
+        """
+        Adds a chunk of predictions.
+
+        Args:
+            y_true (array-like or None): True labels; None when they are unknown.
+            y_pred (array-like): Predicted labels, all within `classes`.
+            groups (array-like): Sensitive-feature value of each row.
+        """
+        num_classes = len(self.classes)
+        pred_codes = pd.Categorical(np.asarray(y_pred), categories=self.classes).codes.astype(np.intp)
+        if (pred_codes < 0).any():
+            raise ValueError("Predictions contain labels outside the model's classes.")
+        if y_true is None:
+            true_codes = np.full(len(pred_codes), num_classes, dtype=np.intp)
+        else:
+            true_codes = pd.Categorical(np.asarray(y_true), categories=self.classes).codes.astype(np.intp)
+            true_codes[true_codes < 0] = num_classes
+        group_codes = self._group_codes(groups)
+
+        # One bincount over the flattened (group, true, pred) index updates every cell at once.
+        cells = self.counts.shape[1] * self.counts.shape[2]
+        flat = group_codes * cells + true_codes * num_classes + pred_codes
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+        return self
+
+    def merge(self, other):
+        """Adds the counts of another accumulator over the same classes."""
+        if not np.array_equal(self.classes, other.classes):
+            raise ValueError("Cannot merge accumulators over different classes.")
+        for index, group in enumerate(other.groups):
+            self._group_codes([group])
+            self.counts[self._group_index[group]] += other.counts[index]
+        return self
+
+    def sorted_counts(self):
+        """Returns (sorted groups, counts in that order)."""
+        order = sorted(range(len(self.groups)), key=lambda i: self.groups[i])
+        return [self.groups[i] for i in order], self.counts[order]
+
+    def by_group(self, name="group"):
+        """Accuracy and per-class selection rates for each group."""
+        groups, counts = self.sorted_counts()
+        frame = pd.DataFrame({"accuracy": group_accuracy(counts)}, index=pd.Index(groups, name=name))
+        rates = selection_rates(counts)
+        for i, cls in enumerate(self.classes):
+            frame[f"selection_rate_{cls}"] = rates[:, i]
+        return frame
+
+    def report(self):
+        """Demographic parity difference of every class, keyed as in fairness_report.json."""
+        _, counts = self.sorted_counts()
+        dpd = demographic_parity_difference(counts)
+        return {f"demographic_parity_difference_{cls}": float(dpd[i]) for i, cls in enumerate(self.classes)}
+
+    def to_dict(self):
+        """JSON-serializable state, e.g. to ship partial counts between workers."""
+        return {"classes": self.classes.tolist(), "groups": list(self.groups), "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, state):
+        acc = cls(state["classes"])
+        acc.groups = list(state["groups"])
+        acc._group_index = {g: i for i, g in enumerate(acc.groups)}
+        acc.counts = np.asarray(state["counts"], dtype=np.int64).reshape(
+            (len(acc.groups), len(acc.classes) + 1, len(acc.classes))
+        )
+        return acc
@@ -1,49 +1,181 @@
-import pandas as pd
+import argparse
+import os
+
 import joblib
-import shap
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
-import os
+import numpy as np
+import shap
+from joblib import Parallel, delayed
 from sklearn.model_selection import train_test_split
 
-shap.initjs()
-
-# Load the model and data
-model = joblib.load("artifacts/model.joblib")
-df = pd.read_csv("data/iris.csv")
-        
-# Prepare data dynamically based on model's expected features
-expected_features = model.feature_names_in_
-
-print(f"Expected features: {expected_features}")
-X_train, X_test, y_train, y_test = train_test_split(
-    df[expected_features],
-    df['species'],
-    test_size=0.4,
-    random_state=42,
-    stratify=df['species']
-)
-# Initialize SHAP explainer and calculate SHAP values
-mod_dt = joblib.load("artifacts/model.joblib")
-if not os.path.exists("artifacts/shap_values.pkl"):
-    print("Calculating SHAP values...")
-    shap_values = shap.TreeExplainer(mod_dt).shap_values(X_train)
-    joblib.dump(shap_values, "artifacts/shap_values.pkl")
-else:
-    print("Loading precomputed SHAP values...")
-    shap_values = joblib.load("artifacts/shap_values.pkl")
-    print("SHAP values loaded successfully.")
-    print("SHAP values already exist. Skipping calculation.")
-    print("SHAP values calculated and saved to artifacts/shap_values.pkl")
-
-# Visualize SHAP values
-
-shap.summary_plot(shap_values, X_train)
-
-explainer = shap.KernelExplainer(mod_dt.predict_proba, X_train)
-shap_values = explainer.shap_values(X_test)
-#shap.force_plot(explainer.expected_value[0], shap_values[..., 0], X_test)
-# Create force plot
-force_plot = shap.force_plot(explainer.expected_value[0], shap_values[..., 0], X_test)
-
-# Save force plot to HTML
-shap.save_html("artifacts/shap_force_plot.html", force_plot)
\ No newline at end of file
+from data_store import load_dataset
+from hashing import file_sha256, frame_sha256, key_sha256
+from instrumentation import finish, span, tracker_from_env
+
+
+class ShapCache:
+    """
+    Content-addressed, size-bounded cache of SHAP results.
+
+    Entries are keyed by the model file hash, the hash of the explained rows
+    and the feature list, so retraining or changing the data produces a new
+    key instead of serving stale values. When the directory grows beyond
+    `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir="artifacts/shap_cache", max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(model_hash, data_hash, features, kind):
+        return key_sha256(model=model_hash, data=data_hash, features=list(features), kind=kind)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.joblib")
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        # Refresh the modification time so eviction treats this entry as recently used.
+        os.utime(path)
+        return joblib.load(path)
+
+    def put(self, key, value):
+        """Stores `value` under `key` and evicts old entries beyond the size limit."""
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+        self._evict(keep=path)
+
+    def _evict(self, keep):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".joblib"):
+                entry = os.path.join(self.cache_dir, name)
+                stat = os.stat(entry)
+                entries.append((stat.st_mtime, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry != keep:
+                os.remove(entry)
+                total -= size
+                print(f"Evicted SHAP cache entry {os.path.basename(entry)}")
+
+
+def _explain_batch(model, X_batch):
+    return shap.TreeExplainer(model).shap_values(X_batch)
+
+
+def compute_shap_values(model, X, batch_size=1000, n_jobs=1):
+    """
+    Computes exact tree SHAP values for X in row batches spread across workers.
+
+    Returns:
+        dict: 'values' (rows x features x classes) and 'expected_value' (per class).
+    """
+    batches = [X.iloc[start:start + batch_size] for start in range(0, len(X), batch_size)]
+    results = Parallel(n_jobs=n_jobs)(delayed(_explain_batch)(model, batch) for batch in batches)
+    return {
+        "values": np.concatenate(results, axis=0),
+        "expected_value": shap.TreeExplainer(model).expected_value,
+    }
+
+
+def cached_shap_values(cache, model, model_hash, X, kind, batch_size=1000, n_jobs=1):
+    """Returns SHAP values for X from the cache, computing and storing them on a miss."""
+    key = cache.make_key(model_hash, frame_sha256(X), X.columns, kind)
+    result = cache.get(key)
+    if result is not None:
+        print(f"Loaded cached SHAP values for {kind} set ({key[:12]}).")
+        return result
+    print(f"Calculating SHAP values for {kind} set ({len(X)} rows)...")
+    result = compute_shap_values(model, X, batch_size=batch_size, n_jobs=n_jobs)
+    cache.put(key, result)
+    print(f"SHAP values cached as {key[:12]}.")
+    return result
+
+
+def generate_explanations(model_path="artifacts/model.joblib", data_path="data/iris.csv",
+                          cache_dir="artifacts/shap_cache", max_cache_mb=256, batch_size=1000, n_jobs=1,
+                          model=None):
+    """
+    Writes the global SHAP summary plot and the test-set force plot.
+
+    Both use the exact tree explainer; values are served from a content-addressed
+    cache when the model and data are unchanged. An already loaded `model`
+    is used instead of reading `model_path` (which is still hashed for the cache key).
+    """
+    # Load the model and data
+    with span("load") as s:
+        model = model if model is not None else joblib.load(model_path)
+        model_hash = file_sha256(model_path)
+        df = load_dataset(data_path)
+        s["rows"] = len(df)
+
+    # Prepare data dynamically based on model's expected features
+    expected_features = model.feature_names_in_
+
+    print(f"Expected features: {expected_features}")
+    with span("split", rows=len(df)):
+        X_train, X_test, y_train, y_test = train_test_split(
+            df[expected_features],
+            df['species'],
+            test_size=0.4,
+            random_state=42,
+            stratify=df['species']
+        )
+
+    cache = ShapCache(cache_dir, max_bytes=int(max_cache_mb * 1024 * 1024))
+    with span("shap_train", rows=len(X_train)):
+        train_shap = cached_shap_values(cache, model, model_hash, X_train, "train", batch_size, n_jobs)
+    with span("shap_test", rows=len(X_test)):
+        test_shap = cached_shap_values(cache, model, model_hash, X_test, "test", batch_size, n_jobs)
+
+    os.makedirs("artifacts", exist_ok=True)
+
+    # Visualize SHAP values
+    with span("summary_plot"):
+        shap.summary_plot(train_shap["values"], X_train, show=False)
+        plt.savefig("artifacts/shap_summary_global.png", bbox_inches="tight")
+        plt.close()
+    print("SHAP summary plot saved to artifacts/shap_summary_global.png")
+
+    # Create force plot
+    with span("force_plot"):
+        force_plot = shap.force_plot(test_shap["expected_value"][0], test_shap["values"][..., 0], X_test)
+
+        # Save force plot to HTML
+        shap.save_html("artifacts/shap_force_plot.html", force_plot)
+    print("SHAP force plot saved to artifacts/shap_force_plot.html")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate SHAP explanations for the trained model.")
+    parser.add_argument("--model-path", type=str, default="artifacts/model.joblib", help="Path to the model artifact.")
+    parser.add_argument("--data-path", type=str, default="data/iris.csv", help="Path to the input CSV file.")
+    parser.add_argument("--cache-dir", type=str, default="artifacts/shap_cache", help="Directory of the SHAP cache.")
+    parser.add_argument("--max-cache-mb", type=float, default=256, help="Size limit of the SHAP cache in MB.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows explained per batch.")
+    parser.add_argument("--n-jobs", type=int, default=1, help="Number of batches explained in parallel (-1 for all cores).")
+
+    args = parser.parse_args()
+
+    generate_explanations(
+        model_path=args.model_path,
+        data_path=args.data_path,
+        cache_dir=args.cache_dir,
+        max_cache_mb=args.max_cache_mb,
+        batch_size=args.batch_size,
+        n_jobs=args.n_jobs,
+    )
+    finish("generate_explanation", tracker=tracker_from_env())
+
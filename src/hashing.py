@@ -0,0 +1,42 @@
+# hashing.py
+
+import hashlib
+import json
+
+import pandas as pd
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_md5(path, chunk_size=1 << 20):
+    """Returns the MD5 hex digest of a file, the checksum DVC and GCS record."""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def frame_sha256(df):
+    """
+    Returns a SHA-256 hex digest of a DataFrame's column names, dtypes and values.
+
+    Row values are hashed with pandas' vectorized row hashing, so this is
+    much cheaper than serializing the frame.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def key_sha256(**parts):
+    """Returns a SHA-256 hex digest of keyword parts, independent of their order."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
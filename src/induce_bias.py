@@ -1,47 +1,125 @@
 # src/induce_bias.py
 
-import pandas as pd
 import numpy as np
+import argparse
+import json
 import os
+import tempfile
+
+import pandas as pd
+
+# Location groups and the probability of landing in each one. 'virginica'
+# flowers are made to be much more prevalent in location 1.
+LOCATIONS = [0, 1]
+DEFAULT_GROUP_PROBS = {"Virginica": [0.2, 0.8]}
+DEFAULT_OTHER_PROBS = [0.8, 0.2]
+
+
+def _read_chunks(data_path, chunk_size):
+    """
+    Yields the CSV as text DataFrame chunks; a single chunk when chunk_size is None.
+
+    The raw CSV is read rather than the float32 columnar cache, so existing
+    values are written back verbatim.
+    """
+    kwargs = dict(dtype=str, keep_default_na=False)
+    if chunk_size is None:
+        yield pd.read_csv(data_path, **kwargs)
+    else:
+        yield from pd.read_csv(data_path, chunksize=chunk_size, **kwargs)
+
+
+def draw_locations(species, rng, group_probs=None, other_probs=None, locations=LOCATIONS):
+    """
+    Draws a location for every row in one vectorized call.
+
+    Args:
+        species (array-like): Class label of each row.
+        rng (numpy.random.Generator): Generator the draws are taken from.
+        group_probs (dict): Maps a class label to its probabilities over `locations`.
+        other_probs (list): Probabilities used for classes missing from `group_probs`.
+        locations (list): Location values to draw from.
 
-def induce_bias(data_path):
+    Returns:
+        numpy.ndarray: The drawn location for each row.
+    """
+    group_probs = DEFAULT_GROUP_PROBS if group_probs is None else group_probs
+    other_probs = DEFAULT_OTHER_PROBS if other_probs is None else other_probs
+
+    classes, inverse = np.unique(np.asarray(species), return_inverse=True)
+    probs = np.array([group_probs.get(cls, other_probs) for cls in classes], dtype=float)
+    if probs.shape[1] != len(locations) or not np.allclose(probs.sum(axis=1), 1.0):
+        raise ValueError(f"Each probability vector must have {len(locations)} entries summing to 1.")
+
+    # Inverse-CDF sampling: one uniform per row compared against the row's cumulative probabilities.
+    cumulative = np.cumsum(probs, axis=1)[inverse]
+    draws = rng.random(len(inverse))
+    picks = np.minimum((draws[:, None] >= cumulative).sum(axis=1), len(locations) - 1)
+    return np.asarray(locations)[picks]
+
+
+def induce_bias(data_path, output_path="data/iris_biased.csv", group_probs=None, other_probs=None,
+                seed=42, chunk_size=None):
     """
     Loads the Iris dataset and adds a new 'location' column with
     intentionally biased values to test fairness metrics.
 
-    In this scenario, 'virginica' flowers are made to be much more
-    prevalent in 'location' 1.
+    The input is streamed in chunks and the result is written to a
+    temporary file that atomically replaces `output_path` once complete,
+    so the source file is never modified.
 
     Args:
         data_path (str): The path to the iris.csv file.
+        output_path (str): Where to write the biased dataset.
+        group_probs (dict, optional): Maps a class label to its probabilities over LOCATIONS.
+        other_probs (list, optional): Probabilities for classes missing from `group_probs`.
+        seed (int): Seed for the local random generator.
+        chunk_size (int, optional): Rows processed per chunk. Defaults to the whole file.
     """
     print(f"--- Inducing bias in data at: {data_path} ---")
-    
-    try:
-        df = pd.read_csv(data_path)
-    except FileNotFoundError:
+
+    if not os.path.exists(data_path):
         print(f"Error: Data file not found at {data_path}")
         return
 
-    # Use a reproducible random seed
-    np.random.seed(42)
-    
-    locations = []
-    for species in df['species']:
-        if species == 'Virginica':
-            # 80% chance of being in location 1 if the species is virginica
-            locations.append(np.random.choice([0, 1], p=[0.2, 0.8]))
-        else:
-            # 80% chance of being in location 0 for other species
-            locations.append(np.random.choice([0, 1], p=[0.8, 0.2]))
-            
-    df['location'] = locations
-    # print(f"DLAJ L :: {locations} and length ::{len(locations)}")
-    # Save the modified DataFrame back to the same file
-    df.to_csv(data_path, index=False)
-    
-    print("Successfully added biased 'location' column to the dataset.")
+    # Use a local, reproducible generator; draws continue across chunks.
+    rng = np.random.default_rng(seed)
+
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            for i, chunk in enumerate(_read_chunks(data_path, chunk_size)):
+                chunk['location'] = draw_locations(chunk['species'], rng, group_probs, other_probs)
+                chunk.to_csv(f, index=False, header=(i == 0))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    print(f"Successfully added biased 'location' column; saved to {output_path}.")
     print("---------------------------------------------------\n")
 
 if __name__ == "__main__":
-    induce_bias("data/iris.csv")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Add a biased 'location' column to a dataset.")
+    parser.add_argument("--data-path", type=str, default="data/iris.csv", help="Path to the input CSV file.")
+    parser.add_argument("--output-path", type=str, default="data/iris_biased.csv", help="Path for the biased output CSV.")
+    parser.add_argument("--group-probs", type=json.loads, default=None,
+                        help='JSON map of class to location probabilities, e.g. \'{"Virginica": [0.2, 0.8]}\'.')
+    parser.add_argument("--other-probs", type=json.loads, default=None,
+                        help="JSON list of location probabilities for classes not in --group-probs.")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed.")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows processed per chunk.")
+
+    args = parser.parse_args()
+
+    induce_bias(
+        args.data_path,
+        args.output_path,
+        group_probs=args.group_probs,
+        other_probs=args.other_probs,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+    )
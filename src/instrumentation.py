@@ -0,0 +1,220 @@
+# instrumentation.py
+
+import collections
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_DIR = os.getenv("PIPELINE_TRACE_DIR", "artifacts/traces")
+# Set PIPELINE_PROFILE to a sampling interval in seconds (e.g. 0.005) to enable the profiler.
+PROFILE_INTERVAL = os.getenv("PIPELINE_PROFILE")
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return _peak_rss_mb()
+
+
+class SamplingProfiler:
+    """
+    Samples the main thread's Python stack from a background thread.
+
+    Stacks are kept as folded strings ("file:function;file:function") with
+    a sample count each, the input format of flamegraph tools.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._thread_id = threading.main_thread().ident
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def summary(self, top=20):
+        """The most sampled leaf functions, with their share of all samples."""
+        leaves = collections.Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values())
+        return {
+            "interval": self.interval,
+            "samples": total,
+            "top": [{"function": name, "samples": n, "share": n / total} for name, n in leaves.most_common(top)],
+        }
+
+
+class Tracer:
+    """
+    Records nested timing spans for one script run.
+
+    Each span stores its wall time, how far it raised the process's peak RSS
+    (`peak_rss_increase_mb`, 0 when an earlier step already peaked higher),
+    the process peak RSS when it ended (`process_peak_rss_mb`), the change in
+    resident memory across it and an optional row count. Nested spans are
+    named by their path, e.g. 'explain/shap_train'.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Drops the recorded spans and stops the profiler, starting a new trace."""
+        if getattr(self, "profiler", None) is not None:
+            self.profiler.stop()
+        self.spans = []
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.profiler = None
+        self._stack = []
+
+    @contextmanager
+    def span(self, name, rows=None):
+        """
+        Times the enclosed block. The yielded dict can be updated, e.g. `s["rows"] = n`.
+        """
+        if PROFILE_INTERVAL and self.profiler is None:
+            self.profiler = SamplingProfiler(float(PROFILE_INTERVAL)).start()
+        path = "/".join(self._stack + [name])
+        record = {"name": path, "rows": rows}
+        self._stack.append(name)
+        rss_before = _rss_mb()
+        peak_before = _peak_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            record["process_peak_rss_mb"] = _peak_rss_mb()
+            record["peak_rss_increase_mb"] = record["process_peak_rss_mb"] - peak_before
+            record["rss_delta_mb"] = _rss_mb() - rss_before
+            self._stack.pop()
+            self.spans.append(record)
+
+    def metrics(self, since=0):
+        """
+        Flat metric dict for an experiment tracker: '<span>_seconds', '_peak_rss_increase_mb' and '_rows'.
+
+        Args:
+            since (int): Only spans finished after the first `since` ones.
+        """
+        metrics = {}
+        for record in self.spans[since:]:
+            key = record["name"].replace("/", ".")
+            metrics[f"{key}_seconds"] = record["seconds"]
+            metrics[f"{key}_peak_rss_increase_mb"] = record["peak_rss_increase_mb"]
+            if record["rows"] is not None:
+                metrics[f"{key}_rows"] = record["rows"]
+        return metrics
+
+    def to_dict(self, script):
+        trace = {"script": script, "started_at": self.started_at, "spans": self.spans}
+        if self.profiler is not None:
+            trace["profile"] = self.profiler.summary()
+        return trace
+
+
+TRACER = Tracer()
+
+
+def span(name, rows=None):
+    """Times a block on the process-wide tracer; see Tracer.span."""
+    return TRACER.span(name, rows)
+
+
+def traced(name=None):
+    """Decorator form of `span`, named after the function by default."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(name or fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def reset():
+    """Starts a new trace on the process-wide tracer, e.g. for each stage of a pipeline run."""
+    TRACER.reset()
+
+
+def log_metrics(tracker, since=0):
+    """Logs the finished spans as metrics on the tracker's active run; see Tracer.metrics."""
+    for key, value in TRACER.metrics(since).items():
+        tracker.log_metric(key, value)
+
+
+def tracker_from_env():
+    """
+    The tracker named by $TRACKER for scripts without a run of their own, or None.
+
+    'mlflow' uses $MLFLOW_TRACKING_URI (default file:./mlruns); 'file' writes
+    the MLflow file-store layout without importing mlflow.
+    """
+    name = os.getenv("TRACKER")
+    if not name:
+        return None
+    from backends import get_tracker
+    if name == "mlflow":
+        return get_tracker("mlflow", tracking_uri=os.getenv("MLFLOW_TRACKING_URI", "file:./mlruns"))
+    return get_tracker(name)
+
+
+def finish(script, trace_dir=TRACE_DIR, tracker=None):
+    """
+    Writes the trace of this run to `<trace_dir>/<script>.json`.
+
+    With the sampling profiler on, the folded stacks go next to it as
+    `<script>.folded`. With a `tracker`, the span metrics are also logged
+    in a run named '<script>-trace'.
+
+    Returns:
+        dict: The trace.
+    """
+    if TRACER.profiler is not None:
+        TRACER.profiler.stop()
+    trace = TRACER.to_dict(script)
+    os.makedirs(trace_dir, exist_ok=True)
+    path = os.path.join(trace_dir, f"{script}.json")
+    with open(path, "w") as f:
+        json.dump(trace, f, indent=2)
+    if TRACER.profiler is not None:
+        with open(os.path.join(trace_dir, f"{script}.folded"), "w") as f:
+            for stack, count in TRACER.profiler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+    if tracker is not None:
+        with tracker.start_run(run_name=f"{script}-trace"):
+            log_metrics(tracker)
+    print(f"Trace of {len(TRACER.spans)} spans saved to {path}")
+    return trace
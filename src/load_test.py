@@ -0,0 +1,135 @@
+# load_test.py
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+
+
+def load_request_bodies(requests_path="requests.jsonl", data_path="data/iris.csv"):
+    """
+    Reads the request bodies to replay, one JSON object per line.
+
+    Lines that carry neither an "instances" list nor every feature column
+    are skipped. If the file is missing or yields no usable requests, one
+    single-row request per row of `data_path` is replayed instead.
+
+    Returns:
+        list: Encoded JSON request bodies.
+    """
+    bodies = []
+    if requests_path and os.path.exists(requests_path):
+        with open(requests_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if "instances" in record or all(name in record for name in FEATURES):
+                    bodies.append(json.dumps(record).encode())
+    if not bodies:
+        print(f"No prediction requests found in {requests_path}; replaying rows of {data_path}.")
+        df = pd.read_csv(data_path, usecols=FEATURES)
+        bodies = [json.dumps(row).encode() for row in df.to_dict(orient="records")]
+    return bodies
+
+
+def replay(bodies, host="127.0.0.1", port=8080, num_requests=None, concurrency=16):
+    """
+    Sends the request bodies to the server from `concurrency` keep-alive connections.
+
+    Args:
+        bodies (list): Encoded request bodies; cycled until `num_requests` have been sent.
+        num_requests (int, optional): Total requests to send. Defaults to len(bodies).
+        concurrency (int): Number of client threads, each with its own connection.
+
+    Returns:
+        dict: Latency percentiles (ms), throughput and error count.
+    """
+    num_requests = num_requests or len(bodies)
+    work = itertools.islice(itertools.cycle(bodies), num_requests)
+    lock = threading.Lock()
+    latencies = []
+    errors = [0]
+
+    def worker():
+        conn = http.client.HTTPConnection(host, port)
+        local = []
+        while True:
+            with lock:
+                body = next(work, None)
+            if body is None:
+                break
+            start = time.perf_counter()
+            try:
+                conn.request("POST", "/predict", body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(host, port)
+                ok = False
+            elapsed = time.perf_counter() - start
+            if ok:
+                local.append(elapsed)
+            else:
+                with lock:
+                    errors[0] += 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    wall_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall_start
+
+    latencies_ms = np.array(latencies) * 1000.0
+    has_data = len(latencies_ms) > 0
+    return {
+        "requests": num_requests,
+        "errors": errors[0],
+        "concurrency": concurrency,
+        "p50_ms": float(np.percentile(latencies_ms, 50)) if has_data else None,
+        "p99_ms": float(np.percentile(latencies_ms, 99)) if has_data else None,
+        "mean_ms": float(latencies_ms.mean()) if has_data else None,
+        "throughput_rps": len(latencies_ms) / wall if wall > 0 else None,
+        "wall_seconds": wall,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay prediction requests against serve.py and report latency.")
+    parser.add_argument("--requests-path", type=str, default="requests.jsonl", help="JSONL file of request bodies to replay.")
+    parser.add_argument("--data-path", type=str, default="data/iris.csv", help="Fallback source of single-row requests.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Server host.")
+    parser.add_argument("--port", type=int, default=8080, help="Server port.")
+    parser.add_argument("--num-requests", type=int, default=None, help="Total requests to send (cycles the input).")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of concurrent client connections.")
+    parser.add_argument("--output-path", type=str, default=None, help="Optional JSON file for the results.")
+
+    args = parser.parse_args()
+
+    bodies = load_request_bodies(args.requests_path, args.data_path)
+    results = replay(bodies, host=args.host, port=args.port, num_requests=args.num_requests, concurrency=args.concurrency)
+
+    print("\n--- Load Test Report ---")
+    print(json.dumps(results, indent=2))
+    print("------------------------")
+
+    if args.output_path:
+        with open(args.output_path, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Results saved to {args.output_path}")
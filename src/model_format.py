@@ -0,0 +1,120 @@
+# model_format.py
+
+import json
+import os
+import struct
+
+import joblib
+import numpy as np
+
+from compiled_tree import CompiledTree
+
+MAGIC = b"IRISTREE"
+FORMAT_VERSION = 1
+# Arrays start on cache-line boundaries so every view is naturally aligned.
+ALIGNMENT = 64
+MMAP_SUFFIX = ".tree"
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_mmap_model(model, path):
+    """
+    Writes a fitted tree as a memory-mappable artifact.
+
+    Layout: the magic bytes, the header length as a little-endian uint32 and
+    a JSON header, then, from the next 64-byte boundary, every array of
+    `CompiledTree.to_arrays` as a raw little-endian buffer at an aligned
+    offset. Class labels are stored as fixed-width unicode so no array needs
+    pickling.
+
+    Args:
+        model: A fitted DecisionTreeClassifier or a CompiledTree.
+        path (str): Destination file, conventionally `artifacts/model.tree`.
+    """
+    compiled = model if isinstance(model, CompiledTree) else CompiledTree.from_model(model)
+    arrays = compiled.to_arrays()
+    classes_dtype = str(arrays["classes"].dtype)
+    if arrays["classes"].dtype == object:
+        arrays["classes"] = arrays["classes"].astype(str)
+    arrays = {name: np.ascontiguousarray(a, dtype=a.dtype.newbyteorder("<")) for name, a in arrays.items()}
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "max_depth": compiled.max_depth,
+        "n_features": compiled.n_features_in_,
+        "feature_names": [str(f) for f in getattr(compiled, "feature_names_in_", [])] or None,
+        "classes_dtype": classes_dtype,
+        "arrays": {},
+    }
+    # Offsets are relative to the data section, which starts at the first
+    # aligned position after the header.
+    offset = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _align(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode()
+    data_start = _align(len(MAGIC) + 4 + len(header_bytes))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + header["arrays"][name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    """Returns the JSON header of a memory-mappable model file, with `data_start` added."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a memory-mappable model file.")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length))
+    header["data_start"] = _align(len(MAGIC) + 4 + length)
+    if header["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format version {header['format_version']}.")
+    return header
+
+
+def load_mmap_model(path):
+    """
+    Maps a model file read-only and wraps it without copying.
+
+    Every array is a view into one shared, file-backed mapping, so any number
+    of worker processes loading the same file share its pages through the OS
+    page cache and start without deserializing anything.
+
+    Returns:
+        CompiledTree: Exposes `predict`, `predict_proba`, `classes_` and
+        `feature_names_in_` like the fitted model.
+    """
+    header = read_header(path)
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    arrays = {
+        name: np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=buffer,
+                         offset=header["data_start"] + spec["offset"])
+        for name, spec in header["arrays"].items()
+    }
+    # Class labels are a handful of strings; restore the model's label dtype.
+    classes = arrays.pop("classes").astype(header["classes_dtype"])
+    return CompiledTree(
+        classes=classes,
+        feature_names=header["feature_names"],
+        max_depth=header["max_depth"],
+        n_features=header.get("n_features"),
+        **arrays,
+    )
+
+
+def load_model(path):
+    """Loads a model artifact: memory-mapped for `.tree` files, unpickled otherwise."""
+    if path.endswith(MMAP_SUFFIX):
+        return load_mmap_model(path)
+    return joblib.load(path)
@@ -2,57 +2,119 @@ import pandas as pd
 import numpy as np
 import argparse
 import os
-import random
+import shutil
 
-def poison_labels(input_path, output_path, poison_level):
+LABEL_COLUMN = 'species'
+
+
+def _read_chunks(input_path, chunk_size, **kwargs):
+    """Yields the CSV as DataFrame chunks; a single chunk when chunk_size is None."""
+    if chunk_size is None:
+        yield pd.read_csv(input_path, **kwargs)
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunk_size, **kwargs)
+
+
+def _scan_labels(input_path, chunk_size):
+    """
+    Streams the CSV once to count rows and collect the distinct labels.
+
+    Returns:
+        tuple: (number of rows, sorted list of unique labels)
+    """
+    num_rows = 0
+    labels = set()
+    for chunk in _read_chunks(input_path, chunk_size, usecols=[LABEL_COLUMN], dtype=str, keep_default_na=False):
+        num_rows += len(chunk)
+        labels.update(chunk[LABEL_COLUMN].unique())
+    return num_rows, sorted(labels)
+
+
+def draw_poison_plan(num_rows, num_labels, poison_level, seed=None):
+    """
+    Picks which rows to poison and how far to shift each of their labels.
+
+    The draw depends only on the global row count and the seed, so the same
+    rows get the same new labels regardless of how the data is chunked.
+
+    Args:
+        num_rows (int): Total number of rows in the dataset.
+        num_labels (int): Number of distinct labels.
+        poison_level (float): Fraction of rows to flip.
+        seed (int, optional): Seed for the random generator.
+
+    Returns:
+        tuple: (sorted row indices, label offsets in [1, num_labels - 1])
     """
-    Loads a CSV, flips the labels for a specified percentage of rows,
+    rng = np.random.default_rng(seed)
+    num_to_poison = int(num_rows * poison_level)
+    poison_indices = np.sort(rng.choice(num_rows, size=num_to_poison, replace=False))
+    # Adding a non-zero offset modulo the number of labels picks uniformly
+    # among all labels except the original one.
+    offsets = rng.integers(1, num_labels, size=num_to_poison)
+    return poison_indices, offsets
+
+
+def flip_label_codes(codes, poison_indices, offsets, num_labels):
+    """Returns a copy of `codes` with the planned rows moved to a different label code."""
+    flipped = np.array(codes, copy=True)
+    flipped[poison_indices] = (flipped[poison_indices] + offsets) % num_labels
+    return flipped
+
+
+def poison_labels(input_path, output_path, poison_level, seed=None, chunk_size=None):
+    """
+    Streams a CSV, flips the labels for a specified percentage of rows,
     and saves the result.
 
     Args:
         input_path (str): Path to the original CSV file.
         output_path (str): Path to save the poisoned CSV file.
         poison_level (float): The percentage of labels to flip (e.g., 0.10 for 10%).
+        seed (int, optional): Seed for the poisoning draw. With a fixed seed the output
+            is byte-identical across runs and chunk sizes.
+        chunk_size (int, optional): Rows read and written per chunk. Defaults to the whole file.
     """
-    # Load the dataset
-    df = pd.read_csv(input_path)
-    
-    # Get the unique labels in the target column
-    unique_labels = df['species'].unique().tolist()
+    # Ensure the output directory exists
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    # Get the row count and unique labels in the target column
+    num_rows, unique_labels = _scan_labels(input_path, chunk_size)
     if len(unique_labels) < 2:
         print("Error: Cannot flip labels with less than two unique classes.")
         return
 
     # Determine the number of rows to poison
-    num_rows = len(df)
     num_to_poison = int(num_rows * poison_level)
 
     if num_to_poison == 0 and poison_level > 0:
         print(f"Warning: Poison level {poison_level * 100}% is too low to select any rows. No labels will be flipped.")
-        df.to_csv(output_path, index=False)
+        shutil.copyfile(input_path, output_path)
         return
 
     print(f"Flipping labels for {num_to_poison} of {num_rows} rows ({poison_level * 100:.2f}%)...")
-    
-    # Create a copy to modify
-    df_poisoned = df.copy()
-
-    # Select random row indices to poison without replacement
-    poison_indices = np.random.choice(df.index, size=num_to_poison, replace=False)
-
-    # Flip the label for each selected row
-    for idx in poison_indices:
-        original_label = df_poisoned.loc[idx, 'target']
-        # Create a list of possible new labels (all labels except the original one)
-        possible_new_labels = [label for label in unique_labels if label != original_label]
-        # Choose a new label randomly from the possibilities
-        new_label = random.choice(possible_new_labels)
-        # Apply the flipped label
-        df_poisoned.loc[idx, 'target'] = new_label
-    
-    # Ensure the output directory exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    df_poisoned.to_csv(output_path, index=False)
+
+    poison_indices, offsets = draw_poison_plan(num_rows, len(unique_labels), poison_level, seed)
+    labels = np.array(unique_labels, dtype=object)
+
+    # Every column is read as text so untouched values are written back verbatim.
+    reader = _read_chunks(input_path, chunk_size, dtype=str, keep_default_na=False)
+    row_offset = 0
+    with open(output_path, "w", newline="") as f:
+        for i, chunk in enumerate(reader):
+            chunk_rows = len(chunk)
+            # Poisoned rows falling inside this chunk, located by binary search on the sorted plan.
+            lo, hi = np.searchsorted(poison_indices, [row_offset, row_offset + chunk_rows])
+            if hi > lo:
+                codes = np.searchsorted(unique_labels, chunk[LABEL_COLUMN].to_numpy())
+                local = poison_indices[lo:hi] - row_offset
+                codes = flip_label_codes(codes, local, offsets[lo:hi], len(unique_labels))
+                chunk[LABEL_COLUMN] = labels[codes]
+            chunk.to_csv(f, index=False, header=(i == 0))
+            row_offset += chunk_rows
+
     print(f"Poisoned data with flipped labels saved to {output_path}")
 
 
@@ -61,10 +123,12 @@ if __name__ == "__main__":
     parser.add_argument("--input-path", type=str, default="data/iris.csv", help="Path to the input CSV file.")
     parser.add_argument("--output-path", type=str, default="data/iris_poisoned.csv", help="Path for the poisoned output CSV.")
     parser.add_argument("--poison-level", type=float, required=True, help="Fraction of labels to flip (e.g., 0.05 for 5%).")
-    
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible poisoning.")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows read and written per chunk.")
+
     args = parser.parse_args()
 
     if not 0.0 <= args.poison_level <= 1.0:
         raise ValueError("Poison level must be between 0.0 and 1.0")
 
-    poison_labels(args.input_path, args.output_path, args.poison_level)
\ No newline at end of file
+    poison_labels(args.input_path, args.output_path, args.poison_level, seed=args.seed, chunk_size=args.chunk_size)
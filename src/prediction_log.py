@@ -0,0 +1,230 @@
+# prediction_log.py
+
+import glob
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"IRISPLOG"
+FORMAT_VERSION = 1
+LOG_DIR = "prediction_logs"
+SEGMENT_SUFFIX = ".plog"
+# Suffix of the segment being written; readers only see sealed segments by default.
+OPEN_SUFFIX = ".open"
+# Logged for requests that did not send a 'location'.
+UNKNOWN_LOCATION = -1
+
+# Sentinel placed on the queue to stop the writer thread.
+_STOP = object()
+
+
+def _encode_block(records, model_hash, classes, feature_names):
+    """
+    Packs queued records into one block: a uint32 header length, a JSON
+    header, then every column as a raw little-endian buffer.
+    """
+    columns = {
+        "timestamp": np.concatenate([np.full(len(r[1]), r[0]) for r in records]).astype("<f8"),
+        "features": np.concatenate([r[1] for r in records]).astype("<f4"),
+        "location": np.concatenate([r[2] for r in records]).astype("<i4"),
+        "prediction": np.concatenate([r[3] for r in records]).astype("<i2"),
+        "probabilities": np.concatenate([r[4] for r in records]).astype("<f4"),
+    }
+    header = {
+        "rows": len(columns["timestamp"]),
+        "model_hash": model_hash,
+        "classes": classes,
+        "feature_names": feature_names,
+        "columns": [[name, a.dtype.str, list(a.shape)] for name, a in columns.items()],
+    }
+    header_bytes = json.dumps(header).encode()
+    return b"".join([struct.pack("<I", len(header_bytes)), header_bytes] + [a.tobytes() for a in columns.values()])
+
+
+class PredictionLogger:
+    """
+    Append-only binary log of served predictions, written off the hot path.
+
+    `log` only puts the batch's arrays on a bounded queue; a background
+    thread groups queued batches into blocks of up to `block_rows` rows, or
+    whatever arrived within `flush_interval` seconds, and appends each block
+    to the current segment with one write. A segment is sealed (renamed from
+    '.plog.open' to '.plog') once it exceeds `max_segment_bytes` or is older
+    than `max_segment_seconds`, even when no traffic arrives, and the next
+    write starts a new one. When the queue is
+    full the batch is dropped and counted rather than blocking the caller.
+    """
+
+    def __init__(self, log_dir=LOG_DIR, model_hash="", classes=(), feature_names=(),
+                 max_segment_bytes=64 * 1024 * 1024, max_segment_seconds=3600, block_rows=4096,
+                 flush_interval=1.0, max_queue=10_000):
+        self.log_dir = log_dir
+        self.model_hash = model_hash
+        self.classes = [str(c) for c in classes]
+        self.feature_names = [str(f) for f in feature_names]
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.block_rows = block_rows
+        self.flush_interval = flush_interval
+        self.rows_logged = 0
+        self.dropped = 0
+        self._sequence = 0
+        self._file = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        os.makedirs(log_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="prediction-logger", daemon=True)
+        self._thread.start()
+
+    def log(self, features, predictions, probabilities, locations=None):
+        """
+        Queues one batch of predictions without waiting for disk I/O.
+
+        Args:
+            features (array-like): Feature rows, in `feature_names` order.
+            predictions (array-like): Predicted class codes (indices into `classes`).
+            probabilities (array-like): Class probabilities per row.
+            locations (array-like, optional): 'location' per row; UNKNOWN_LOCATION when missing.
+        """
+        if locations is None:
+            locations = np.full(len(predictions), UNKNOWN_LOCATION)
+        try:
+            self._queue.put_nowait((time.time(), features, locations, predictions, probabilities))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Writes everything queued, seals the current segment and stops the writer."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _open_segment(self):
+        self._sequence += 1
+        name = f"segment-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._sequence:06d}{SEGMENT_SUFFIX}"
+        self._path = os.path.join(self.log_dir, name)
+        self._file = open(self._path + OPEN_SUFFIX, "wb")
+        self._file.write(MAGIC + struct.pack("<I", FORMAT_VERSION))
+        self._opened_at = time.monotonic()
+
+    def _seal_segment(self):
+        self._file.close()
+        os.replace(self._path + OPEN_SUFFIX, self._path)
+        self._file = None
+
+    def _write(self, records):
+        if self._file is None:
+            self._open_segment()
+        self._file.write(_encode_block(records, self.model_hash, self.classes, self.feature_names))
+        self._file.flush()
+        self.rows_logged += sum(len(r[3]) for r in records)
+        if self._file.tell() >= self.max_segment_bytes:
+            self._seal_segment()
+
+    def _run(self):
+        pending, rows, deadline = [], 0, None
+        while True:
+            # Wake for the next block flush or, while idle, to seal the segment once it ages out.
+            expires = None if self._file is None else self._opened_at + self.max_segment_seconds
+            wakeups = [t for t in (deadline, expires) if t is not None]
+            timeout = max(min(wakeups) - time.monotonic(), 0) if wakeups else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is not None and item is not _STOP:
+                pending.append(item)
+                rows += len(item[3])
+                deadline = deadline or time.monotonic() + self.flush_interval
+            if pending and (item is None or item is _STOP or rows >= self.block_rows):
+                self._write(pending)
+                pending, rows, deadline = [], 0, None
+            if item is _STOP:
+                if self._file is not None:
+                    self._seal_segment()
+                return
+            if self._file is not None and time.monotonic() - self._opened_at >= self.max_segment_seconds:
+                self._seal_segment()
+
+
+def list_segments(log_dir=LOG_DIR, include_open=False):
+    """Segment paths in write order; the segment still being written only with `include_open`."""
+    paths = glob.glob(os.path.join(log_dir, f"*{SEGMENT_SUFFIX}"))
+    if include_open:
+        paths += glob.glob(os.path.join(log_dir, f"*{SEGMENT_SUFFIX}{OPEN_SUFFIX}"))
+    return sorted(paths)
+
+
+def iter_blocks(path):
+    """
+    Yields (header, columns) for every complete block of a segment.
+
+    Blocks are read one at a time, and a block cut short by a crash or a
+    concurrent write ends the segment instead of failing.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a prediction log segment.")
+        (version,) = struct.unpack("<I", f.read(4))
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported prediction log version {version}.")
+        while True:
+            prefix = f.read(4)
+            if len(prefix) < 4:
+                return
+            (length,) = struct.unpack("<I", prefix)
+            raw = f.read(length)
+            if len(raw) < length:
+                return
+            header = json.loads(raw)
+            columns = {}
+            for name, dtype, shape in header["columns"]:
+                dtype = np.dtype(dtype)
+                nbytes = dtype.itemsize * int(np.prod(shape))
+                data = f.read(nbytes)
+                if len(data) < nbytes:
+                    return
+                columns[name] = np.frombuffer(data, dtype=dtype).reshape(shape)
+            yield header, columns
+
+
+def _block_frame(header, columns):
+    frame = pd.DataFrame(columns["features"], columns=header["feature_names"] or None)
+    frame["location"] = columns["location"]
+    frame["species"] = np.asarray(header["classes"], dtype=object)[columns["prediction"]]
+    for i, cls in enumerate(header["classes"]):
+        frame[f"proba_{cls}"] = columns["probabilities"][:, i]
+    frame["model_hash"] = header["model_hash"]
+    frame["timestamp"] = pd.to_datetime(columns["timestamp"], unit="s")
+    return frame
+
+
+def iter_prediction_chunks(log_dir=LOG_DIR, chunk_size=None, include_open=False):
+    """
+    Streams logged predictions as DataFrames of `chunk_size` rows (one per block when None).
+
+    Columns are the model features, 'location', 'species' (the predicted
+    label), 'proba_<class>' per class, 'model_hash' and 'timestamp', so the
+    chunks can be fed to the drift detector and the fairness accumulator
+    like rows of the training data. Only one block and one chunk are held
+    in memory at a time.
+    """
+    buffered, rows = [], 0
+    for path in list_segments(log_dir, include_open):
+        for header, columns in iter_blocks(path):
+            frame = _block_frame(header, columns)
+            if chunk_size is None:
+                yield frame
+                continue
+            buffered.append(frame)
+            rows += len(frame)
+            while rows >= chunk_size:
+                merged = pd.concat(buffered, ignore_index=True)
+                yield merged.iloc[:chunk_size]
+                buffered, rows = [merged.iloc[chunk_size:]], rows - chunk_size
+    if rows:
+        yield pd.concat(buffered, ignore_index=True)
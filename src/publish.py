@@ -0,0 +1,109 @@
+import argparse
+import fnmatch
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backends import get_artifact_store
+from hashing import file_md5
+
+MANIFEST_NAME = "manifest.json"
+# Runner bookkeeping and partial writes are never published.
+EXCLUDE_PATTERNS = ["*.tmp", "pipeline_state.json", MANIFEST_NAME]
+
+
+def list_artifacts(source_dir="artifacts", exclude=EXCLUDE_PATTERNS):
+    """Lists the files under `source_dir` as '/'-separated relative paths."""
+    files = []
+    for dirpath, _, filenames in os.walk(source_dir):
+        for name in filenames:
+            if any(fnmatch.fnmatch(name, pattern) for pattern in exclude):
+                continue
+            files.append(os.path.relpath(os.path.join(dirpath, name), source_dir).replace(os.sep, "/"))
+    return sorted(files)
+
+
+def _previous_entries(manifest_path, prefix, remote):
+    """Entries of the last manifest for `prefix` whose files the store still holds unchanged."""
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        previous = json.load(f)
+    if previous.get("prefix") != prefix:
+        return {}
+    return {name: entry for name, entry in previous["files"].items() if remote.get(name) == entry["md5"]}
+
+
+def publish_artifacts(store, source_dir="artifacts", prefix="", files=None, max_workers=8):
+    """
+    Publishes artifacts to `store`, uploading only files whose content changed.
+
+    The remote MD5s under `prefix` are listed once, local files are hashed
+    and the changed ones uploaded concurrently through the store's single
+    client. A manifest of every published file's hash and size is then
+    written to `source_dir` and uploaded last, so it only ever describes a
+    complete publish. Publishing a subset (`files`) merges its entries into
+    the previous manifest, keeping the entries still present unchanged in
+    the store.
+
+    Args:
+        store: Artifact store with `list_hashes` and `upload` (see backends.py).
+        source_dir (str): Local artifact directory.
+        prefix (str): Destination prefix in the store.
+        files (list, optional): Paths relative to `source_dir` (default: everything).
+        max_workers (int): Concurrent hashing and upload threads.
+
+    Returns:
+        dict: The manifest.
+    """
+    partial = files is not None
+    files = list_artifacts(source_dir) if files is None else list(files)
+    remote = store.list_hashes(prefix)
+
+    def destination(name):
+        return f"{prefix.rstrip('/')}/{name}" if prefix else name
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        hashes = dict(zip(files, pool.map(lambda name: file_md5(os.path.join(source_dir, name)), files)))
+        changed = [name for name in files if remote.get(name) != hashes[name]]
+        # list() re-raises the first failed upload.
+        list(pool.map(lambda name: store.upload(os.path.join(source_dir, name), destination(name)), changed))
+
+    manifest_path = os.path.join(source_dir, MANIFEST_NAME)
+    entries = {}
+    if partial:
+        entries = _previous_entries(manifest_path, prefix, remote)
+    entries.update({
+        name: {"md5": hashes[name], "size": os.path.getsize(os.path.join(source_dir, name))} for name in files
+    })
+    manifest = {
+        "published_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "prefix": prefix,
+        "files": dict(sorted(entries.items())),
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    store.upload(manifest_path, destination(MANIFEST_NAME))
+    print(f"Published {len(changed)} changed file(s); {len(files) - len(changed)} unchanged file(s) skipped.")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish the artifacts directory, skipping unchanged files.")
+    parser.add_argument("--source-dir", type=str, default="artifacts", help="Local artifact directory.")
+    parser.add_argument("--artifact-store", choices=["local", "gcs"], default=os.getenv("ARTIFACT_STORE", "local"),
+                        help="Where to publish (default: $ARTIFACT_STORE or local).")
+    parser.add_argument("--root", type=str, default=".cache/artifact_store", help="Directory of the local store.")
+    parser.add_argument("--bucket-uri", type=str, default="gs://mlops-course-premium-cipher-462011-p3-unique",
+                        help="Bucket of the GCS store.")
+    parser.add_argument("--prefix", type=str, default="my-models/iris-classifier-week-1", help="Destination prefix.")
+    parser.add_argument("--max-workers", type=int, default=8, help="Concurrent uploads.")
+
+    args = parser.parse_args()
+
+    if args.artifact_store == "gcs":
+        store = get_artifact_store("gcs", bucket_uri=args.bucket_uri)
+    else:
+        store = get_artifact_store("local", root=args.root)
+    publish_artifacts(store, args.source_dir, args.prefix, max_workers=args.max_workers)
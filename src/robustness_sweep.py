@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.model_selection import train_test_split
+
+from check_labels import suspicious_label_mask
+from data_store import dataset_key, load_dataset
+from hashing import key_sha256
+from poison_data import LABEL_COLUMN, draw_poison_plan, flip_label_codes
+from train import DEFAULT_PARAMS, FEATURE_COLUMNS, train_model
+
+DEFAULT_LEVELS = [0.05, 0.10, 0.20, 0.30, 0.40, 0.50]
+
+
+def _score_variant(X, X_check, codes, train_index, test_index, params, detect, k, threshold):
+    """
+    Trains on one label vector and scores it on the test rows.
+
+    Returns:
+        dict: Accuracy against the same (possibly poisoned) test labels,
+        as train.py reports it, and the fitted tree's predictions as codes.
+    """
+    model = train_model(X[train_index], codes[train_index], params)
+    predicted = model.predict(X[test_index])
+    result = {"predicted": predicted, "accuracy": float((predicted == codes[test_index]).mean())}
+    if detect:
+        result["flagged"] = suspicious_label_mask(X_check, codes, k=k, threshold=threshold)
+    return result
+
+
+def _run_variant(X, X_check, clean_codes, num_labels, train_index, test_index, level, seed,
+                 params, detect, k, threshold):
+    poison_indices, offsets = draw_poison_plan(len(clean_codes), num_labels, level, seed)
+    codes = flip_label_codes(clean_codes, poison_indices, offsets, num_labels)
+    scored = _score_variant(X, X_check, codes, train_index, test_index, params, detect, k, threshold)
+    row = {
+        "poison_level": level,
+        "seed": seed,
+        "num_poisoned": int(len(poison_indices)),
+        "accuracy_poisoned": scored["accuracy"],
+        # Robustness proper: how well the poisoned model predicts the true labels.
+        "accuracy_clean": float((scored["predicted"] == clean_codes[test_index]).mean()),
+    }
+    if detect:
+        flagged = scored["flagged"]
+        hits = int(flagged[poison_indices].sum())
+        row["num_flagged"] = int(flagged.sum())
+        row["detection_recall"] = hits / len(poison_indices) if len(poison_indices) else float("nan")
+        row["detection_precision"] = hits / row["num_flagged"] if row["num_flagged"] else float("nan")
+    return row
+
+
+def clean_baseline(X, X_check, codes, train_index, test_index, params, detect, k, threshold, cache_path=None):
+    """
+    Scores the model trained on the unpoisoned labels, reusing a cached result when present.
+
+    With detection enabled, the baseline also records how many clean rows
+    the KNN check flags on its own.
+    """
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            print(f"Loaded clean baseline from {cache_path}")
+            return json.load(f)
+
+    scored = _score_variant(X, X_check, codes, train_index, test_index, params, detect, k, threshold)
+    baseline = {"poison_level": 0.0, "seed": None, "num_poisoned": 0,
+                "accuracy_poisoned": scored["accuracy"], "accuracy_clean": scored["accuracy"]}
+    if detect:
+        baseline["num_flagged"] = int(scored["flagged"].sum())
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump(baseline, f, indent=2)
+    return baseline
+
+
+def robustness_sweep(data_path="data/iris.csv", levels=DEFAULT_LEVELS, seeds=(0, 1, 2), params=DEFAULT_PARAMS,
+                     detect=False, k=5, threshold=0.5, n_jobs=-1, cache_dir=".cache/robustness"):
+    """
+    Measures accuracy, and optionally label-check recall, across poison levels and seeds.
+
+    The data is loaded once. Each variant flips labels in memory with the
+    same plan `poison_data.py --poison-level <level> --seed <seed>` would
+    write, trains with train.py's split and parameters, and is scored on
+    the test rows against both its poisoned and the clean labels. Variants
+    run in parallel worker processes; the clean baseline is computed once
+    and cached per dataset and configuration.
+
+    Returns:
+        pandas.DataFrame: One row per variant, the clean baseline first.
+    """
+    data = load_dataset(data_path, float_dtype=np.float64)
+    X = data[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    # find_suspicious_labels searches over every non-label column.
+    X_check = data.drop(columns=[LABEL_COLUMN]).to_numpy(dtype=np.float64)
+    labels = np.asarray(data[LABEL_COLUMN].astype(str))
+    unique_labels = np.unique(labels)
+    clean_codes = np.searchsorted(unique_labels, labels)
+    num_labels = len(unique_labels)
+    # Same shuffle as train.py's train_test_split(X, y, test_size=0.4, random_state=1).
+    train_index, test_index = train_test_split(np.arange(len(X)), test_size=0.4, random_state=1)
+
+    cache_key = key_sha256(data=dataset_key(data_path), params=params, detect=detect, k=k, threshold=threshold)
+    baseline = clean_baseline(X, X_check, clean_codes, train_index, test_index, params, detect, k, threshold,
+                              cache_path=os.path.join(cache_dir, f"{cache_key}.json"))
+
+    variants = [(level, seed) for level in levels for seed in seeds]
+    print(f"Running {len(variants)} poisoned variants...")
+    rows = Parallel(n_jobs=n_jobs)(
+        delayed(_run_variant)(X, X_check, clean_codes, num_labels, train_index, test_index, level, seed,
+                              params, detect, k, threshold)
+        for level, seed in variants
+    )
+    return pd.DataFrame([baseline] + rows)
+
+
+def summarize(results):
+    """Mean and standard deviation of every metric per poison level."""
+    metrics = [c for c in results.columns if c not in ("poison_level", "seed")]
+    return results.groupby("poison_level")[metrics].agg(["mean", "std"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep label-poisoning levels and measure model robustness.")
+    parser.add_argument("--data-path", type=str, default="data/iris.csv", help="Path to the clean CSV.")
+    parser.add_argument("--levels", type=float, nargs="+", default=DEFAULT_LEVELS, help="Fractions of labels to flip.")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2], help="Poisoning seeds per level.")
+    parser.add_argument("--detect", action="store_true", help="Also measure how many flipped labels the KNN check finds.")
+    parser.add_argument("--k", type=int, default=5, help="Neighbors used by the label check.")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Disagreeing fraction that flags a label.")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Worker processes (-1 for all cores).")
+    parser.add_argument("--output-path", type=str, default="artifacts/robustness_sweep.csv", help="Where to save the per-variant table.")
+
+    args = parser.parse_args()
+
+    if not all(0.0 <= level <= 1.0 for level in args.levels):
+        raise ValueError("Poison levels must be between 0.0 and 1.0")
+
+    results = robustness_sweep(
+        args.data_path,
+        levels=args.levels,
+        seeds=args.seeds,
+        detect=args.detect,
+        k=args.k,
+        threshold=args.threshold,
+        n_jobs=args.n_jobs,
+    )
+    os.makedirs(os.path.dirname(args.output_path) or ".", exist_ok=True)
+    results.to_csv(args.output_path, index=False)
+    print("\n--- Accuracy vs. poison level ---")
+    print(summarize(results).round(3).to_string())
+    print(f"\nPer-variant results saved to {args.output_path}")
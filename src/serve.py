@@ -0,0 +1,304 @@
+# serve.py
+
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from hashing import file_sha256
+from model_format import load_model
+from prediction_log import LOG_DIR, UNKNOWN_LOCATION, PredictionLogger
+
+# Sentinel placed on the queue to stop the batching thread.
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Collects concurrent prediction requests into micro-batches.
+
+    A single background thread drains the request queue: it waits for the
+    first request, then keeps collecting until either `max_batch_size` rows
+    are queued or `max_wait_ms` has passed, and scores the whole batch with
+    one `predict_proba` call. This amortizes scikit-learn's per-call input
+    validation across every request in the batch. If a batch fails, each
+    request is re-scored alone, so one bad request fails only itself. With a `prediction_log`,
+    every scored batch is handed to it after the responses are released.
+    """
+
+    def __init__(self, model, label_encoder, max_batch_size=64, max_wait_ms=2.0, prediction_log=None):
+        self.model = model
+        self.label_encoder = label_encoder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.prediction_log = prediction_log
+        self.feature_names = list(getattr(model, "feature_names_in_", []))
+        self.batches_served = 0
+        self.rows_served = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, rows, locations=None):
+        """
+        Queues a 2-D array of feature rows for prediction.
+
+        Args:
+            rows (array-like): Feature rows.
+            locations (list, optional): 'location' of each row, recorded in the prediction log.
+
+        Returns:
+            concurrent.futures.Future: Resolves to a list of per-row prediction dicts.
+        """
+        future = Future()
+        if locations is None:
+            locations = [UNKNOWN_LOCATION] * len(rows)
+        self._queue.put((np.asarray(rows, dtype=np.float64), future, locations))
+        return future
+
+    def close(self):
+        """Stops the batching thread after the queued requests are served."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self, first):
+        """Gathers queued requests behind `first` until the batch is full or the wait expires."""
+        batch = [first]
+        num_rows = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        stop = False
+        while num_rows < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+            num_rows += len(item[0])
+        return batch, stop
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first)
+            self._predict(batch)
+            if stop:
+                return
+
+    def _score(self, features):
+        X = pd.DataFrame(features, columns=self.feature_names) if self.feature_names else features
+        # One predict_proba call per batch; the predicted label is the
+        # arg-max class, exactly as DecisionTreeClassifier.predict does.
+        proba = self.model.predict_proba(X)
+        codes = np.argmax(proba, axis=1)
+        labels = self.model.classes_.take(codes)
+        return proba, codes, labels, self.label_encoder.transform(labels)
+
+    def _predict(self, batch):
+        try:
+            features = np.vstack([rows for rows, _, _ in batch])
+            proba, codes, labels, class_ids = self._score(features)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Re-score each request on its own so one bad request fails only itself.
+            for request in batch:
+                self._predict([request])
+            return
+
+        classes = [str(c) for c in self.model.classes_]
+        start = 0
+        for rows, future, _ in batch:
+            stop = start + len(rows)
+            future.set_result([
+                {
+                    "species": str(labels[i]),
+                    "class_id": int(class_ids[i]),
+                    "probabilities": dict(zip(classes, proba[i].tolist())),
+                }
+                for i in range(start, stop)
+            ])
+            start = stop
+        self.batches_served += 1
+        self.rows_served += len(features)
+        if self.prediction_log is not None:
+            locations = np.concatenate([np.asarray(locations) for _, _, locations in batch])
+            self.prediction_log.log(features, codes, proba, locations)
+
+
+def parse_instances(payload, feature_names):
+    """
+    Converts a request body into a 2-D list of feature rows.
+
+    Accepts a single instance or {"instances": [...]}, where each instance is
+    either a {feature: value} mapping or a list of values in feature order.
+    """
+    instances = payload["instances"] if isinstance(payload, dict) and "instances" in payload else [payload]
+    rows = []
+    for instance in instances:
+        if isinstance(instance, dict):
+            rows.append([float(instance[name]) for name in feature_names])
+        else:
+            rows.append([float(value) for value in instance])
+        if feature_names and len(rows[-1]) != len(feature_names):
+            raise ValueError(f"Expected {len(feature_names)} features, got {len(rows[-1])}")
+        # json.loads accepts NaN and Infinity, which the model cannot score.
+        if not all(math.isfinite(value) for value in rows[-1]):
+            raise ValueError(f"Non-finite feature value in instance {len(rows) - 1}")
+    if not rows:
+        raise ValueError("No instances to score")
+    return rows
+
+
+def parse_locations(payload):
+    """The 'location' of every instance of a request body, UNKNOWN_LOCATION where it is not given."""
+    instances = payload["instances"] if isinstance(payload, dict) and "instances" in payload else [payload]
+    return [
+        int(instance["location"]) if isinstance(instance, dict) and "location" in instance else UNKNOWN_LOCATION
+        for instance in instances
+    ]
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY, Nagle's
+    # algorithm holds the body for the client's delayed ACK (~40 ms per request).
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+        batcher = self.server.batcher
+        health = {
+            "status": "ok",
+            "batches_served": batcher.batches_served,
+            "rows_served": batcher.rows_served,
+        }
+        if batcher.prediction_log is not None:
+            health["rows_logged"] = batcher.prediction_log.rows_logged
+            health["log_batches_dropped"] = batcher.prediction_log.dropped
+        self._send_json(200, health)
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            rows = parse_instances(payload, self.server.batcher.feature_names)
+            locations = parse_locations(payload)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+            return
+        try:
+            predictions = self.server.batcher.submit(rows, locations).result(timeout=self.server.request_timeout)
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {"predictions": predictions})
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Per-request access logs would dominate the hot path.
+        pass
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 drops connections under concurrent load.
+    request_queue_size = 128
+
+
+def create_server(host="127.0.0.1", port=8080, model_path="artifacts/model.joblib",
+                  encoder_path="artifacts/label_encoder.joblib", max_batch_size=64, max_wait_ms=2.0,
+                  request_timeout=10.0, prediction_log_dir=None, log_segment_mb=64, log_segment_seconds=3600):
+    """
+    Loads the model and label encoder once and builds the HTTP server around a MicroBatcher.
+
+    With `prediction_log_dir`, every prediction is recorded there by a
+    PredictionLogger, tagged with the hash of the model file.
+
+    Returns:
+        PredictionServer: Server with a `batcher` attribute; call serve_forever() to run it.
+    """
+    model = load_model(model_path)
+    le = joblib.load(encoder_path)
+    prediction_log = None
+    if prediction_log_dir:
+        prediction_log = PredictionLogger(
+            prediction_log_dir,
+            model_hash=file_sha256(model_path),
+            classes=model.classes_,
+            feature_names=getattr(model, "feature_names_in_", []),
+            max_segment_bytes=int(log_segment_mb * 1024 * 1024),
+            max_segment_seconds=log_segment_seconds,
+        )
+    server = PredictionServer((host, port), PredictionHandler)
+    server.batcher = MicroBatcher(model, le, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                                  prediction_log=prediction_log)
+    server.request_timeout = request_timeout
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve model predictions over HTTP with micro-batching.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind.")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on.")
+    parser.add_argument("--model-path", type=str, default="artifacts/model.joblib", help="Path to the model artifact (.joblib, or .tree to memory-map it).")
+    parser.add_argument("--encoder-path", type=str, default="artifacts/label_encoder.joblib", help="Path to the label encoder artifact.")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Maximum rows scored per batch.")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Maximum time a request waits for its batch to fill.")
+    parser.add_argument("--prediction-log-dir", type=str, default=None,
+                        help=f"Record every prediction in this directory (e.g. {LOG_DIR}); disabled by default.")
+    parser.add_argument("--log-segment-mb", type=float, default=64, help="Size at which a log segment is sealed.")
+    parser.add_argument("--log-segment-seconds", type=float, default=3600, help="Age at which a log segment is sealed.")
+
+    args = parser.parse_args()
+
+    server = create_server(
+        host=args.host,
+        port=args.port,
+        model_path=args.model_path,
+        encoder_path=args.encoder_path,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        prediction_log_dir=args.prediction_log_dir,
+        log_segment_mb=args.log_segment_mb,
+        log_segment_seconds=args.log_segment_seconds,
+    )
+    print(f"Serving predictions on http://{args.host}:{args.port}/predict "
+          f"(max_batch_size={args.max_batch_size}, max_wait_ms={args.max_wait_ms})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+        if server.batcher.prediction_log is not None:
+            server.batcher.prediction_log.close()
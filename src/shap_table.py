@@ -0,0 +1,136 @@
+# shap_table.py
+
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+
+
+class ShapTable:
+    """
+    Precomputed path-dependent tree SHAP values for every region of a tree.
+
+    Tree SHAP depends on which side of *every* split a row falls, not only
+    on the leaf it reaches (splits off the row's own path still matter), so
+    rows in the same leaf can get different attributions. The thresholds of
+    each feature cut its axis into intervals, and every row inside the same
+    cell of that grid follows the same side of all splits and therefore gets
+    identical SHAP values. For a shallow tree the grid is small, so the
+    values of all cells are computed once and `explain(X)` reduces to a
+    binary search per feature plus a gather.
+    """
+
+    def __init__(self, thresholds, values, expected_value, feature_names, classes):
+        self.thresholds = [np.asarray(t, dtype=np.float64) for t in thresholds]
+        self.values = np.asarray(values)
+        self.expected_value = np.asarray(expected_value)
+        self.feature_names = list(feature_names)
+        self.classes = np.asarray(classes)
+        self.grid_shape = tuple(len(t) + 1 for t in self.thresholds)
+
+    @staticmethod
+    def _representatives(thresholds):
+        """One float32 value inside each interval cut by the sorted thresholds."""
+        if len(thresholds) == 0:
+            return np.zeros(1, dtype=np.float32)
+        reps = []
+        for t in thresholds:
+            # Largest float32 not above the threshold: takes the left branch.
+            v = np.float32(t)
+            if v > t:
+                v = np.nextafter(v, np.float32(-np.inf))
+            reps.append(v)
+        # Smallest float32 above the last threshold: takes the right branch.
+        v = np.float32(thresholds[-1])
+        if v <= thresholds[-1]:
+            v = np.nextafter(v, np.float32(np.inf))
+        reps.append(v)
+        return np.array(reps, dtype=np.float32)
+
+    @classmethod
+    def from_model(cls, model, max_cells=1_000_000):
+        """
+        Computes the SHAP values of every grid cell of a fitted decision tree.
+
+        Args:
+            model (DecisionTreeClassifier): The fitted model.
+            max_cells (int): Refuse trees whose grid would exceed this many cells.
+
+        Returns:
+            ShapTable: The lookup table.
+        """
+        import shap
+
+        tree = model.tree_
+        feature_names = list(model.feature_names_in_)
+        split_nodes = tree.children_left != -1
+        thresholds = [
+            np.unique(tree.threshold[split_nodes & (tree.feature == f)])
+            for f in range(len(feature_names))
+        ]
+        grid_shape = tuple(len(t) + 1 for t in thresholds)
+        num_cells = int(np.prod(grid_shape))
+        if num_cells > max_cells:
+            raise ValueError(f"SHAP table would need {num_cells} cells (limit {max_cells}).")
+
+        axes = [cls._representatives(t) for t in thresholds]
+        grid = np.stack([a.ravel() for a in np.meshgrid(*axes, indexing="ij")], axis=1)
+        explainer = shap.TreeExplainer(model)
+        values = explainer.shap_values(pd.DataFrame(grid, columns=feature_names))
+
+        return cls(thresholds, values, explainer.expected_value, feature_names, model.classes_)
+
+    def cell_index(self, X):
+        """Returns the grid cell of each row of X."""
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_names]
+        # Cast like scikit-learn does before comparing against the thresholds.
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if np.isnan(X).any():
+            raise ValueError("ShapTable does not support missing values.")
+        # Number of thresholds strictly below x == number of splits on this feature that go right.
+        positions = [np.searchsorted(t, X[:, f], side="left") for f, t in enumerate(self.thresholds)]
+        return np.ravel_multi_index(positions, self.grid_shape)
+
+    def explain(self, X):
+        """
+        SHAP values for each row of X, identical to shap.TreeExplainer(model).shap_values(X).
+
+        Returns:
+            numpy.ndarray: Array of shape (rows, features, classes).
+        """
+        return self.values[self.cell_index(X)]
+
+    def save(self, path):
+        # Plain arrays and lists, so loading does not depend on this module's import path.
+        joblib.dump({
+            "thresholds": self.thresholds,
+            "values": self.values,
+            "expected_value": self.expected_value,
+            "feature_names": self.feature_names,
+            "classes": self.classes,
+        }, path)
+
+    @classmethod
+    def load(cls, path):
+        return cls(**joblib.load(path))
+
+
+def build_shap_table(model_path="artifacts/model.joblib", table_path="artifacts/shap_table.joblib"):
+    """Builds the SHAP lookup table for a saved model and stores it next to it."""
+    model = joblib.load(model_path)
+    table = ShapTable.from_model(model)
+    table.save(table_path)
+    print(f"SHAP table with {len(table.values)} cells saved to {table_path}")
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the SHAP lookup table of a decision tree.")
+    parser.add_argument("--model-path", type=str, default="artifacts/model.joblib", help="Path to the model artifact.")
+    parser.add_argument("--table-path", type=str, default="artifacts/shap_table.joblib", help="Where to save the table.")
+
+    args = parser.parse_args()
+
+    build_shap_table(args.model_path, args.table_path)
@@ -0,0 +1,106 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_dataset
+
+FEATURE_COLUMNS = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+# Rows drawn per block. Every block has its own seed, so the output depends
+# only on the seed and the row count.
+BLOCK_ROWS = 100_000
+
+
+def fit_class_stats(data_path="data/iris.csv"):
+    """
+    Summarizes the source data per species for the synthetic generator.
+
+    Returns:
+        dict: Per-species share of rows, feature means and covariance, and the
+        distribution of 'location', plus the location values.
+    """
+    df = load_dataset(data_path, float_dtype=np.float64)
+    df['species'] = df['species'].astype(str)
+    locations = sorted(df['location'].unique().tolist())
+    shares = df['species'].value_counts(normalize=True).sort_index()
+    classes = {}
+    for species, group in df.groupby('species'):
+        features = group[FEATURE_COLUMNS].to_numpy()
+        location_share = group['location'].value_counts(normalize=True)
+        classes[species] = {
+            "share": float(shares[species]),
+            "mean": features.mean(axis=0),
+            "cov": np.cov(features, rowvar=False),
+            "location_probs": np.array([location_share.get(loc, 0.0) for loc in locations]),
+        }
+    return {"classes": classes, "locations": locations}
+
+
+def generate_block(stats, num_rows, seed, block):
+    """
+    Draws `num_rows` synthetic rows with the iris schema.
+
+    Species follow the source class shares; features are drawn from each
+    species' multivariate normal, rounded to the source's one decimal and kept
+    positive; 'location' follows the source location distribution of the species.
+    """
+    rng = np.random.default_rng([seed, block])
+    names = sorted(stats["classes"])
+    shares = np.array([stats["classes"][name]["share"] for name in names])
+    species_codes = rng.choice(len(names), size=num_rows, p=shares / shares.sum())
+
+    features = np.empty((num_rows, len(FEATURE_COLUMNS)))
+    locations = np.empty(num_rows, dtype=np.asarray(stats["locations"]).dtype)
+    for code, name in enumerate(names):
+        rows = np.flatnonzero(species_codes == code)
+        spec = stats["classes"][name]
+        features[rows] = rng.multivariate_normal(spec["mean"], spec["cov"], size=len(rows), method="cholesky")
+        locations[rows] = rng.choice(stats["locations"], size=len(rows), p=spec["location_probs"])
+    features = np.clip(np.round(features, 1), 0.1, None)
+
+    block_df = pd.DataFrame(features, columns=FEATURE_COLUMNS)
+    block_df['species'] = np.asarray(names, dtype=object)[species_codes]
+    block_df['location'] = locations
+    return block_df
+
+
+def generate_synthetic(num_rows, output_path, data_path="data/iris.csv", seed=0):
+    """
+    Writes `num_rows` synthetic iris rows to `output_path`, one block at a time.
+
+    Memory use is bounded by BLOCK_ROWS, so sizes up to 1e8 rows can be
+    generated. The file is written to a temporary name and moved into place.
+
+    Returns:
+        str: `output_path`
+    """
+    stats = fit_class_stats(data_path)
+    output_dir = os.path.dirname(output_path) or "."
+    os.makedirs(output_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".csv.tmp")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            for block, start in enumerate(range(0, num_rows, BLOCK_ROWS)):
+                size = min(BLOCK_ROWS, num_rows - start)
+                generate_block(stats, size, seed, block).to_csv(f, header=(block == 0), index=False)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    print(f"Generated {num_rows} synthetic rows at {output_path}")
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic iris dataset of any size.")
+    parser.add_argument("--num-rows", type=int, required=True, help="Number of rows to generate.")
+    parser.add_argument("--output-path", type=str, required=True, help="Where to write the CSV.")
+    parser.add_argument("--data-path", type=str, default="data/iris.csv", help="Source data the distributions are fitted on.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generator.")
+
+    args = parser.parse_args()
+
+    generate_synthetic(args.num_rows, args.output_path, args.data_path, args.seed)
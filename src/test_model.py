@@ -1,38 +1,148 @@
+import json
 import os
+import time
+import tracemalloc
 import joblib
+import numpy as np
 import pytest
 from sklearn.metrics import accuracy_score, precision_score, f1_score
 
+# Model under test; CI sets MODEL_PATH=artifacts/model.joblib to gate the model it just trained.
+MODEL_PATH = os.getenv("MODEL_PATH", "models/model.joblib")
+TEST_DATA_PATH = "models/test_data.joblib"
+# Performance is compared with this committed model, measured in the same run on the same machine.
+PERF_REFERENCE_PATH = os.getenv("PERF_REFERENCE_MODEL", "models/model.joblib")
+# Tolerance, absolute slack and batch sizes of the performance gate.
+PERF_GATE_PATH = "models/perf_gate.json"
+
 @pytest.fixture(scope="module")
 def load_model_and_data():
-    model_path = "models/model.joblib"
-    test_data_path = "models/test_data.joblib"
-
-    assert os.path.exists(model_path), f"Model file not found: {model_path}"
-    assert os.path.exists(test_data_path), f"Test data file not found: {test_data_path}"
+    assert os.path.exists(MODEL_PATH), f"Model file not found: {MODEL_PATH}"
+    assert os.path.exists(TEST_DATA_PATH), f"Test data file not found: {TEST_DATA_PATH}"
 
-    model = joblib.load(model_path)
-    X_test, y_test = joblib.load(test_data_path)
+    model = joblib.load(MODEL_PATH)
+    X_test, y_test = joblib.load(TEST_DATA_PATH)
 
     return model, X_test, y_test
 
-def test_model_accuracy(load_model_and_data):
+@pytest.fixture(scope="module")
+def predictions(load_model_and_data):
+    # Scored once and shared by every quality test
     model, X_test, y_test = load_model_and_data
-    y_pred = model.predict(X_test)
+    return y_test, model.predict(X_test)
+
+def test_model_accuracy(predictions):
+    y_test, y_pred = predictions
     acc = accuracy_score(y_test, y_pred)
 
     assert acc >= 0.9, f"Accuracy below threshold: {acc:.3f}"
 
-def test_model_precision(load_model_and_data):
-    model, X_test, y_test = load_model_and_data
-    y_pred = model.predict(X_test)
+def test_model_precision(predictions):
+    y_test, y_pred = predictions
     precision = precision_score(y_test, y_pred, average='macro')
 
     assert precision >= 0.9, f"Precision below threshold: {precision:.3f}"
 
-def test_model_f1_score(load_model_and_data):
-    model, X_test, y_test = load_model_and_data
-    y_pred = model.predict(X_test)
+def test_model_f1_score(predictions):
+    y_test, y_pred = predictions
     f1 = f1_score(y_test, y_pred, average='macro')
 
     assert f1 >= 0.9, f"F1 Score below threshold: {f1:.3f}"
+
+
+# --- Performance gates ---
+
+def _best_of(fn, trials, warmup=1):
+    """Runs `fn` `warmup` times untimed, then returns the best wall time of `trials` runs."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(trials):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def _single_row_p99_ms(model, X, requests=300):
+    rows = [X.iloc[[i % len(X)]] for i in range(requests)]
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 99))
+
+def measure_performance(model_path, X, batch_sizes, trials=3):
+    """
+    Load time, single-row p99 latency, throughput per batch size and peak memory.
+
+    Every timing is the best of `trials` after a warm-up run. Peak memory is
+    the largest traced allocation while loading the model and scoring the
+    largest batch.
+    """
+    model = joblib.load(model_path)
+    metrics = {"load_seconds": _best_of(lambda: joblib.load(model_path), trials)}
+
+    _single_row_p99_ms(model, X, requests=20)  # warm-up
+    metrics["latency_p99_ms"] = min(_single_row_p99_ms(model, X) for _ in range(trials))
+
+    metrics["throughput_rows_per_s"] = {}
+    for batch_size in batch_sizes:
+        batch = X.iloc[np.arange(batch_size) % len(X)]
+        # Enough calls per trial that small batches are not timer noise
+        calls = max(1, 256 // batch_size)
+        seconds = _best_of(lambda: [model.predict(batch) for _ in range(calls)], trials)
+        metrics["throughput_rows_per_s"][str(batch_size)] = calls * batch_size / seconds
+
+    largest = X.iloc[np.arange(max(batch_sizes)) % len(X)]
+    tracemalloc.start()
+    try:
+        joblib.load(model_path).predict(largest)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    metrics["peak_mb"] = peak / (1024 * 1024)
+    return metrics
+
+def performance_regressions(current, baseline, tolerance, slack):
+    """
+    Lists metrics worse than the baseline (e.g. the reference model) by more than `tolerance` (a fraction).
+
+    Costs may grow to baseline * (1 + tolerance) + slack[metric]; the absolute
+    slack keeps sub-millisecond timings from failing on scheduler noise.
+    Throughput may fall to baseline / (1 + tolerance).
+    """
+    regressions = []
+    for metric in ("load_seconds", "latency_p99_ms", "peak_mb"):
+        limit = baseline[metric] * (1 + tolerance) + slack.get(metric, 0.0)
+        if current[metric] > limit:
+            regressions.append(f"{metric}: {current[metric]:.4f} > {limit:.4f} (baseline {baseline[metric]:.4f})")
+    for batch_size, rows_per_s in current["throughput_rows_per_s"].items():
+        base = baseline["throughput_rows_per_s"].get(batch_size)
+        if base is not None and rows_per_s < base / (1 + tolerance):
+            regressions.append(
+                f"throughput @ batch {batch_size}: {rows_per_s:,.0f} rows/s < {base / (1 + tolerance):,.0f} "
+                f"(baseline {base:,.0f})"
+            )
+    return regressions
+
+@pytest.fixture(scope="module")
+def perf_gate():
+    assert os.path.exists(PERF_GATE_PATH), f"Performance gate config not found: {PERF_GATE_PATH}"
+    with open(PERF_GATE_PATH) as f:
+        return json.load(f)
+
+def test_model_performance(load_model_and_data, perf_gate):
+    _, X_test, _ = load_model_and_data
+    assert os.path.exists(PERF_REFERENCE_PATH), f"Reference model not found: {PERF_REFERENCE_PATH}"
+    # PERF_BATCH_SIZES="1,64,4096" and PERF_TOLERANCE=0.5 override the gate config
+    batch_sizes = [int(b) for b in os.getenv("PERF_BATCH_SIZES", ",".join(map(str, perf_gate["batch_sizes"]))).split(",")]
+    tolerance = float(os.getenv("PERF_TOLERANCE", perf_gate["tolerance"]))
+    trials = int(os.getenv("PERF_TRIALS", 3))
+
+    # Both models are measured here, so the gate tracks the model rather than the runner's speed
+    reference = measure_performance(PERF_REFERENCE_PATH, X_test, batch_sizes, trials=trials)
+    current = measure_performance(MODEL_PATH, X_test, batch_sizes, trials=trials)
+
+    regressions = performance_regressions(current, reference, tolerance, perf_gate["slack"])
+    assert not regressions, f"Performance of {MODEL_PATH} regressed against {PERF_REFERENCE_PATH}:\n" + "\n".join(regressions)
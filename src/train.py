@@ -1,13 +1,16 @@
-import os, joblib, mlflow
-import pandas as pd
-from sklearn.model_selection import train_test_split
+import argparse, json, os, time, joblib
+from joblib import Parallel, delayed
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold, train_test_split
 from sklearn.preprocessing import LabelEncoder
 from sklearn.tree import DecisionTreeClassifier
 from sklearn import metrics
-from mlflow.models import infer_signature
-from google.cloud import aiplatform, storage
+from backends import get_artifact_store, get_tracker
+from publish import publish_artifacts
+from model_format import save_mmap_model
+from shap_table import ShapTable
+from data_store import load_dataset
+from instrumentation import TRACER, finish, log_metrics, span
 
-print("DEMO")
 # --- Configuration ---
 # In a real pipeline, these would come from environment variables or a config file
 PROJECT_ID = "premium-cipher-462011-p3"  # @param {type:"string"}
@@ -18,97 +21,321 @@ MODEL_ARTIFACT_DIR = "my-models/iris-classifier-week-1"  # @param {type:"string"
 REPOSITORY = "iris-classifier-repo"  # @param {type:"string"}
 IMAGE = "iris-classifier-img"  # @param {type:"string"}
 MODEL_DISPLAY_NAME = "iris-classifier"  # @param {type:"string"}
+# Files under artifacts/ published by every training run
+TRAINING_ARTIFACTS = ["model.joblib", "model.tree", "label_encoder.joblib", "shap_table.joblib"]
 
-
-# --- MLflow Tracking URI based on environment ---
-if os.getenv('CI'):
-    # In CI, save MLflow data locally
-    mlflow_tracking_uri = "file:./mlruns"
-    print(f"CI environment detected. Using local MLflow tracking URI: {mlflow_tracking_uri}")
-    REGISTERED_MODEL_NAME = ""
-else:
-    # Replace with the actual external IP of your GCP instance
-    EXTERNAL_IP = "http://34.59.44.241:8100"  # Replace this dynamically if needed
-    mlflow_tracking_uri = EXTERNAL_IP
-    print(f"Local environment detected. Using remote MLflow tracking URI: {mlflow_tracking_uri}")
-    REGISTERED_MODEL_NAME = "IRIS-classifier-decisiontrees"
-
-# --- Initialize clients and MLflow ---
-aiplatform.init(project=PROJECT_ID, location=LOCATION, staging_bucket=BUCKET_URI)
-mlflow.set_tracking_uri(mlflow_tracking_uri)
-mlflow.set_experiment("Iris_Classification_Experiment")
-
-# --- Helper Function for GCS Upload ---
-def upload_to_gcs(bucket_name, source_file_path, destination_blob_name):
-    """Uploads a file to the specified GCS bucket."""
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(destination_blob_name)
-    blob.upload_from_filename(source_file_path)
-    print(f"File {source_file_path} uploaded to gs://{bucket_name}/{destination_blob_name}")
-# Load data
-data = pd.read_csv("data/iris.csv")
-X = data[['sepal_length','sepal_width','petal_length','petal_width']]
-y = data['species']
-
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.4, random_state=1)
-
-# Train model
-print("Fitting LabelEncoder...")
-le = LabelEncoder()
-le.fit(y_train)
-
-# 4. Train Model
-params = {
+FEATURE_COLUMNS = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+DEFAULT_PARAMS = {
     "max_depth": 4,
     "random_state": 1
 }
-model = DecisionTreeClassifier(**params)
-model.fit(X_train, y_train)
-
-# # Save model and test data
-# os.makedirs("models", exist_ok=True)
-# joblib.dump(model, "models/decision_tree_model.joblib")
-# joblib.dump((X_test, y_test), "models/test_data.joblib")
-
-# print("Model and test data saved.")
-
-
-
-# 5. Evaluate Model
-prediction = model.predict(X_test)
-accuracy_score = metrics.accuracy_score(prediction, y_test)
-print('The accuracy of the Decision Tree is', "{:.3f}".format(accuracy_score))
-
-# 6. Save and Upload Artifacts (Model AND Encoder)
-os.makedirs("artifacts", exist_ok=True)
-print("Saving model and label encoder artifacts...")
-joblib.dump(model, "artifacts/model.joblib")
-joblib.dump(le, "artifacts/label_encoder.joblib") ### FIXED ###: Save the encoder
-
-# Use the Python function for GCS upload
-bucket_name_str = BUCKET_URI.replace("gs://", "")
-model_gcs_path = f"{MODEL_ARTIFACT_DIR}/model.joblib"
-encoder_gcs_path = f"{MODEL_ARTIFACT_DIR}/label_encoder.joblib" ### FIXED ###: Define GCS path for encoder
-
-upload_to_gcs(bucket_name_str, "artifacts/model.joblib", model_gcs_path)
-upload_to_gcs(bucket_name_str, "artifacts/label_encoder.joblib", encoder_gcs_path) ### FIXED ###: Upload the encoder
-
-# 7. Log Experiment with MLflow
-with mlflow.start_run() as run:
-    mlflow.log_params(params)
-    mlflow.log_metric("accuracy", accuracy_score)
-    mlflow.set_tag("Training Info", "Decision tree model for IRIS data")
-
-    signature = infer_signature(X_train, model.predict(X_train))
-    
-    model_info = mlflow.sklearn.log_model(
-        sk_model=model,
-        artifact_path="iris_model",
-        signature=signature,
-        input_example=X_train.head(1),
-        # Use the variable to conditionally register the model
-        registered_model_name=REGISTERED_MODEL_NAME if REGISTERED_MODEL_NAME else None, ### FIXED ###
+# Search space used by --sweep when no space is given.
+DEFAULT_SPACE = {
+    "max_depth": [2, 3, 4, 5, 6, None],
+    "min_samples_leaf": [1, 2, 4, 8],
+    "criterion": ["gini", "entropy", "log_loss"],
+    "random_state": [1],
+}
+
+# Without --cv, sweep candidates are scored on this fraction of the training split.
+VALIDATION_SIZE = 0.25
+
+# --- Backends ---
+# The GCS store and the MLflow tracker import their client libraries only when
+# selected; the local defaults start instantly and never touch the network.
+ARTIFACT_STORE = os.getenv("ARTIFACT_STORE", "local")
+TRACKER = os.getenv("TRACKER", "file")
+# Replace with the actual external IP of your GCP instance, or set MLFLOW_TRACKING_URI
+MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://34.59.44.241:8100")
+REGISTERED_MODEL_NAME = "IRIS-classifier-decisiontrees"
+
+
+def make_backends(artifact_store=ARTIFACT_STORE, tracker=TRACKER):
+    """
+    Creates the artifact store ('local' or 'gcs') and experiment tracker ('file' or 'mlflow').
+
+    Returns:
+        tuple: (artifact store, tracker)
+    """
+    if artifact_store == "gcs":
+        store = get_artifact_store("gcs", bucket_uri=BUCKET_URI, project=PROJECT_ID, location=LOCATION)
+    else:
+        store = get_artifact_store(artifact_store)
+
+    if tracker == "mlflow":
+        # In CI, keep MLflow data local and don't register the model
+        ci = bool(os.getenv('CI'))
+        tracking_uri = "file:./mlruns" if ci else MLFLOW_TRACKING_URI
+        print(f"Using MLflow tracking URI: {tracking_uri}")
+        run_tracker = get_tracker("mlflow", tracking_uri=tracking_uri,
+                                  registered_model_name="" if ci else REGISTERED_MODEL_NAME)
+    else:
+        run_tracker = get_tracker(tracker)
+    return store, run_tracker
+
+
+def load_split(data_path="data/iris.csv", test_size=0.4, random_state=1):
+    """
+    Loads the data and makes the train-test split used by every candidate.
+
+    Returns:
+        tuple: (X_train, X_test, y_train, y_test)
+    """
+    with span("load") as s:
+        data = load_dataset(data_path)
+        s["rows"] = len(data)
+    X = data[FEATURE_COLUMNS]
+    y = data['species']
+    with span("split", rows=len(data)):
+        return train_test_split(X, y, test_size=test_size, random_state=random_state)
+
+
+def train_model(X_train, y_train, params=DEFAULT_PARAMS):
+    """Fits a DecisionTreeClassifier with `params`."""
+    model = DecisionTreeClassifier(**params)
+    model.fit(X_train, y_train)
+    return model
+
+
+def evaluate_model(model, X_test, y_test):
+    """Test-set accuracy of a fitted model."""
+    prediction = model.predict(X_test)
+    return metrics.accuracy_score(prediction, y_test)
+
+
+def parse_space(spec):
+    """
+    Turns a JSON search space into lists and scipy distributions.
+
+    Values are either lists of choices or, for random search, a distribution
+    such as {"randint": [1, 10]} or {"uniform": [0.0, 0.05]} (loc, scale).
+    """
+    from scipy import stats
+
+    space = {}
+    for name, values in spec.items():
+        if isinstance(values, dict):
+            (dist, args), = values.items()
+            space[name] = getattr(stats, dist)(*args)
+        else:
+            space[name] = list(values)
+    return space
+
+
+def sweep_candidates(space=DEFAULT_SPACE, n_iter=None, seed=0):
+    """
+    Lists the parameter sets of a sweep.
+
+    Returns:
+        list: Every grid point when `n_iter` is None, else `n_iter` random draws.
+    """
+    if n_iter is None:
+        distributions = sorted(name for name, values in space.items() if hasattr(values, "rvs"))
+        if distributions:
+            raise ValueError(f"Distributions for {', '.join(distributions)} need random search; set n_iter (--n-iter).")
+        return list(ParameterGrid(space))
+    return list(ParameterSampler(space, n_iter=n_iter, random_state=seed))
+
+
+def _score_candidate(params, X_train, y_train, folds):
+    """Scores one parameter set by mean accuracy over (fit, validation) index pairs of the training split."""
+    start = time.perf_counter()
+    score = sum(
+        evaluate_model(train_model(X_train.iloc[fit], y_train.iloc[fit], params), X_train.iloc[val], y_train.iloc[val])
+        for fit, val in folds
+    ) / len(folds)
+    return {"params": params, "accuracy": float(score), "fit_seconds": time.perf_counter() - start}
+
+
+def run_sweep(candidates, X_train, y_train, cv=None, n_jobs=-1):
+    """
+    Scores every candidate across a process pool.
+
+    Candidates are scored on the training split only: by k-fold CV when `cv`
+    is set, else on a stratified validation split of VALIDATION_SIZE. The
+    folds are computed once here and shared by all candidates; joblib
+    memory-maps the arrays into the workers.
+
+    Raises:
+        ValueError: When there are no candidates.
+
+    Returns:
+        list: One result dict per candidate, in candidate order.
+    """
+    if not candidates:
+        raise ValueError("The sweep has no candidates; n_iter (--n-iter) must be positive.")
+    if cv:
+        folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=1).split(X_train, y_train))
+    else:
+        fit, val = train_test_split(range(len(X_train)), test_size=VALIDATION_SIZE, stratify=y_train, random_state=1)
+        folds = [(fit, val)]
+    return Parallel(n_jobs=n_jobs, batch_size="auto")(
+        delayed(_score_candidate)(params, X_train, y_train, folds) for params in candidates
     )
-    print(f"MLflow Run completed. Run ID: {run.info.run_id}")
+
+
+def export_artifacts(model, le, store):
+    """
+    Saves the model, label encoder and SHAP table and publishes them to `store`.
+
+    The SHAP table is skipped, with a warning, for trees too large to
+    tabulate, so a deep winning model is still exported in full.
+    """
+    os.makedirs("artifacts", exist_ok=True)
+    print("Saving model and label encoder artifacts...")
+    with span("save"):
+        joblib.dump(model, "artifacts/model.joblib")
+        # Same tree as flat aligned buffers, for workers that memory-map it
+        save_mmap_model(model, "artifacts/model.tree")
+        joblib.dump(le, "artifacts/label_encoder.joblib") ### FIXED ###: Save the encoder
+
+    # Precompute per-region SHAP values so explanations are a lookup at serving time
+    print("Precomputing SHAP lookup table...")
+    with span("shap_table"):
+        try:
+            ShapTable.from_model(model).save("artifacts/shap_table.joblib")
+        except ValueError as e:
+            print(f"⚠️ Skipping SHAP lookup table: {e}")
+            # Don't leave a previous model's table next to this model
+            if os.path.exists("artifacts/shap_table.joblib"):
+                os.remove("artifacts/shap_table.joblib")
+
+    # Uploads run concurrently and skip files the store already holds
+    files = [name for name in TRAINING_ARTIFACTS if os.path.exists(os.path.join("artifacts", name))]
+    with span("publish", rows=len(files)):
+        publish_artifacts(store, "artifacts", MODEL_ARTIFACT_DIR, files=files) ### FIXED ###: Upload the encoder
+
+
+def train(data_path="data/iris.csv", params=DEFAULT_PARAMS, store=None, tracker=None):
+    """
+    Trains, exports and logs a single model with `params`.
+
+    `store` and `tracker` default to the backends chosen by make_backends().
+    """
+    if store is None or tracker is None:
+        default_store, default_tracker = make_backends()
+        store, tracker = store or default_store, tracker or default_tracker
+    first_span = len(TRACER.spans)
+    with span("train"):
+        X_train, X_test, y_train, y_test = load_split(data_path)
+
+        # Train model
+        print("Fitting LabelEncoder...")
+        le = LabelEncoder()
+        le.fit(y_train)
+
+        with span("fit", rows=len(X_train)):
+            model = train_model(X_train, y_train, params)
+
+        # Evaluate Model
+        with span("predict", rows=len(X_test)):
+            accuracy_score = evaluate_model(model, X_test, y_test)
+        print('The accuracy of the Decision Tree is', "{:.3f}".format(accuracy_score))
+
+        with span("export"):
+            export_artifacts(model, le, store)
+
+    # Log Experiment
+    with tracker.start_run() as run:
+        tracker.log_params(params)
+        tracker.log_metric("accuracy", accuracy_score)
+        # Per-step timings and memory, to spot hot-path regressions across runs
+        log_metrics(tracker, since=first_span)
+        tracker.set_tag("Training Info", "Decision tree model for IRIS data")
+        tracker.log_model(model, X_train)
+        print(f"Run completed. Run ID: {run.run_id}")
+    return model
+
+
+def sweep(data_path="data/iris.csv", space=DEFAULT_SPACE, n_iter=None, seed=0, cv=None, n_jobs=-1,
+          store=None, tracker=None):
+    """
+    Runs a hyperparameter sweep and exports only the winning model.
+
+    Candidates come from a grid over `space` (or `n_iter` random draws) and
+    are scored in parallel on the training split (see `run_sweep`), so the
+    test split never influences the choice. All candidates are logged as
+    nested runs under one parent run, which also records the winner. The
+    winner is refit on the full training split, its holdout accuracy on the
+    test split is reported separately, and it is exported as in `train`.
+    """
+    if store is None or tracker is None:
+        default_store, default_tracker = make_backends()
+        store, tracker = store or default_store, tracker or default_tracker
+    first_span = len(TRACER.spans)
+    with span("sweep"):
+        X_train, X_test, y_train, y_test = load_split(data_path)
+        candidates = sweep_candidates(space, n_iter=n_iter, seed=seed)
+        metric_name = f"cv{cv}_accuracy" if cv else "val_accuracy"
+        print(f"Sweeping {len(candidates)} candidates...")
+
+        start = time.perf_counter()
+        with span("candidates", rows=len(candidates)):
+            results = run_sweep(candidates, X_train, y_train, cv=cv, n_jobs=n_jobs)
+        print(f"Scored {len(results)} candidates in {time.perf_counter() - start:.2f}s")
+
+        # Ties go to the earliest candidate, so the winner is deterministic.
+        best = max(range(len(results)), key=lambda i: (results[i]["accuracy"], -i))
+        best_params = results[best]["params"]
+        print(f"Best candidate {best}: {best_params} ({metric_name} {results[best]['accuracy']:.3f})")
+
+        le = LabelEncoder()
+        le.fit(y_train)
+        with span("fit", rows=len(X_train)):
+            model = train_model(X_train, y_train, best_params)
+        with span("predict", rows=len(X_test)):
+            accuracy_score = evaluate_model(model, X_test, y_test)
+        print('The holdout accuracy of the Decision Tree is', "{:.3f}".format(accuracy_score))
+
+        with span("export"):
+            export_artifacts(model, le, store)
+
+    with tracker.start_run(run_name="sweep") as run:
+        tracker.log_child_runs(results, metric_name)
+        tracker.log_params(best_params)
+        tracker.log_metric(metric_name, results[best]["accuracy"])
+        tracker.log_metric("accuracy", accuracy_score)
+        log_metrics(tracker, since=first_span)
+        tracker.log_metric("num_candidates", len(results))
+        tracker.set_tag("Training Info", "Decision tree sweep for IRIS data")
+        tracker.set_tag("best_candidate", f"candidate-{best:04d}")
+        tracker.log_model(model, X_train)
+        print(f"Run completed. Run ID: {run.run_id}")
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the iris classifier, optionally sweeping hyperparameters.")
+    parser.add_argument("--data-path", type=str, default="data/iris.csv", help="Path to the training CSV.")
+    parser.add_argument("--sweep", action="store_true", help="Sweep hyperparameters and export only the best model.")
+    parser.add_argument("--space", type=str, default=None,
+                        help="Search space as JSON or a path to a JSON file (default: built-in grid).")
+    parser.add_argument("--n-iter", type=int, default=None, help="Random search draws (default: full grid search).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random search.")
+    parser.add_argument("--cv", type=int, default=None, help="Score candidates by k-fold CV on the training split (default: a validation split of it).")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Worker processes for the sweep (-1 for all cores).")
+    parser.add_argument("--artifact-store", choices=["local", "gcs"], default=ARTIFACT_STORE,
+                        help="Where model artifacts are published (default: $ARTIFACT_STORE or local).")
+    parser.add_argument("--tracker", choices=["file", "mlflow"], default=TRACKER,
+                        help="Experiment tracker (default: $TRACKER or file).")
+
+    args = parser.parse_args()
+
+    print("DEMO")
+    store, tracker = make_backends(args.artifact_store, args.tracker)
+    if args.sweep:
+        space = DEFAULT_SPACE
+        if args.space:
+            if os.path.exists(args.space):
+                with open(args.space) as f:
+                    space = json.load(f)
+            else:
+                space = json.loads(args.space)
+            space = parse_space(space)
+        if args.n_iter is None and any(hasattr(values, "rvs") for values in space.values()):
+            parser.error("--space with distributions needs --n-iter (random search).")
+        sweep(args.data_path, space, n_iter=args.n_iter, seed=args.seed, cv=args.cv, n_jobs=args.n_jobs,
+              store=store, tracker=tracker)
+    else:
+        train(args.data_path, store=store, tracker=tracker)
+    finish("train")
@@ -0,0 +1,201 @@
+# validate_data.py
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Declarative schema of the iris data. Kinds are 'float', 'int' and 'category';
+# 'min'/'max' bound numeric values (inclusive) and 'allowed' lists the valid
+# values. Columns with `required: False` are only checked when present.
+IRIS_SCHEMA = {
+    "columns": {
+        "sepal_length": {"kind": "float", "min": 0.0, "max": 30.0},
+        "sepal_width": {"kind": "float", "min": 0.0, "max": 30.0},
+        "petal_length": {"kind": "float", "min": 0.0, "max": 30.0},
+        "petal_width": {"kind": "float", "min": 0.0, "max": 30.0},
+        "species": {"kind": "category", "allowed": ["Setosa", "Versicolor", "Virginica"]},
+        # Added by induce_bias.py
+        "location": {"kind": "int", "allowed": [0, 1], "required": False},
+    },
+    "max_null_rate": 0.0,
+    # The duplicate check keeps an exact hash per row, so memory grows with the
+    # data; it is opt-in (e.g. 0.05: the original iris data has one duplicated
+    # row out of 150).
+    "max_duplicate_rate": None,
+}
+
+
+class SchemaValidator:
+    """
+    Checks chunks of data against a schema and keeps per-rule failure counts.
+
+    Every rule is a boolean mask computed with one array operation per column
+    and chunk, so memory is bounded by the chunk size. The exception is the
+    opt-in duplicate check, enabled by setting `max_duplicate_rate` in the
+    schema: it is exact, and keeps one 64-bit hash per row (O(n) memory,
+    about 800 MB at 1e8 rows).
+    """
+
+    def __init__(self, schema=IRIS_SCHEMA, max_examples=20):
+        self.schema = schema
+        self.max_examples = max_examples
+        self.rows = 0
+        self.missing = []
+        self.failures = {}
+        self._hashes = []
+
+    def _record(self, rule, column, mask, offset):
+        entry = self.failures.setdefault((rule, column), {"count": 0, "rows": []})
+        count = int(mask.sum())
+        if not count:
+            return
+        entry["count"] += count
+        room = self.max_examples - len(entry["rows"])
+        if room > 0:
+            entry["rows"].extend((np.flatnonzero(mask)[:room] + offset).tolist())
+
+    def check_columns(self, columns):
+        """Records the required schema columns absent from `columns`."""
+        self.missing = [
+            name for name, spec in self.schema["columns"].items()
+            if spec.get("required", True) and name not in columns
+        ]
+        return self.missing
+
+    def update(self, chunk):
+        """
+        Validates the next chunk; row indices continue from the previous chunks.
+
+        Args:
+            chunk (pandas.DataFrame): Consecutive rows of the dataset.
+        """
+        offset = self.rows
+        for name, spec in self.schema["columns"].items():
+            if name not in chunk.columns:
+                continue
+            values = chunk[name]
+            nulls = values.isna().to_numpy()
+            self._record("null", name, nulls, offset)
+
+            if spec["kind"] == "category":
+                if "allowed" in spec:
+                    allowed = np.isin(values.astype(str).to_numpy(), [str(v) for v in spec["allowed"]])
+                    self._record("allowed", name, ~allowed & ~nulls, offset)
+                continue
+
+            # Numeric columns: values that fail to parse become NaN and are type errors.
+            numeric = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+            parsed = ~np.isnan(numeric)
+            bad_type = ~parsed & ~nulls
+            if spec["kind"] == "int":
+                bad_type |= parsed & (numeric != np.floor(numeric))
+            self._record("dtype", name, bad_type, offset)
+            with np.errstate(invalid="ignore"):
+                if "min" in spec or "max" in spec:
+                    out_of_range = (numeric < spec.get("min", -np.inf)) | (numeric > spec.get("max", np.inf))
+                    self._record("range", name, out_of_range, offset)
+                if "allowed" in spec:
+                    self._record("allowed", name, parsed & ~np.isin(numeric, spec["allowed"]), offset)
+
+        if self.schema.get("max_duplicate_rate") is not None:
+            self._hashes.append(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+        self.rows += len(chunk)
+        return self
+
+    def _duplicates(self):
+        hashes = np.concatenate(self._hashes) if self._hashes else np.empty(0, dtype=np.uint64)
+        _, first = np.unique(hashes, return_index=True)
+        mask = np.ones(len(hashes), dtype=bool)
+        mask[first] = False
+        return mask
+
+    def report(self):
+        """
+        Summarizes every rule.
+
+        Row rules (dtype, range, allowed) pass only without failures; the null
+        and duplicate rules pass while their rate stays within the schema's
+        maximum.
+
+        Returns:
+            dict: 'rows', 'passed' and 'rules', one entry per rule and column
+            with its failure count, rate and the first offending row indices.
+        """
+        rules = [
+            {"rule": "missing_column", "column": name, "failures": 1, "rate": 1.0, "rows": [], "passed": False}
+            for name in self.missing
+        ]
+        for (rule, column), entry in self.failures.items():
+            rate = entry["count"] / self.rows if self.rows else 0.0
+            passed = rate <= self.schema["max_null_rate"] if rule == "null" else entry["count"] == 0
+            rules.append({"rule": rule, "column": column, "failures": entry["count"], "rate": rate,
+                          "rows": entry["rows"], "passed": passed})
+
+        max_duplicate_rate = self.schema.get("max_duplicate_rate")
+        if max_duplicate_rate is not None:
+            duplicates = self._duplicates()
+            count = int(duplicates.sum())
+            rate = count / self.rows if self.rows else 0.0
+            rules.append({"rule": "duplicate_rate", "column": None, "failures": count, "rate": rate,
+                          "rows": np.flatnonzero(duplicates)[:self.max_examples].tolist(),
+                          "passed": rate <= max_duplicate_rate})
+        return {"rows": self.rows, "passed": all(r["passed"] for r in rules), "rules": rules}
+
+
+def validate_file(data_path="data/iris.csv", schema=IRIS_SCHEMA, chunk_size=1_000_000, max_examples=20):
+    """
+    Validates a CSV against `schema` in chunks of `chunk_size` rows.
+
+    The raw CSV is read rather than the columnar cache, so unparsable values
+    and nulls are seen as they are in the file.
+
+    Returns:
+        dict: The report of SchemaValidator.report, plus 'data_path'.
+    """
+    validator = SchemaValidator(schema, max_examples=max_examples)
+    validator.check_columns(pd.read_csv(data_path, nrows=0).columns)
+    for chunk in pd.read_csv(data_path, chunksize=chunk_size):
+        validator.update(chunk)
+    return {"data_path": data_path, **validator.report()}
+
+
+def print_report(report):
+    status = "✅ passed" if report["passed"] else "❌ failed"
+    print(f"Validation of {report['data_path']} ({report['rows']} rows) {status}")
+    for rule in report["rules"]:
+        if rule["failures"]:
+            mark = "✓" if rule["passed"] else "✗"
+            target = f" on '{rule['column']}'" if rule["column"] else ""
+            print(f"  {mark} {rule['rule']}{target}: {rule['failures']} rows ({rule['rate']:.2%}), e.g. rows {rule['rows'][:5]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate a dataset against the iris schema.")
+    parser.add_argument("--data-path", type=str, default="data/iris.csv", help="Path to the CSV to validate.")
+    parser.add_argument("--schema", type=str, default=None, help="JSON schema file (default: the built-in iris schema).")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="Rows validated per chunk.")
+    parser.add_argument("--max-examples", type=int, default=20, help="Offending row indices kept per rule.")
+    parser.add_argument("--max-duplicate-rate", type=float, default=None,
+                        help="Enable the exact duplicate-row check with this maximum rate (memory grows with the rows).")
+    parser.add_argument("--report-path", type=str, default="artifacts/validation_report.json", help="Where to save the report.")
+
+    args = parser.parse_args()
+
+    schema = IRIS_SCHEMA
+    if args.schema:
+        with open(args.schema) as f:
+            schema = json.load(f)
+    if args.max_duplicate_rate is not None:
+        schema = dict(schema, max_duplicate_rate=args.max_duplicate_rate)
+
+    report = validate_file(args.data_path, schema, args.chunk_size, args.max_examples)
+    os.makedirs(os.path.dirname(args.report_path) or ".", exist_ok=True)
+    with open(args.report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"Validation report saved to {args.report_path}")
+    sys.exit(0 if report["passed"] else 1)
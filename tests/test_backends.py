@@ -0,0 +1,30 @@
+import pytest
+
+from backends import FileTracker
+
+# meta.yaml as MLflow's file store writes it: unquoted scalars.
+MLFLOW_META = """artifact_location: file:///tmp/mlruns/{id}
+creation_time: 1718000000000
+experiment_id: '{id}'
+last_update_time: 1718000000000
+lifecycle_stage: active
+name: {name}
+"""
+
+
+@pytest.mark.parametrize("written_name", ["Iris_Classification_Experiment", "'Iris_Classification_Experiment'"])
+def test_finds_experiment_created_by_mlflow(tmp_path, written_name):
+    (tmp_path / "0").mkdir()
+    (tmp_path / "0" / "meta.yaml").write_text(MLFLOW_META.format(id=0, name="Default"))
+    (tmp_path / "412").mkdir()
+    (tmp_path / "412" / "meta.yaml").write_text(MLFLOW_META.format(id=412, name=written_name))
+
+    tracker = FileTracker(str(tmp_path), experiment="Iris_Classification_Experiment")
+    assert tracker.experiment_id == "412"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["0", "412"]
+
+
+def test_reuses_its_own_experiment(tmp_path):
+    first = FileTracker(str(tmp_path), experiment="iris: run")
+    assert FileTracker(str(tmp_path), experiment="iris: run").experiment_id == first.experiment_id
+    assert FileTracker(str(tmp_path), experiment="other").experiment_id != first.experiment_id
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from check_fairness import accumulate_logged_fairness, check_model_fairness
+from prediction_log import PredictionLogger, iter_prediction_chunks
+
+CLASSES = ["Setosa", "Versicolor", "Virginica"]
+FEATURES = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+
+
+def _write_log(log_dir, locations, rows=40):
+    rng = np.random.default_rng(0)
+    logger = PredictionLogger(str(log_dir), classes=CLASSES, feature_names=FEATURES)
+    codes = rng.integers(0, 3, size=rows)
+    logger.log(rng.random((len(codes), 4)), codes, np.eye(3)[codes], locations)
+    logger.close()
+
+
+def test_log_without_locations_reports_clear_error(tmp_path, capsys):
+    # load_test.py sends no location, so every row is logged as UNKNOWN_LOCATION
+    _write_log(tmp_path / "log", None)
+    with pytest.raises(ValueError, match="No logged rows carry a location"):
+        accumulate_logged_fairness(iter_prediction_chunks(str(tmp_path / "log")))
+
+    report_path = tmp_path / "fairness_report.json"
+    check_model_fairness(prediction_log=str(tmp_path / "log"), report_path=str(report_path))
+    assert "No logged rows carry a location" in capsys.readouterr().out
+    assert not report_path.exists()
+
+
+def test_rows_without_location_are_skipped(tmp_path):
+    _write_log(tmp_path / "log", np.array([0, 1, -1, -1] * 10))
+    accumulator = accumulate_logged_fairness(iter_prediction_chunks(str(tmp_path / "log")))
+    assert sorted(accumulator.groups) == [0, 1]
+    assert int(accumulator.counts.sum()) == 20
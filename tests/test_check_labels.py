@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.neighbors import KNeighborsClassifier
+
+from check_labels import find_suspicious_labels, suspicious_label_mask
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "iris.csv")
+
+
+def _reference_suspicious(X, y, k=5, threshold=0.5):
+    # The original row-by-row loop over KNeighborsClassifier.kneighbors
+    knn = KNeighborsClassifier(n_neighbors=k + 1).fit(X, y)
+    _, indices = knn.kneighbors(X)
+    return [i for i in range(len(X)) if np.sum(y.iloc[indices[i][1:]] != y.iloc[i]) / k >= threshold]
+
+
+@pytest.fixture(scope="module")
+def noisy_data():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(0.0, 3.0, size=(3, 4))
+    labels = rng.integers(0, 3, size=3000)
+    X = pd.DataFrame(centers[labels] + rng.normal(size=(3000, 4)))
+    y = pd.Series(np.array(["a", "b", "c"], dtype=object)[labels])
+    return X, y
+
+
+@pytest.mark.parametrize("chunk_size, n_jobs", [(None, 1), (97, 1), (512, -1)])
+def test_suspicious_rows_match_reference(noisy_data, chunk_size, n_jobs):
+    X, y = noisy_data
+    mask = suspicious_label_mask(X.to_numpy(), y.to_numpy(), chunk_size=chunk_size, n_jobs=n_jobs)
+    assert np.flatnonzero(mask).tolist() == _reference_suspicious(X, y)
+
+
+def test_iris_suspicious_rows_match_reference():
+    data = pd.read_csv(DATA_PATH)
+    assert find_suspicious_labels(DATA_PATH, chunk_size=32) == _reference_suspicious(data.drop(columns=["species"]), data["species"])
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from compiled_tree import CompiledTree
+from model_format import load_mmap_model, save_mmap_model
+
+CLASSES = np.array(["Setosa", "Versicolor", "Virginica"], dtype=object)
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 5))
+    y = CLASSES[(X[:, 0] > 0.3).astype(int) + (X[:, 1] + X[:, 2] > 0.5)]
+    # The last feature is never split on, so its count can't be read off the tree.
+    X[:, 4] = 0.0
+    return X, y
+
+
+def _noisy_rows(X, n=5000, seed=1):
+    rng = np.random.default_rng(seed)
+    rows = X[rng.integers(0, len(X), size=n)] + rng.normal(0.0, 0.2, size=(n, X.shape[1]))
+    rows[rng.random(rows.shape) < 0.01] = np.nan
+    return rows
+
+
+@pytest.mark.parametrize("frame", [False, True])
+def test_compiled_predictions_bit_identical(data, frame):
+    X, y = data
+    columns = [f"f{i}" for i in range(X.shape[1])]
+    X_fit = pd.DataFrame(X, columns=columns) if frame else X
+    model = DecisionTreeClassifier(max_depth=6, random_state=0).fit(X_fit, y)
+    compiled = CompiledTree.from_model(model)
+    rows = _noisy_rows(X)
+    X_new = pd.DataFrame(rows, columns=columns) if frame else rows
+
+    assert compiled.n_features_in_ == X.shape[1]
+    assert np.array_equal(compiled.predict(X_new), model.predict(X_new))
+    assert np.array_equal(compiled.predict_proba(X_new), model.predict_proba(X_new))
+    assert [compiled.predict_one(row) for row in rows[:200]] == list(model.predict(X_new[:200]))
+
+
+def test_mmap_round_trip_keeps_feature_count(data, tmp_path):
+    X, y = data
+    model = DecisionTreeClassifier(max_depth=6, random_state=0).fit(X, y)
+    path = str(tmp_path / "model.tree")
+    save_mmap_model(model, path)
+    loaded = load_mmap_model(path)
+    rows = _noisy_rows(X)
+
+    assert loaded.n_features_in_ == X.shape[1]
+    assert np.array_equal(loaded.predict_proba(rows), model.predict_proba(rows))
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+import data_store
+from data_store import load_dataset
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(data_store, "CONVERT_CHUNK_SIZE", 2)
+
+
+@pytest.mark.parametrize("grades", [["1", "2", "x", "y", "2"], ["x", "y", "1", "2", "x"]])
+def test_column_turning_text_between_chunks_keeps_every_value(tmp_path, small_chunks, grades):
+    csv_path = tmp_path / "data.csv"
+    lines = ["sepal_length,grade"] + [f"{i}.5,{grade}" for i, grade in enumerate(grades)]
+    csv_path.write_text("\n".join(lines) + "\n")
+
+    data = load_dataset(str(csv_path), cache_dir=str(tmp_path / "cache"))
+
+    assert list(data["grade"].astype(str)) == grades
+    assert sorted(data["grade"].cat.categories) == sorted(set(grades))
+    assert np.allclose(data["sepal_length"], [i + 0.5 for i in range(len(grades))])
+
+
+def test_categorical_columns_keep_numeric_categories(tmp_path, small_chunks):
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text("sepal_length,location\n1.0,0\n2.0,1\n3.0,1\n4.0,0\n5.0,1\n")
+
+    data = load_dataset(str(csv_path), cache_dir=str(tmp_path / "cache"))
+
+    assert list(data["location"]) == [0, 1, 1, 0, 1]
@@ -0,0 +1,134 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from validate_data import IRIS_SCHEMA, SchemaValidator, print_report, validate_file
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "iris.csv")
+
+
+@pytest.fixture(scope="module")
+def iris():
+    return pd.read_csv(DATA_PATH)
+
+
+def _failures(report):
+    return {(r["rule"], r["column"]): r["rows"] for r in report["rules"] if not r["passed"]}
+
+
+def test_repo_data_passes():
+    report = validate_file(DATA_PATH)
+    assert report["passed"], _failures(report)
+    assert report["rows"] == 150
+
+
+def test_offending_rows_found_across_chunks(iris, tmp_path):
+    data = iris.copy()
+    data.loc[3, "sepal_length"] = 100.0
+    data.loc[7, "species"] = "fakeiris"
+    data.loc[60, "location"] = 2
+    data["petal_width"] = data["petal_width"].astype(object)
+    data.loc[140, "petal_width"] = "abc"
+    data.loc[[20, 90], "sepal_width"] = np.nan
+    path = tmp_path / "bad.csv"
+    data.to_csv(path, index=False)
+
+    report = validate_file(str(path), chunk_size=16)
+    assert not report["passed"]
+    assert _failures(report) == {
+        ("range", "sepal_length"): [3],
+        ("allowed", "species"): [7],
+        ("allowed", "location"): [60],
+        ("dtype", "petal_width"): [140],
+        ("null", "sepal_width"): [20, 90],
+    }
+
+
+def test_missing_column_and_duplicate_rate(iris):
+    schema = dict(IRIS_SCHEMA, max_duplicate_rate=0.1)
+    data = iris.drop(columns=["species"])
+    validator = SchemaValidator(schema)
+    validator.check_columns(data.columns)
+    # Duplicates of rows in an earlier chunk are found as well.
+    for chunk in (data.iloc[:100], data.iloc[:50]):
+        validator.update(chunk)
+    report = validator.report()
+
+    duplicates = next(r for r in report["rules"] if r["rule"] == "duplicate_rate")
+    assert duplicates["failures"] == 50
+    assert duplicates["rows"][:3] == [100, 101, 102]
+    assert _failures(report).keys() == {("missing_column", "species"), ("duplicate_rate", None)}
+
+
+def _validate(data, tmp_path, chunk_size=1_000_000):
+    path = tmp_path / "data.csv"
+    data.to_csv(path, index=False)
+    return validate_file(str(path), chunk_size=chunk_size)
+
+
+def _rule(report, rule, column):
+    return next(r for r in report["rules"] if r["rule"] == rule and r["column"] == column)
+
+
+def test_accepted_file_reports_no_failures(iris, tmp_path):
+    report = _validate(iris.drop(columns=["location"]), tmp_path, chunk_size=40)
+    assert report["passed"]
+    assert report["rows"] == 150
+    assert all(r["passed"] and r["failures"] == 0 for r in report["rules"])
+
+
+@pytest.mark.parametrize("column, value, kind, also_failed", [
+    ("petal_length", "long", "float", set()),
+    # A fractional location is also outside the allowed values.
+    ("location", 0.5, "int", {("allowed", "location")}),
+])
+def test_wrong_dtype_is_rejected(iris, tmp_path, column, value, kind, also_failed):
+    data = iris.copy()
+    data[column] = data[column].astype(object)
+    data.loc[[5, 130], column] = value
+    report = _validate(data, tmp_path, chunk_size=50)
+
+    assert IRIS_SCHEMA["columns"][column]["kind"] == kind
+    assert not report["passed"]
+    assert _rule(report, "dtype", column) == {
+        "rule": "dtype", "column": column, "failures": 2, "rate": 2 / 150, "rows": [5, 130], "passed": False,
+    }
+    assert _failures(report).keys() == {("dtype", column)} | also_failed
+
+
+def test_out_of_range_is_rejected(iris, tmp_path):
+    data = iris.copy()
+    data.loc[0, "sepal_width"] = -0.1
+    data.loc[149, "sepal_width"] = 30.5
+    data.loc[10, "sepal_width"] = 30.0
+    report = _validate(data, tmp_path, chunk_size=50)
+
+    assert _rule(report, "range", "sepal_width") == {
+        "rule": "range", "column": "sepal_width", "failures": 2, "rate": 2 / 150, "rows": [0, 149], "passed": False,
+    }
+    assert _failures(report).keys() == {("range", "sepal_width")}
+
+
+def test_missing_column_is_rejected(iris, tmp_path, capsys):
+    report = _validate(iris.drop(columns=["petal_width", "location"]), tmp_path)
+
+    assert not report["passed"]
+    # 'location' is optional, so only the required column is reported.
+    assert [r for r in report["rules"] if r["rule"] == "missing_column"] == [
+        {"rule": "missing_column", "column": "petal_width", "failures": 1, "rate": 1.0, "rows": [], "passed": False},
+    ]
+    print_report(report)
+    assert "✗ missing_column on 'petal_width'" in capsys.readouterr().out
+
+
+def test_max_examples_caps_reported_rows(iris, tmp_path):
+    data = iris.copy()
+    data["species"] = "fakeiris"
+    path = tmp_path / "data.csv"
+    data.to_csv(path, index=False)
+    report = validate_file(str(path), chunk_size=16, max_examples=3)
+
+    assert _rule(report, "allowed", "species")["failures"] == 150
+    assert _rule(report, "allowed", "species")["rows"] == [0, 1, 2]
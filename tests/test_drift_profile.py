@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from drift_profile import EPSILON, NUMERICAL_COLUMNS, StreamingDriftDetector, build_reference_profile
+
+WINDOW = 300
+
+
+def _frame(n, seed, shift=0.0):
+    rng = np.random.default_rng(seed)
+    data = {col: rng.normal(5.0, 1.0, size=n) + shift for col in NUMERICAL_COLUMNS}
+    data["species"] = rng.choice(["Setosa", "Versicolor", "Virginica"], size=n)
+    data["location"] = rng.integers(0, 2, size=n)
+    return pd.DataFrame(data)
+
+
+@pytest.fixture(scope="module")
+def profile():
+    return build_reference_profile(_frame(2000, seed=0))
+
+
+def _batch_scores(profile, window):
+    """Scores a window from its raw rows, independently of the detector's running counts."""
+    scores = {}
+    for col, spec in profile["numerical"].items():
+        expected = np.asarray(spec["proportions"])
+        bins = np.searchsorted(spec["edges"], window[col].to_numpy(), side="right")
+        actual = np.bincount(bins, minlength=len(expected)) / len(window)
+        p, q = np.clip(expected, EPSILON, None), np.clip(actual, EPSILON, None)
+        scores[col] = {
+            "psi": np.sum((q - p) * np.log(q / p)),
+            "ks_statistic": np.max(np.abs(np.cumsum(actual) - np.cumsum(expected))),
+        }
+    for col, spec in profile["categorical"].items():
+        values = window[col].astype(str)
+        observed = [int((values == c).sum()) for c in spec["categories"]]
+        observed.append(len(values) - sum(observed))
+        expected = np.clip(np.append(spec["proportions"], 0.0), EPSILON, None) * len(window)
+        chi2 = np.sum((np.asarray(observed) - expected) ** 2 / expected)
+        scores[col] = {"chi2": chi2, "p_value": stats.chi2.sf(chi2, df=len(expected) - 1)}
+    return scores
+
+
+def test_window_scores_match_a_batch_computation(profile):
+    detector = StreamingDriftDetector(profile, window_size=WINDOW)
+    stream = pd.concat([_frame(500, seed=1), _frame(400, seed=2, shift=1.5)], ignore_index=True)
+    start = 0
+    for size in [7, 120, 300, 1, 250, 222]:
+        result = detector.update(stream.iloc[start:start + size])
+        start += size
+        window = stream.iloc[max(start - WINDOW, 0):start]
+        assert result["rows_seen"] == start
+        assert result["window_rows"] == len(window)
+        pd.testing.assert_frame_equal(detector.window_frame().reset_index(drop=True), window.reset_index(drop=True))
+        for col, expected in _batch_scores(profile, window).items():
+            for stat, value in expected.items():
+                assert result["columns"][col][stat] == pytest.approx(value, rel=1e-9, abs=1e-12), (col, stat)
+
+
+def test_eviction_clears_an_alert_once_drifted_rows_leave_the_window(profile):
+    detector = StreamingDriftDetector(profile, window_size=WINDOW)
+
+    drifted = detector.update(_frame(WINDOW, seed=3, shift=2.0))
+    assert drifted["drift_detected"]
+    assert set(NUMERICAL_COLUMNS) <= set(drifted["drifted_columns"])
+
+    partial = detector.update(_frame(WINDOW // 2, seed=4))
+    assert set(NUMERICAL_COLUMNS) <= set(partial["drifted_columns"])
+
+    recovered = detector.update(_frame(WINDOW // 2, seed=5))
+    assert recovered["window_rows"] == WINDOW
+    assert not set(NUMERICAL_COLUMNS) & set(recovered["drifted_columns"])
+
+
+def test_alert_follows_the_thresholds(profile):
+    window = _frame(WINDOW, seed=6)
+    window["petal_length"] += 0.3
+    window["species"] = "Setosa"
+
+    result = StreamingDriftDetector(profile, window_size=WINDOW).update(window)
+    psi = result["columns"]["petal_length"]["psi"]
+    assert result["columns"]["species"]["drift"]
+    assert not result["columns"]["sepal_length"]["drift"]
+
+    below = StreamingDriftDetector(profile, window_size=WINDOW, psi_threshold=psi * 0.9, ks_alpha=1e-12)
+    above = StreamingDriftDetector(profile, window_size=WINDOW, psi_threshold=psi * 1.1, ks_alpha=1e-12)
+    assert below.update(window)["columns"]["petal_length"]["drift"]
+    assert not above.update(window)["columns"]["petal_length"]["drift"]
+
+    lenient = StreamingDriftDetector(profile, window_size=WINDOW, chi2_alpha=0.0).update(window)
+    assert "species" not in lenient["drifted_columns"]
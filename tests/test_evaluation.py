@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.model_selection import train_test_split
+
+from evaluate import ConfusionAccumulator, holdout_mask
+
+CLASSES = np.array(["Setosa", "Versicolor", "Virginica"], dtype=object)
+
+
+@pytest.fixture(scope="module")
+def labels():
+    rng = np.random.default_rng(0)
+    y_true = CLASSES[rng.integers(0, 3, size=1000)]
+    y_pred = np.where(rng.random(1000) < 0.8, y_true, CLASSES[rng.integers(0, 3, size=1000)])
+    return y_true, y_pred
+
+
+def test_chunked_confusion_matches_sklearn(labels):
+    y_true, y_pred = labels
+    accumulator = ConfusionAccumulator(CLASSES)
+    for start in range(0, len(y_true), 128):
+        accumulator.update(y_true[start:start + 128], y_pred[start:start + 128])
+
+    assert np.array_equal(accumulator.matrix, confusion_matrix(y_true, y_pred, labels=CLASSES))
+    expected = classification_report(y_true, y_pred, labels=CLASSES, output_dict=True)
+    report = accumulator.report()
+    assert report["accuracy"] == pytest.approx(expected["accuracy"])
+    for name in list(CLASSES) + ["macro avg", "weighted avg"]:
+        for metric in ("precision", "recall", "f1-score", "support"):
+            assert report[name][metric] == pytest.approx(expected[name][metric]), (name, metric)
+
+
+def test_unpredicted_class_scores_zero():
+    accumulator = ConfusionAccumulator(CLASSES).update(["Setosa", "Virginica"], ["Setosa", "Setosa"])
+    report = accumulator.report()
+    assert report["Virginica"]["precision"] == 0.0
+    assert report["Virginica"]["recall"] == 0.0
+    assert report["Setosa"]["precision"] == 0.5
+
+
+def test_empty_holdout_scores_zero():
+    report = ConfusionAccumulator(CLASSES).report()
+    assert report["accuracy"] == 0.0
+    for name in ("macro avg", "weighted avg"):
+        assert report[name] == {"precision": 0.0, "recall": 0.0, "f1-score": 0.0, "support": 0.0}
+
+
+def test_holdout_mask_is_stratified_split(labels):
+    y_true, _ = labels
+    mask = holdout_mask(y_true, test_size=0.4, random_state=42)
+    assert mask.sum() == 400
+    for cls in CLASSES:
+        share = (y_true[mask] == cls).mean()
+        assert share == pytest.approx((y_true == cls).mean(), abs=0.01)
+
+    # Exactly the rows of the split evaluate.py made on the full frame before streaming
+    X = pd.DataFrame({"feature": np.arange(len(y_true))})
+    _, X_test, _, _ = train_test_split(X, pd.Series(y_true), test_size=0.4, random_state=42, stratify=y_true)
+    assert np.array_equal(np.flatnonzero(mask), np.sort(X_test.index.to_numpy()))
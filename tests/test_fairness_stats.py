@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from fairness_stats import FairnessAccumulator
+
+fairlearn_metrics = pytest.importorskip("fairlearn.metrics")
+
+CLASSES = np.array(["Setosa", "Versicolor", "Virginica"], dtype=object)
+
+
+@pytest.fixture(scope="module")
+def predictions():
+    rng = np.random.default_rng(0)
+    y_true = CLASSES[rng.integers(0, 3, size=2000)]
+    groups = rng.integers(0, 3, size=2000)
+    # Group-dependent error rates so the metrics differ across groups
+    wrong = rng.random(2000) < 0.1 + 0.1 * groups
+    y_pred = np.where(wrong, CLASSES[rng.integers(0, 3, size=2000)], y_true)
+    return y_true, y_pred, groups
+
+
+def test_chunked_report_matches_fairlearn(predictions):
+    y_true, y_pred, groups = predictions
+    left, right = FairnessAccumulator(CLASSES), FairnessAccumulator(CLASSES)
+    for start in range(0, 1200, 300):
+        left.update(y_true[start:start + 300], y_pred[start:start + 300], groups[start:start + 300])
+    right.update(y_true[1200:], y_pred[1200:], groups[1200:])
+    report = left.merge(right).report()
+
+    expected = {
+        f"demographic_parity_difference_{cls}": fairlearn_metrics.demographic_parity_difference(
+            y_true == cls, y_pred == cls, sensitive_features=groups
+        )
+        for cls in CLASSES
+    }
+    assert report.keys() == expected.keys()
+    for key, value in expected.items():
+        assert report[key] == pytest.approx(value, abs=1e-12), key
+
+
+def test_by_group_matches_metric_frame(predictions):
+    y_true, y_pred, groups = predictions
+    frame = FairnessAccumulator(CLASSES).update(y_true, y_pred, groups).by_group()
+    expected = fairlearn_metrics.MetricFrame(
+        metrics={
+            "accuracy": lambda t, p: (t == p).mean(),
+            "selection_rate_Versicolor": lambda t, p: (p == "Versicolor").mean(),
+        },
+        y_true=y_true, y_pred=y_pred, sensitive_features=groups,
+    ).by_group
+    np.testing.assert_allclose(frame[expected.columns].to_numpy(), expected.to_numpy(), rtol=0, atol=1e-12)
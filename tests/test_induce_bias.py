@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from induce_bias import LOCATIONS, induce_bias
+
+
+@pytest.fixture
+def wide_csv(tmp_path):
+    # Values the float32 cache would not keep verbatim
+    rows = [
+        "16777217,5.123456789,2,a,Setosa",
+        "9007199254740993,0.1,-7,,Virginica",
+        "3,1e-10,0,x y,Versicolor",
+    ] * 5
+    path = tmp_path / "wide.csv"
+    path.write_text("\n".join(["id,weight,count,note,species"] + rows) + "\n")
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [None, 2, 100])
+def test_existing_columns_round_trip_verbatim(wide_csv, tmp_path, chunk_size):
+    out = tmp_path / "biased.csv"
+    induce_bias(str(wide_csv), str(out), chunk_size=chunk_size)
+
+    original = wide_csv.read_text().splitlines()
+    written = out.read_text().splitlines()
+    assert written[0] == original[0] + ",location"
+    assert [line.rsplit(",", 1)[0] for line in written] == original
+    assert set(pd.read_csv(out)["location"]) <= set(LOCATIONS)
+
+
+def test_locations_independent_of_chunk_size(wide_csv, tmp_path):
+    outputs = []
+    for chunk_size in (None, 3):
+        out = tmp_path / f"biased_{chunk_size}.csv"
+        induce_bias(str(wide_csv), str(out), chunk_size=chunk_size)
+        outputs.append(out.read_bytes())
+    assert outputs[0] == outputs[1]
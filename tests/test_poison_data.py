@@ -0,0 +1,36 @@
+import os
+
+import pandas as pd
+import pytest
+
+from poison_data import LABEL_COLUMN, poison_labels
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "iris.csv")
+
+
+@pytest.fixture(scope="module")
+def poisoned(tmp_path_factory):
+    out = tmp_path_factory.mktemp("poison")
+    outputs = {}
+    for chunk_size in (None, 1, 7, 64, 1000):
+        path = out / f"poisoned_{chunk_size}.csv"
+        poison_labels(DATA_PATH, str(path), 0.2, seed=3, chunk_size=chunk_size)
+        outputs[chunk_size] = path.read_bytes()
+    return outputs
+
+
+def test_output_byte_identical_across_chunk_sizes(poisoned):
+    reference = poisoned[None]
+    assert all(output == reference for output in poisoned.values())
+
+
+def test_only_planned_labels_change(poisoned, tmp_path):
+    original = pd.read_csv(DATA_PATH, dtype=str, keep_default_na=False)
+    path = tmp_path / "poisoned.csv"
+    path.write_bytes(poisoned[None])
+    result = pd.read_csv(path, dtype=str, keep_default_na=False)
+
+    changed = result[LABEL_COLUMN] != original[LABEL_COLUMN]
+    assert changed.sum() == int(len(original) * 0.2)
+    assert set(result[LABEL_COLUMN]) <= set(original[LABEL_COLUMN])
+    pd.testing.assert_frame_equal(result.drop(columns=[LABEL_COLUMN]), original.drop(columns=[LABEL_COLUMN]))
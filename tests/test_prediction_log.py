@@ -0,0 +1,113 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from prediction_log import (OPEN_SUFFIX, UNKNOWN_LOCATION, PredictionLogger, iter_blocks, iter_prediction_chunks,
+                            list_segments)
+
+CLASSES = ["Setosa", "Versicolor", "Virginica"]
+FEATURES = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+
+
+def _batches(n_batches=5, rows=9, seed=0):
+    rng = np.random.default_rng(seed)
+    batches = []
+    for i in range(n_batches):
+        codes = rng.integers(0, 3, size=rows)
+        proba = rng.dirichlet(np.ones(3), size=rows)
+        locations = None if i == 0 else rng.integers(0, 2, size=rows)
+        batches.append((rng.normal(5.0, 1.0, size=(rows, 4)), codes, proba, locations))
+    return batches
+
+
+def _log_all(logger, batches):
+    for features, codes, proba, locations in batches:
+        logger.log(features, codes, proba, locations)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("chunk_size", [None, 7, 1000])
+def test_round_trip(tmp_path, chunk_size):
+    batches = _batches()
+    logger = PredictionLogger(str(tmp_path), model_hash="abc123", classes=CLASSES, feature_names=FEATURES)
+    _log_all(logger, batches)
+    logger.close()
+
+    chunks = list(iter_prediction_chunks(str(tmp_path), chunk_size))
+    if chunk_size is not None:
+        assert all(len(chunk) == chunk_size for chunk in chunks[:-1])
+    logged = pd.concat(chunks, ignore_index=True)
+
+    features = np.concatenate([b[0] for b in batches]).astype(np.float32)
+    codes = np.concatenate([b[1] for b in batches])
+    proba = np.concatenate([b[2] for b in batches]).astype(np.float32)
+    locations = np.concatenate([np.full(len(b[1]), UNKNOWN_LOCATION) if b[3] is None else b[3] for b in batches])
+    assert logger.rows_logged == len(codes) == len(logged)
+    assert np.array_equal(logged[FEATURES].to_numpy(), features)
+    assert np.array_equal(logged["location"].to_numpy(), locations)
+    assert list(logged["species"]) == [CLASSES[c] for c in codes]
+    assert np.array_equal(logged[[f"proba_{c}" for c in CLASSES]].to_numpy(), proba)
+    assert set(logged["model_hash"]) == {"abc123"}
+    assert logged["timestamp"].is_monotonic_increasing
+
+
+def test_segments_rotate_by_size_and_seal_on_close(tmp_path):
+    batches = _batches()
+    # One block per batch; every block fills its segment.
+    logger = PredictionLogger(str(tmp_path), classes=CLASSES, feature_names=FEATURES,
+                              max_segment_bytes=1, block_rows=1)
+    _log_all(logger, batches)
+    logger.close()
+
+    segments = list_segments(str(tmp_path))
+    assert len(segments) == len(batches)
+    assert list_segments(str(tmp_path), include_open=True) == segments
+    assert [sum(h["rows"] for h, _ in iter_blocks(path)) for path in segments] == [len(b[1]) for b in batches]
+
+
+def test_open_segment_is_only_read_with_include_open(tmp_path):
+    logger = PredictionLogger(str(tmp_path), classes=CLASSES, feature_names=FEATURES, flush_interval=0.01)
+    _log_all(logger, _batches(n_batches=1))
+    _wait_for(lambda: list_segments(str(tmp_path), include_open=True))
+
+    (open_path,) = list_segments(str(tmp_path), include_open=True)
+    assert open_path.endswith(OPEN_SUFFIX)
+    assert list_segments(str(tmp_path)) == []
+    assert list(iter_prediction_chunks(str(tmp_path))) == []
+    assert len(pd.concat(iter_prediction_chunks(str(tmp_path), include_open=True))) == 9
+
+    logger.close()
+    assert list_segments(str(tmp_path)) == [open_path[:-len(OPEN_SUFFIX)]]
+
+
+def test_idle_segment_is_sealed_by_age(tmp_path):
+    logger = PredictionLogger(str(tmp_path), classes=CLASSES, feature_names=FEATURES,
+                              max_segment_seconds=0.2, flush_interval=0.01)
+    _log_all(logger, _batches(n_batches=1))
+    # No further traffic and no close: the writer wakes up to seal the segment.
+    _wait_for(lambda: list_segments(str(tmp_path)))
+    assert list_segments(str(tmp_path), include_open=True) == list_segments(str(tmp_path))
+    logger.close()
+    assert len(list_segments(str(tmp_path))) == 1
+
+
+def test_truncated_block_ends_the_segment(tmp_path):
+    logger = PredictionLogger(str(tmp_path), classes=CLASSES, feature_names=FEATURES, block_rows=1)
+    _log_all(logger, _batches(n_batches=2))
+    logger.close()
+    (path,) = list_segments(str(tmp_path))
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        f.truncate(size - 10)
+
+    assert [h["rows"] for h, _ in iter_blocks(path)] == [9]
+    assert len(pd.concat(iter_prediction_chunks(str(tmp_path)))) == 9
@@ -0,0 +1,26 @@
+import json
+
+from backends import LocalArtifactStore
+from publish import MANIFEST_NAME, publish_artifacts
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_partial_publish_keeps_full_manifest(tmp_path):
+    source = tmp_path / "artifacts"
+    for name in ["model.joblib", "metrics.json", "plots/shap.png"]:
+        _write(source / name, name)
+    store = LocalArtifactStore(root=str(tmp_path / "store"))
+
+    full = publish_artifacts(store, str(source), "model")
+    _write(source / "metrics.json", "retrained")
+    partial = publish_artifacts(store, str(source), "model", files=["model.joblib", "metrics.json"])
+
+    assert set(partial["files"]) == {"model.joblib", "metrics.json", "plots/shap.png"}
+    assert partial["files"]["plots/shap.png"] == full["files"]["plots/shap.png"]
+    assert partial["files"]["metrics.json"] != full["files"]["metrics.json"]
+    remote = json.loads((tmp_path / "store" / "model" / MANIFEST_NAME).read_text())
+    assert remote["files"] == partial["files"]
@@ -0,0 +1,37 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder
+from sklearn.tree import DecisionTreeClassifier
+
+from serve import MicroBatcher, parse_instances
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "iris.csv")
+
+
+@pytest.fixture(scope="module")
+def batcher():
+    data = pd.read_csv(DATA_PATH)
+    X = data.drop(columns=["species", "location"], errors="ignore")
+    model = DecisionTreeClassifier(max_depth=3, random_state=0).fit(X, data["species"])
+    batcher = MicroBatcher(model, LabelEncoder().fit(data["species"]), max_batch_size=64, max_wait_ms=200)
+    yield batcher
+    batcher.close()
+
+
+@pytest.mark.parametrize("body", ['{"instances": [[5.1, 3.5, Infinity, 0.2]]}', '[5.1, NaN, 1.4, 0.2]'])
+def test_non_finite_features_rejected(body):
+    with pytest.raises(ValueError, match="Non-finite"):
+        parse_instances(json.loads(body), [])
+
+
+def test_bad_request_does_not_fail_its_batch(batcher):
+    # Both requests land in the same micro-batch; only the bad one fails.
+    good = batcher.submit([[5.1, 3.5, 1.4, 0.2], [6.7, 3.0, 5.2, 2.3]])
+    bad = batcher.submit([[np.inf, 3.5, 1.4, 0.2]])
+    assert [p["species"] for p in good.result(timeout=5)] == ["Setosa", "Virginica"]
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.datasets import load_iris
+from sklearn.model_selection import train_test_split
+
+from train import VALIDATION_SIZE, evaluate_model, run_sweep, sweep_candidates, train_model
+
+CANDIDATES = [{"max_depth": depth, "random_state": 1} for depth in (1, 2, 3)]
+
+
+@pytest.fixture(scope="module")
+def split():
+    iris = load_iris(as_frame=True)
+    y = pd.Series(np.asarray(iris.target_names)[iris.target])
+    return train_test_split(iris.data, y, test_size=0.4, stratify=y, random_state=1)
+
+
+def test_sweep_scores_on_a_validation_split_of_training(split):
+    X_train, X_test, y_train, y_test = split
+    fit, val = train_test_split(range(len(X_train)), test_size=VALIDATION_SIZE, stratify=y_train, random_state=1)
+
+    results = run_sweep(CANDIDATES, X_train, y_train, n_jobs=1)
+
+    for params, result in zip(CANDIDATES, results):
+        model = train_model(X_train.iloc[fit], y_train.iloc[fit], params)
+        assert result["accuracy"] == evaluate_model(model, X_train.iloc[val], y_train.iloc[val])
+
+
+def test_sweep_cv_scores_average_folds(split):
+    X_train, _, y_train, _ = split
+    results = run_sweep(CANDIDATES, X_train, y_train, cv=3, n_jobs=1)
+    assert [r["params"] for r in results] == CANDIDATES
+    assert all(0.0 <= r["accuracy"] <= 1.0 for r in results)
+
+
+def test_empty_sweep_is_rejected(split):
+    X_train, _, y_train, _ = split
+    with pytest.raises(ValueError, match="no candidates"):
+        run_sweep(sweep_candidates({"max_depth": [2, 3]}, n_iter=0), X_train, y_train, n_jobs=1)